@@ -28,6 +28,10 @@ from .parser import (
     contains_string,
 )
 from .evaluator import CodeEvaluator
+from .chunks import (
+    csv_chunks,
+    parquet_chunks,
+)
 from .utils import (
     tree_to_expressions,
     fit_ensemble_and_extract_expressions,
@@ -43,6 +47,8 @@ __all__ = [
     RuleMiner,
     RuleParser,
     CodeEvaluator,
+    csv_chunks,
+    parquet_chunks,
     contains_column,
     contains_string,
     rule_expression,
@@ -0,0 +1,128 @@
+"""Bitset module."""
+
+import numpy as np
+
+# number of bits set in each byte, used if np.bitwise_count is not available
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class Bitset:
+    """
+    The Bitset object
+
+    A set of rows of a DataFrame stored as packed bits: one bit per row in
+    uint64 words, so that a set takes 8 times less memory than a boolean mask.
+
+    It supports:
+    - and (&), or (|) and not (~) of sets of the same size
+    - count (number of rows in the set, based on a popcount of the words)
+    - conversion from and to boolean masks
+
+    Example:
+        bitset = Bitset.from_mask(np.array([True, False, True]))
+
+        print(bitset.count(), (~bitset).count())
+
+            2 1
+
+        print((~bitset).to_mask())
+
+            [False  True False]
+    """
+
+    __slots__ = ("words", "size")
+
+    def __init__(self, words: np.ndarray, size: int):
+        """ """
+        self.words = words
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask) -> "Bitset":
+        """
+        Create a Bitset from a boolean mask
+
+        Args:
+            mask: The boolean mask (ndarray, pd.Series or list) of the rows.
+
+        Returns:
+            Bitset: The packed set of rows.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        packed = np.packbits(mask, bitorder="little")
+        buffer = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+        buffer[: len(packed)] = packed
+        return cls(buffer.view(np.uint64), len(mask))
+
+    @classmethod
+    def full(cls, size: int) -> "Bitset":
+        """
+        Create a Bitset with all rows
+
+        Args:
+            size (int): The number of rows.
+
+        Returns:
+            Bitset: The packed set of all rows.
+        """
+        bitset = cls(np.full(-(-size // 64), np.iinfo(np.uint64).max, np.uint64), size)
+        bitset.clear_padding()
+        return bitset
+
+    def to_mask(self) -> np.ndarray:
+        """
+        Returns the set of rows as boolean mask
+
+        Returns:
+            np.ndarray: The boolean mask of the rows.
+        """
+        return np.unpackbits(
+            self.words.view(np.uint8), count=self.size, bitorder="little"
+        ).view(bool)
+
+    def count(self) -> int:
+        """
+        Returns the number of rows in the set
+
+        Returns:
+            int: The number of bits set.
+        """
+        if hasattr(np, "bitwise_count"):
+            return int(np.bitwise_count(self.words).sum())
+        return int(POPCOUNT_TABLE[self.words.view(np.uint8)].sum())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the number of bytes of the packed words
+        """
+        return self.words.nbytes
+
+    def clear_padding(self) -> None:
+        """
+        Set the bits after the last row to zero, so that they are not counted
+        """
+        data = self.words.view(np.uint8)
+        full_bytes, remaining_bits = divmod(self.size, 8)
+        if remaining_bits > 0:
+            data[full_bytes] &= np.uint8((1 << remaining_bits) - 1)
+            full_bytes += 1
+        data[full_bytes:] = 0
+
+    def __and__(self, other: "Bitset") -> "Bitset":
+        """ """
+        return Bitset(self.words & other.words, self.size)
+
+    def __or__(self, other: "Bitset") -> "Bitset":
+        """ """
+        return Bitset(self.words | other.words, self.size)
+
+    def __invert__(self) -> "Bitset":
+        """ """
+        bitset = Bitset(~self.words, self.size)
+        bitset.clear_padding()
+        return bitset
+
+    def __repr__(self) -> str:
+        """ """
+        return "Bitset(size=" + str(self.size) + ", count=" + str(self.count()) + ")"
@@ -0,0 +1,126 @@
+"""Chunks module."""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+
+    logging.debug("pyarrow imported")
+except Exception:
+    pq = None
+
+
+def csv_chunks(path, chunksize: int, **kwargs):
+    """
+    Returns a function that returns the chunks of a CSV file
+
+    Args:
+        path: The path of the CSV file.
+        chunksize (int): The number of rows per chunk.
+        **kwargs: Other arguments of pd.read_csv (for example dtype, so that
+        the datatypes of the columns are the same in all chunks).
+
+    Returns:
+        A function without arguments that returns an iterator over the chunks.
+
+    Example:
+        miner.evaluate_chunks(chunks=csv_chunks("data.csv", chunksize=100000))
+    """
+
+    def chunks():
+        return pd.read_csv(path, chunksize=chunksize, **kwargs)
+
+    return chunks
+
+
+def parquet_chunks(path, columns: list = None):
+    """
+    Returns a function that returns the row groups of a Parquet file
+
+    Args:
+        path: The path of the Parquet file.
+        columns (list, optional): The columns to read (default all columns).
+
+    Returns:
+        A function without arguments that returns a generator of the row groups
+        as DataFrames. A RangeIndex of a row group is shifted to the positions
+        of its rows in the file, as when the whole file is read.
+
+    Raises:
+        Exception: If pyarrow is not installed.
+    """
+    if pq is None:
+        raise Exception("pyarrow is required to read Parquet files in chunks.")
+
+    def chunks():
+        parquet_file = pq.ParquetFile(path)
+        start = 0
+        for row_group in range(parquet_file.num_row_groups):
+            chunk = parquet_file.read_row_group(row_group, columns=columns).to_pandas()
+            if isinstance(chunk.index, pd.RangeIndex):
+                chunk.index = pd.RangeIndex(
+                    start, start + len(chunk.index), name=chunk.index.name
+                )
+            start += len(chunk.index)
+            yield chunk
+
+    return chunks
+
+
+def data_chunks(chunks):
+    """
+    Returns an iterable over the chunks of the data, given as an iterable of
+    DataFrames or as a function without arguments that returns one
+    """
+    if callable(chunks):
+        return chunks()
+    return chunks
+
+
+def merge_counts(counts: dict, chunk_counts: dict) -> dict:
+    """
+    Returns the sum of the numbers of rows of the rule variables of two chunks
+    """
+    if counts is None:
+        return dict(chunk_counts)
+    return {
+        key: counts.get(key, 0) + chunk_counts.get(key, 0)
+        for key in list(counts.keys())
+        + [key for key in chunk_counts.keys() if key not in counts]
+    }
+
+
+def concat_values(values: list):
+    """
+    Returns the values of the chunks (Series or arrays) as one Series or array
+    """
+    if all(isinstance(value, pd.Series) for value in values):
+        return pd.concat(values)
+    return np.concatenate([np.atleast_1d(value) for value in values])
+
+
+def concat_labels(labels: list):
+    """
+    Returns the labels of the rows of the chunks as one pd.Index, or as one
+    array if the labels are not all a pd.Index
+    """
+    if all(isinstance(label, pd.Index) for label in labels):
+        return labels[0].append(labels[1:])
+    return np.concatenate(
+        [np.fromiter(label, dtype=object, count=len(label)) for label in labels]
+    )
+
+
+def concat_logs(logs: list):
+    """
+    Returns the logs of the rows of the chunks as one array, or None if there
+    are no logs
+    """
+    if all(log is None for log in logs):
+        return None
+    return np.concatenate(
+        [np.atleast_1d(np.asarray(log, dtype=object)) for log in logs]
+    )
@@ -25,6 +25,15 @@ INDICES = "indices"
 LOG = "log"
 RESULT_EXPRESSION = "result_expression"
 
+VARIABLE = "variable"
+WALL_TIME = "wall time"
+CPU_TIME = "cpu time"
+CARDINALITY = "cardinality"
+PROFILE_RULE = "rule"
+
+RESULTS_MODE = "results"
+METRICS_MODE = "metrics"
+
 DUNDER_DF = "_df"
 
 VAR_X_AND_Y = "X and Y"
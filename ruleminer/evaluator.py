@@ -1,14 +1,67 @@
 # Module CodeEvaluator
 
+import ast
 import logging
+import sys
+import time
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+
+try:
+    import numexpr
+
+    logging.debug("numexpr imported")
+except Exception:
+    numexpr = None
+from .bitset import Bitset
+from .logs import (
+    LazyLog,
+    float_strings,
+    item_strings,
+    join_strings,
+    rounded,
+    select,
+)
+from .membership import TableIndex
+from .polars_parser import PolarsColumns
+from .reductions import sum_rows, count_rows
+from .lowering import (
+    CodeLowering,
+    KIND_NO_TOLERANCE,
+    KIND_NUMERIC,
+    KIND_OTHER,
+)
+from .metrics import count
 from .const import (
     DUNDER_DF,
     COMPARISONS,
     STATISTICS,
+    VARIABLE,
+    WALL_TIME,
+    CPU_TIME,
+    CARDINALITY,
 )
 
+DEFAULT_CODE_CACHE_SIZE = 10000
+DEFAULT_SUBEXPRESSION_CACHE_BYTES = 256 * 1024**2
+# maximum number of unique values of dictionary-encoded string columns
+DICTIONARY_MAX_SIZE = 2**15 - 1
+
+# statistical functions that can be used in rules
+STATISTICAL_FUNCTIONS = {
+    "mean": np.mean,
+    "std": np.std,
+    "quantile": np.quantile,
+}
+
+# statistics of the dataset that the lowered code looks up in the statistics cache
+DATASET_STATISTICS = {
+    **STATISTICAL_FUNCTIONS,
+    # sum over the rows, as generated by the RuleParser for sum of a column
+    "sum": lambda values: np.sum(values, axis=0, dtype=float),
+}
+
 
 class CodeEvaluator:
     """
@@ -40,6 +93,7 @@ class CodeEvaluator:
     - __init__: Initializes the `CodeEvaluator` object with default global functions and helper methods.
     - set_params: Sets parameters for the object, including tolerance settings, and performs validation.
     - set_data: Sets the DataFrame used for evaluation in the `globals` dictionary.
+    - compile_code: Returns the compiled code object of an expression (with LRU cache).
     - evaluate: Evaluates a set of mathematical expressions and stores the results in a dictionary.
     """
 
@@ -51,6 +105,25 @@ class CodeEvaluator:
         Sets up the evaluator object by setting globals and params foe evaluation
         """
         self.logger = logging.getLogger(__name__)
+        self._code_cache = OrderedDict()
+        self.code_cache_hits = 0
+        self.code_cache_misses = 0
+        self._subexpression_cache = OrderedDict()
+        self._subexpression_cache_nbytes = 0
+        self.subexpression_cache_hits = 0
+        self.subexpression_cache_misses = 0
+        self._column_kinds = dict()
+        self._statistics_cache = dict()
+        self._dataset_statistics = False
+        self._row_indexes = dict()
+        self._factorized_columns = dict()
+        self._dictionaries = dict()
+        self._date_cache = dict()
+        self._polars_dataframe = None
+        self._polars_columns = None
+        self.profile_records = []
+        self.statistics_cache_hits = 0
+        self.statistics_cache_misses = 0
         self.set_params(params)
         self.set_globals()
         self._mean_logs = []
@@ -90,14 +163,28 @@ class CodeEvaluator:
           separately for proper functionality.
         """
 
+        def _log_statistic(function: str, name, args: tuple, result):
+            """
+            Adds the log of a statistical function (once per evaluation)
+            """
+            name = '"' + str(name) + '"'
+            if function == "quantile":
+                name += "," + str(args[0])
+            log = function + "[" + name + "]=" + str(np.round(result, 8))
+            logs = {
+                "mean": self._mean_logs,
+                "std": self._std_logs,
+                "quantile": self._quantile_logs,
+            }[function]
+            if log not in logs:
+                logs.append(log)
+
         def _mean_with_logging(*args):
             """
             np.mean calculation with logging
             """
             r = np.mean(args[0])
-            log = 'mean["' + str(args[0].name) + '"]=' + str(np.round(r, 8))
-            if log not in self._mean_logs:
-                self._mean_logs.append(log)
+            _log_statistic("mean", args[0].name, args[1:], r)
             return r
 
         def _std_with_logging(*args):
@@ -105,9 +192,7 @@ class CodeEvaluator:
             np.std calculation with logging
             """
             r = np.std(args[0])
-            log = 'std["' + str(args[0].name) + '"]=' + str(np.round(r, 8))
-            if log not in self._std_logs:
-                self._std_logs.append(log)
+            _log_statistic("std", args[0].name, args[1:], r)
             return r
 
         def _quantile_with_logging(*args):
@@ -115,18 +200,93 @@ class CodeEvaluator:
             np.quantile calculation with logging
             """
             r = np.quantile(args[0], args[1])
-            log = (
-                'quantile["'
-                + str(args[0].name)
-                + '",'
-                + str(args[1])
-                + "]="
-                + str(np.round(r, 8))
-            )
-            if log not in self._quantile_logs:
-                self._quantile_logs.append(log)
+            _log_statistic("quantile", args[0].name, args[1:], r)
             return r
 
+        def _statistic(function: str, key: str, values, *args):
+            """
+            Result of a statistical function of the dataset, calculated once
+            per dataset.
+
+            The lowered code of the rules looks up mean, std, quantile and sums
+            over the rows of values of the DataFrame in this cache, so that rules (and the parser
+            if statistics are evaluated when rules are parsed) with the same
+            statistic do not calculate it again. If statistics are logged then
+            the log is also added if the result is found in the cache.
+
+            Args:
+                function (str): The name of the statistical function.
+                key (str): The code of the values.
+                values: A function without arguments that evaluates the values.
+                *args: The other (constant) arguments of the function.
+
+            Returns:
+                The result of the statistical function.
+            """
+            cache_key = (function, key, repr(args))
+            entry = self._statistics_cache.get(cache_key, None)
+            if entry is None:
+                if self._dataset_statistics:
+                    # the data is a chunk of the dataset (see set_statistics)
+                    raise Exception(
+                        "Statistic " + function + " of " + key + " is not calculated."
+                    )
+                self.statistics_cache_misses += 1
+                values = values()
+                entry = (
+                    DATASET_STATISTICS[function](values, *args),
+                    getattr(values, "name", None),
+                )
+                self._statistics_cache[cache_key] = entry
+            else:
+                self.statistics_cache_hits += 1
+            if self.log_statistics and function in STATISTICAL_FUNCTIONS:
+                _log_statistic(function, entry[1], args, entry[0])
+            return entry[0]
+
+        def _to_array(values):
+            """
+            Values of a pd.Series (or other iterable) as float ndarray, scalars
+            are returned unmodified
+            """
+            if isinstance(values, pd.Series):
+                return values.to_numpy(dtype=float, na_value=np.nan)
+            elif hasattr(values, "__iter__"):
+                return np.asarray(values, dtype=float)
+            return values
+
+        def _to_series(values):
+            """
+            ndarray as pd.Series with the index of the DataFrame
+            """
+            return pd.Series(
+                np.broadcast_to(values, len(self.globals[DUNDER_DF].index)),
+                index=self.globals[DUNDER_DF].index,
+                dtype=float,
+            )
+
+        def _interval_bound(a_pos, a_neg, b_pos, b_neg, direction: str, operation):
+            """
+            Upper bound ("+") or lower bound ("-") of an operation on the intervals
+            [a-, a+] and [b-, b+], i.e. the maximum or minimum of the operation on
+            the four combinations of bounds.
+
+            The combinations are calculated on plain ndarrays and reduced with the
+            element-wise np.fmax or np.fmin (that, like the pandas max and min,
+            ignore NaN unless all combinations are NaN).
+            """
+            a_pos = _to_array(a_pos)
+            a_neg = _to_array(a_neg)
+            b_pos = _to_array(b_pos)
+            b_neg = _to_array(b_neg)
+            reduce = np.fmax if direction == "+" else np.fmin
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                result = reduce(
+                    reduce(operation(a_neg, b_neg), operation(a_neg, b_pos)),
+                    reduce(operation(a_pos, b_neg), operation(a_pos, b_pos)),
+                )
+            return _to_series(result)
+
         def _abs(a_pos, a_neg, direction: str):
             """ """
             if direction == "+":
@@ -135,19 +295,9 @@ class CodeEvaluator:
                 # [1, 4] -> upper limit of abs is 4
                 # so plain max of abs(pos) and abs(neg)
                 if hasattr(a_pos, "__iter__") | hasattr(a_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                np.abs(a_pos), index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                np.abs(a_neg), index=self.globals[DUNDER_DF].index
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).max(axis=1)
+                    return _to_series(
+                        np.fmax(np.abs(_to_array(a_pos)), np.abs(_to_array(a_neg)))
+                    )
                 else:
                     return max(np.abs(a_pos), np.abs(a_neg))
             elif direction == "-":
@@ -156,22 +306,14 @@ class CodeEvaluator:
                 # [1, 4] -> lower limit of abs is 1
                 # so min of abs(pos) and abs(neg), except if neg < 0 and pos > 0 (then the result should be 0)
                 if hasattr(a_pos, "__iter__") | hasattr(a_neg, "__iter__"):
-                    return (
-                        pd.concat(
-                            [
-                                pd.Series(
-                                    np.abs(a_pos), index=self.globals[DUNDER_DF].index
-                                ),
-                                pd.Series(
-                                    np.abs(a_neg), index=self.globals[DUNDER_DF].index
-                                ),
-                            ],
-                            join="inner",
-                            ignore_index=True,
-                            axis=1,
+                    a_pos = _to_array(a_pos)
+                    a_neg = _to_array(a_neg)
+                    return _to_series(
+                        np.where(
+                            (a_neg < 0) & (a_pos > 0),
+                            0.0,
+                            np.fmin(np.abs(a_pos), np.abs(a_neg)),
                         )
-                        .where(~((a_neg < 0) & (a_pos > 0)), 0)
-                        .min(axis=1)
                     )
                 else:
                     if a_neg < 0 and a_pos > 0:
@@ -247,6 +389,335 @@ class CodeEvaluator:
                             else:
                                 return value - 0.5 * 10 ** (decimals)
 
+        def _tol_vector(values, direction=bool, column=None):
+            """
+            Vectorized version of _tol for a pd.Series.
+
+            The tolerance bounds of all values of the Series are calculated at
+            once with the tolerance bands that were prepared in set_params. NaN
+            values and values that are not within a tolerance band result in NaN.
+            Datetime Series are returned unmodified. Series with other dtypes
+            (for example strings) are processed element-wise with _tol.
+
+            Args:
+                values (pd.Series): The values to be adjusted.
+                direction (str): The direction of adjustment ("+" or "-").
+                column (str): The key of the tolerance definition.
+
+            Returns:
+                pd.Series: The adjusted values.
+            """
+            if not isinstance(values, pd.Series) or column not in self._tolerance_bands:
+                return values.apply(_tol, args=(direction, column))
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                return values
+            if not pd.api.types.is_numeric_dtype(
+                values.dtype
+            ) or pd.api.types.is_complex_dtype(values.dtype):
+                return values.apply(_tol, args=(direction, column))
+            data = values.to_numpy(dtype=float, na_value=np.nan)
+            offsets = self.tolerance_offsets(np.abs(data), column)
+            if direction == "+":
+                data = data + offsets
+            else:
+                data = data - offsets
+            return pd.Series(data, index=values.index, name=values.name)
+
+        def _tol_column(column, direction=bool, key=None):
+            """
+            Tolerance bounds of a column of the DataFrame.
+
+            The tolerance bounds are calculated with _tol_vector on first use and
+            then kept in a cache (keyed by column, tolerance key and direction),
+            so that all rules that use the column share the same bounds. The cache
+            is cleared when the data or the parameters are set.
+
+            Args:
+                column (str): The column of the DataFrame.
+                direction (str): The direction of adjustment ("+" or "-").
+                key (str): The key of the tolerance definition.
+
+            Returns:
+                pd.Series: The adjusted values of the column.
+            """
+            cache_key = (column, key, direction)
+            result = self._tolerance_cache.get(cache_key, None)
+            if result is None:
+                result = _tol_vector(self.globals[DUNDER_DF][column], direction, key)
+                self._tolerance_cache[cache_key] = result
+            return result
+
+        def _sub(key: str, subexpression):
+            """
+            Value of a subexpression, evaluated once per dataset.
+
+            The lowered code of the rules looks up comparisons, tolerance bounds
+            and arithmetic in this cache, so that subexpressions shared by rules
+            (for example the same condition in many rules) are evaluated once.
+            The cache is not used if intermediate results are logged, because
+            then every comparison has to be evaluated to log it.
+
+            Args:
+                key (str): The code of the subexpression.
+                subexpression: A function without arguments that evaluates the
+                subexpression.
+
+            Returns:
+                The value of the subexpression.
+            """
+            if not self.subexpression_cache_enabled:
+                return subexpression()
+            entry = self._subexpression_cache.get(key, None)
+            if entry is not None:
+                self.subexpression_cache_hits += 1
+                self._subexpression_cache.move_to_end(key)
+                return entry[0]
+            self.subexpression_cache_misses += 1
+            value = subexpression()
+            self.cache_subexpression(key, value)
+            return value
+
+        def _str_column(column: str, function):
+            """
+            Result of string accessors on a column of the DataFrame, calculated
+            on the unique values of the column.
+
+            The values of the column are factorized once per dataset, the string
+            accessors are applied on the unique values and the results are taken
+            for each row with the codes of the values. Missing values are passed
+            to the string accessors as they are.
+
+            Args:
+                column (str): The column of the DataFrame.
+                function: A function that applies the string accessors on values.
+
+            Returns:
+                pd.Series: The result for each row of the DataFrame.
+            """
+            values = self.globals[DUNDER_DF][column]
+            if not (
+                values.dtype == object or pd.api.types.is_string_dtype(values.dtype)
+            ):
+                return function(values)
+            codes, uniques = self.factorized(column)
+            if len(uniques) == len(values):
+                # no duplicate values
+                return function(values)
+            valid = codes >= 0
+            result = function(pd.Series(uniques, dtype=values.dtype)).take(codes[valid])
+            if not valid.all():
+                result = pd.concat(
+                    [result, function(values[~valid])], ignore_index=True
+                ).iloc[
+                    np.argsort(
+                        np.concatenate([np.flatnonzero(valid), np.flatnonzero(~valid)]),
+                        kind="stable",
+                    )
+                ]
+            result.index = values.index
+            result.name = values.name
+            return result
+
+        def _dt_column(column: str, part: str):
+            """
+            Date part of a column of the DataFrame (for example year or
+            is_month_end), calculated once per dataset.
+
+            Args:
+                column (str): The column of the DataFrame.
+                part (str): The attribute of the datetime accessor.
+
+            Returns:
+                pd.Series: The date part of each row.
+            """
+            cache_key = ("dt", column, part)
+            result = self._date_cache.get(cache_key, None)
+            if result is None:
+                result = getattr(self.datetime_column(column).dt, part)
+                self._date_cache[cache_key] = result
+            return result
+
+        def _timedelta_column(left: str, right: str, unit: str):
+            """
+            Difference of two date columns of the DataFrame in a unit of time,
+            calculated once per dataset.
+
+            Args:
+                left (str): The column with the dates that are subtracted from.
+                right (str): The column with the dates that are subtracted.
+                unit (str): The unit of time of np.timedelta64 (for example "D").
+
+            Returns:
+                pd.Series: The difference of each row in the unit of time.
+            """
+            cache_key = ("timedelta", left, right, unit)
+            result = self._date_cache.get(cache_key, None)
+            if result is None:
+                result = (
+                    self.datetime_column(left) - self.datetime_column(right)
+                ) / np.timedelta64(1, unit)
+                self._date_cache[cache_key] = result
+            return result
+
+        def _code_eq(column: str, value: str):
+            """
+            Whether the strings of a column are equal to a string, compared as
+            codes if the column is dictionary-encoded.
+
+            Args:
+                column (str): The column of the DataFrame.
+                value (str): The string.
+
+            Returns:
+                pd.Series: A boolean Series with True if the string is equal.
+            """
+            values = self.globals[DUNDER_DF][column]
+            dictionary = self.dictionary(column)
+            if dictionary is None:
+                return values == value
+            codes, uniques = dictionary
+            position = uniques.get_indexer([value])[0]
+            if position < 0:
+                result = np.zeros(len(codes), dtype=bool)
+            else:
+                result = codes == position
+            return pd.Series(result, index=values.index, name=values.name)
+
+        def _code_ne(column: str, value: str):
+            """
+            Whether the strings of a column are not equal to a string, compared
+            as codes if the column is dictionary-encoded.
+            """
+            values = self.globals[DUNDER_DF][column]
+            if self.dictionary(column) is None:
+                return values != value
+            return ~_code_eq(column, value)
+
+        def _code_isin(column: str, strings: list):
+            """
+            Whether the strings of a column are in a list of strings, compared as
+            codes if the column is dictionary-encoded.
+
+            Args:
+                column (str): The column of the DataFrame.
+                strings (list): The list of strings.
+
+            Returns:
+                pd.Series: A boolean Series with True if the string is in the list.
+            """
+            values = self.globals[DUNDER_DF][column]
+            dictionary = self.dictionary(column)
+            if dictionary is None:
+                return values.isin(strings)
+            codes, uniques = dictionary
+            positions = uniques.get_indexer(strings)
+            found = np.zeros(len(uniques) + 1, dtype=bool)
+            found[positions[positions >= 0]] = True
+            # the last element is the code of missing values (-1)
+            return pd.Series(found[codes], index=values.index, name=values.name)
+
+        def _in_table(table: str, columns: tuple, values: list):
+            """
+            Whether rows of values are rows of a table, with the index of the
+            table (built when the parameters are set).
+
+            Args:
+                table (str): The name of the table.
+                columns (tuple): The columns of the table.
+                values (list): Per column of the table the values (columns of
+                the DataFrame) to check.
+
+            Returns:
+                pd.Series: A boolean Series with True if the row is in the table.
+            """
+            found = self.table_indexes[table].isin(columns, values)
+            if isinstance(values[0], pd.Series):
+                return pd.Series(found, index=values[0].index)
+            return found
+
+        def _in_rows(values: list, rows: str):
+            """
+            Whether rows of values are in a constant list of rows, with an index
+            of the list (built once per list).
+
+            Args:
+                values (list): The values (columns of the DataFrame) to check.
+                rows (str): The code of the list of rows.
+
+            Returns:
+                pd.Series: A boolean Series with True if the row is in the list.
+            """
+            index = self._row_indexes.get(rows, None)
+            if index is None:
+                # as with pd.Series.isin, rows given as lists are not equal to
+                # the tuples of the values, so only tuples are indexed
+                index = TableIndex(
+                    pd.DataFrame(
+                        [
+                            row
+                            for row in ast.literal_eval(rows)
+                            if isinstance(row, tuple)
+                        ],
+                        columns=range(len(values)),
+                    )
+                )
+                self._row_indexes[rows] = index
+            found = index.isin(tuple(range(len(values))), values)
+            if isinstance(values[0], pd.Series):
+                return pd.Series(found, index=values[0].index)
+            return found
+
+        def _numexpr(expression: str, columns: dict):
+            """
+            Evaluates a fused numexpr expression over columns of the DataFrame.
+
+            Args:
+                expression (str): The numexpr expression, with variables for
+                the columns.
+                columns (dict): The columns of the variables in the expression.
+
+            Returns:
+                pd.Series: The result of the expression.
+            """
+            data = self.globals[DUNDER_DF]
+            local_dict = {
+                name: numexpr_array(data[column]) for name, column in columns.items()
+            }
+            return pd.Series(
+                numexpr.evaluate(expression, local_dict=local_dict, global_dict={}),
+                index=data.index,
+            )
+
+        def _mask(condition=None):
+            """
+            Set of rows of the DataFrame that satisfy a condition.
+
+            The set contains the same rows as _df.index[condition], but is stored
+            as a Bitset (one bit per row), so that derived variables can be
+            calculated without set operations on the index and the number of rows
+            is a popcount.
+
+            Args:
+                condition: The condition (boolean pd.Series or ndarray), or None
+                to select all rows.
+
+            Returns:
+                Bitset: The set of the selected rows.
+            """
+            n = len(self.globals[DUNDER_DF].index)
+            if condition is None:
+                return Bitset.full(n)
+            if (
+                isinstance(condition, (pd.Series, np.ndarray))
+                and condition.dtype == bool
+                and len(condition) == n
+            ):
+                return Bitset.from_mask(condition)
+            # other conditions are selected positionally like labels of the index
+            mask = np.zeros(n, dtype=bool)
+            mask[pd.RangeIndex(n)[condition]] = True
+            return Bitset.from_mask(mask)
+
         def _eq_with_logging(
             left_side,
             right_side,
@@ -291,6 +762,17 @@ class CodeEvaluator:
                     )
                     return (max_left >= min_right) & (min_left <= max_right)
 
+        def _eq_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side equal to right side,
+            within the tolerance bounds of both sides
+            """
+            min_left = np.minimum(left_side_pos, left_side_neg)
+            max_left = np.maximum(left_side_pos, left_side_neg)
+            min_right = np.minimum(right_side_pos, right_side_neg)
+            max_right = np.maximum(right_side_pos, right_side_neg)
+            return (max_left >= min_right) & (min_left <= max_right)
+
         def _eq(
             left_side,
             right_side,
@@ -313,11 +795,18 @@ class CodeEvaluator:
                 ):
                     return left_side == right_side
                 else:
-                    min_left = np.minimum(left_side_pos, left_side_neg)
-                    max_left = np.maximum(left_side_pos, left_side_neg)
-                    min_right = np.minimum(right_side_pos, right_side_neg)
-                    max_right = np.maximum(right_side_pos, right_side_neg)
-                    return (max_left >= min_right) & (min_left <= max_right)
+                    return _eq_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
+
+        def _le_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side less than or equal to right side,
+            within the tolerance bounds of both sides
+            """
+            min_left = np.minimum(left_side_pos, left_side_neg)
+            max_right = np.maximum(right_side_pos, right_side_neg)
+            return min_left <= max_right
 
         def _le(
             left_side,
@@ -341,9 +830,9 @@ class CodeEvaluator:
                 ):
                     return left_side <= right_side
                 else:
-                    min_left = np.minimum(left_side_pos, left_side_neg)
-                    max_right = np.maximum(right_side_pos, right_side_neg)
-                    return min_left <= max_right
+                    return _le_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
 
         def _le_with_logging(
             left_side,
@@ -389,6 +878,17 @@ class CodeEvaluator:
                     )
                     return min_left <= max_right
 
+        def _lt_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side less than right side,
+            within the tolerance bounds of both sides
+            """
+            min_left = np.minimum(left_side_pos, left_side_neg)
+            max_left = np.maximum(left_side_pos, left_side_neg)
+            min_right = np.minimum(right_side_pos, right_side_neg)
+            max_right = np.maximum(right_side_pos, right_side_neg)
+            return (min_left <= max_right) & (max_left < min_right)
+
         def _lt(
             left_side,
             right_side,
@@ -411,11 +911,9 @@ class CodeEvaluator:
                 ):
                     return left_side < right_side
                 else:
-                    min_left = np.minimum(left_side_pos, left_side_neg)
-                    max_left = np.maximum(left_side_pos, left_side_neg)
-                    min_right = np.minimum(right_side_pos, right_side_neg)
-                    max_right = np.maximum(right_side_pos, right_side_neg)
-                    return (min_left <= max_right) & (max_left < min_right)
+                    return _lt_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
 
         def _lt_with_logging(
             left_side,
@@ -461,6 +959,15 @@ class CodeEvaluator:
                     )
                     return (min_left <= max_right) & (max_left < min_right)
 
+        def _ge_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side greater than or equal to right side,
+            within the tolerance bounds of both sides
+            """
+            max_left = np.maximum(left_side_pos, left_side_neg)
+            min_right = np.minimum(right_side_pos, right_side_neg)
+            return max_left >= min_right
+
         def _ge(
             left_side,
             right_side,
@@ -483,9 +990,9 @@ class CodeEvaluator:
                 ):
                     return left_side >= right_side
                 else:
-                    max_left = np.maximum(left_side_pos, left_side_neg)
-                    min_right = np.minimum(right_side_pos, right_side_neg)
-                    return max_left >= min_right
+                    return _ge_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
 
         def _ge_with_logging(
             left_side,
@@ -531,6 +1038,17 @@ class CodeEvaluator:
                     )
                     return max_left >= min_right
 
+        def _gt_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side greater than right side,
+            within the tolerance bounds of both sides
+            """
+            min_left = np.minimum(left_side_pos, left_side_neg)
+            max_left = np.maximum(left_side_pos, left_side_neg)
+            min_right = np.minimum(right_side_pos, right_side_neg)
+            max_right = np.maximum(right_side_pos, right_side_neg)
+            return (max_left >= min_right) & (min_left > max_right)
+
         def _gt(
             left_side,
             right_side,
@@ -553,11 +1071,9 @@ class CodeEvaluator:
                 ):
                     return left_side > right_side
                 else:
-                    min_left = np.minimum(left_side_pos, left_side_neg)
-                    max_left = np.maximum(left_side_pos, left_side_neg)
-                    min_right = np.minimum(right_side_pos, right_side_neg)
-                    max_right = np.maximum(right_side_pos, right_side_neg)
-                    return (max_left >= min_right) & (min_left > max_right)
+                    return _gt_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
 
         def _gt_with_logging(
             left_side,
@@ -647,6 +1163,17 @@ class CodeEvaluator:
                     )
                     return ~((max_left >= min_right) & (min_left <= max_right))
 
+        def _ne_tol(left_side_pos, left_side_neg, right_side_pos, right_side_neg):
+            """
+            Left side not equal to right side,
+            within the tolerance bounds of both sides
+            """
+            min_left = np.minimum(left_side_pos, left_side_neg)
+            max_left = np.maximum(left_side_pos, left_side_neg)
+            min_right = np.minimum(right_side_pos, right_side_neg)
+            max_right = np.maximum(right_side_pos, right_side_neg)
+            return ~((max_left >= min_right) & (min_left <= max_right))
+
         def _ne(
             left_side,
             right_side,
@@ -669,11 +1196,9 @@ class CodeEvaluator:
                 ):
                     return left_side != right_side
                 else:
-                    min_left = np.minimum(left_side_pos, left_side_neg)
-                    max_left = np.maximum(left_side_pos, left_side_neg)
-                    min_right = np.minimum(right_side_pos, right_side_neg)
-                    max_right = np.maximum(right_side_pos, right_side_neg)
-                    return ~((max_left >= min_right) & (min_left <= max_right))
+                    return _ne_tol(
+                        left_side_pos, left_side_neg, right_side_pos, right_side_neg
+                    )
 
         def _pow(a_pos, a_neg, b_pos, b_neg, direction: str):
             """
@@ -683,70 +1208,29 @@ class CodeEvaluator:
             Input is pd.Series, so output should be pd.Series
 
             """
-            if direction == "+":
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                np.maximum(0, a_neg) ** b_neg,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_neg) ** b_pos,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_pos) ** b_neg,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_pos) ** b_pos,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).max(axis=1)
-                else:
-                    return max(
-                        np.maximum(0, a_neg) ** b_neg,
-                        np.maximum(0, a_neg) ** b_pos,
-                        np.maximum(0, a_pos) ** b_neg,
-                        np.maximum(0, a_pos) ** b_pos,
-                    )
+            if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
+                return _interval_bound(
+                    a_pos,
+                    a_neg,
+                    b_pos,
+                    b_neg,
+                    direction,
+                    lambda a, b: np.maximum(0, a) ** b,
+                )
+            elif direction == "+":
+                return max(
+                    np.maximum(0, a_neg) ** b_neg,
+                    np.maximum(0, a_neg) ** b_pos,
+                    np.maximum(0, a_pos) ** b_neg,
+                    np.maximum(0, a_pos) ** b_pos,
+                )
             else:
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                np.maximum(0, a_neg) ** b_neg,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_neg) ** b_pos,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_pos) ** b_neg,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                            pd.Series(
-                                np.maximum(0, a_pos) ** b_pos,
-                                index=self.globals[DUNDER_DF].index,
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).min(axis=1)
-                else:
-                    return min(
-                        np.maximum(0, a_neg) ** b_neg,
-                        np.maximum(0, a_neg) ** b_pos,
-                        np.maximum(0, a_pos) ** b_neg,
-                        np.maximum(0, a_pos) ** b_pos,
-                    )
+                return min(
+                    np.maximum(0, a_neg) ** b_neg,
+                    np.maximum(0, a_neg) ** b_pos,
+                    np.maximum(0, a_pos) ** b_neg,
+                    np.maximum(0, a_pos) ** b_pos,
+                )
 
         def _mul(a_pos, a_neg, b_pos, b_neg, direction: str):
             """
@@ -756,56 +1240,14 @@ class CodeEvaluator:
             Input is pd.Series, so output should be pd.Series
 
             """
-            if direction == "+":
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                a_neg * b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_neg * b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos * b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos * b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).max(axis=1)
-                else:
-                    return max(
-                        a_neg * b_neg, a_neg * b_pos, a_pos * b_neg, a_pos * b_pos
-                    )
+            if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
+                return _interval_bound(
+                    a_pos, a_neg, b_pos, b_neg, direction, np.multiply
+                )
+            elif direction == "+":
+                return max(a_neg * b_neg, a_neg * b_pos, a_pos * b_neg, a_pos * b_pos)
             else:
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                a_neg * b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_neg * b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos * b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos * b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).min(axis=1)
-                else:
-                    return min(
-                        [a_neg * b_neg, a_neg * b_pos, a_pos * b_neg, a_pos * b_pos]
-                    )
+                return min([a_neg * b_neg, a_neg * b_pos, a_pos * b_neg, a_pos * b_pos])
 
         def _div(a_pos, a_neg, b_pos, b_neg, direction: str):
             """
@@ -815,56 +1257,14 @@ class CodeEvaluator:
             Input is pd.Series, so output should be pd.Series
 
             """
-            if direction == "+":
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                a_neg / b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_neg / b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos / b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos / b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).max(axis=1)
-                else:
-                    return max(
-                        a_neg / b_neg, a_neg / b_pos, a_pos / b_neg, a_pos / b_pos
-                    )
+            if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
+                return _interval_bound(
+                    a_pos, a_neg, b_pos, b_neg, direction, np.true_divide
+                )
+            elif direction == "+":
+                return max(a_neg / b_neg, a_neg / b_pos, a_pos / b_neg, a_pos / b_pos)
             else:
-                if hasattr(a_neg, "__iter__") | hasattr(b_neg, "__iter__"):
-                    return pd.concat(
-                        [
-                            pd.Series(
-                                a_neg / b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_neg / b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos / b_neg, index=self.globals[DUNDER_DF].index
-                            ),
-                            pd.Series(
-                                a_pos / b_pos, index=self.globals[DUNDER_DF].index
-                            ),
-                        ],
-                        join="inner",
-                        ignore_index=True,
-                        axis=1,
-                    ).min(axis=1)
-                else:
-                    return min(
-                        a_neg / b_neg, a_neg / b_pos, a_pos / b_neg, a_pos / b_pos
-                    )
+                return min(a_neg / b_neg, a_neg / b_pos, a_pos / b_neg, a_pos / b_pos)
 
         def _corr(
             key: str,
@@ -880,18 +1280,22 @@ class CodeEvaluator:
                     + '" is not in predefined matrices dictionary of parameters.'
                 )
             m = self.matrices[key]
-            columns = list(columns)
-            for i in range(len(columns)):
-                columns[i] = [
-                    0 if pd.isna(v) else np.maximum(0, v) if np.isfinite(v) else 0
-                    for v in columns[i]
-                ]
-            result = pd.Series([0] * len(columns[0]))
-            c = np.array(columns)
-            result += (np.array(m, ndmin=3) * (c.T[:, :, None] * c.T[:, None])).sum(
-                axis=(1, 2)
-            )
-            return np.maximum(result.values, 0) ** 0.5
+            if len(columns) != m.shape[0]:
+                raise Exception(
+                    'Matrix "'
+                    + key
+                    + '" has '
+                    + str(m.shape[0])
+                    + " rows, but "
+                    + str(len(columns))
+                    + " columns are given."
+                )
+            # rows x columns, missing, infinite and negative values are zero
+            c = np.array([np.asarray(column, dtype=float) for column in columns]).T
+            c = np.maximum(np.nan_to_num(c, nan=0.0, posinf=0.0, neginf=0.0), 0)
+            # quadratic form per row, without an outer product per row
+            result = np.einsum("ij,ij->i", c @ m, c)
+            return np.maximum(result, 0) ** 0.5
 
         # standard functions based on numpy
         standard_functions = {
@@ -906,21 +1310,36 @@ class CodeEvaluator:
         self.globals = {**self.tables, **standard_functions}
 
         # differentiate between function with and without logging
-        if self.params is not None and STATISTICS in self.params.get(
+        self.log_statistics = self.params is not None and STATISTICS in self.params.get(
             "intermediate_results", []
-        ):
+        )
+        if self.log_statistics:
             self.globals["mean"] = _mean_with_logging
             self.globals["std"] = _std_with_logging
             self.globals["quantile"] = _quantile_with_logging
         else:
-            self.globals["mean"] = np.mean
-            self.globals["std"] = np.std
-            self.globals["quantile"] = np.quantile
+            self.globals.update(STATISTICAL_FUNCTIONS)
 
         # internal functions defined above
         self.globals["_abs"] = _abs
         self.globals["_tol"] = _tol
+        self.globals["_tol_vector"] = _tol_vector
+        self.globals["_tol_column"] = _tol_column
         self.globals["_round"] = _round
+        self.globals["_mask"] = _mask
+        self.globals["_sub"] = _sub
+        self.globals["_statistic"] = _statistic
+        self.globals["_in_table"] = _in_table
+        self.globals["_str_column"] = _str_column
+        self.globals["_dt_column"] = _dt_column
+        self.globals["_timedelta_column"] = _timedelta_column
+        self.globals["_code_eq"] = _code_eq
+        self.globals["_code_ne"] = _code_ne
+        self.globals["_code_isin"] = _code_isin
+        self.globals["_in_rows"] = _in_rows
+        self.globals["_sum_rows"] = sum_rows
+        self.globals["_count_rows"] = count_rows
+        self.globals["_numexpr"] = _numexpr
         if self.params is not None and COMPARISONS in self.params.get(
             "intermediate_results", []
         ):
@@ -937,28 +1356,68 @@ class CodeEvaluator:
             self.globals["le"] = _le
             self.globals["gt"] = _gt
             self.globals["lt"] = _lt
+        self.globals["_eq_tol"] = _eq_tol
+        self.globals["_le_tol"] = _le_tol
+        self.globals["_lt_tol"] = _lt_tol
+        self.globals["_ge_tol"] = _ge_tol
+        self.globals["_gt_tol"] = _gt_tol
+        self.globals["_ne_tol"] = _ne_tol
         self.globals["pow"] = _pow
         self.globals["mul"] = _mul
         self.globals["div"] = _div
         self.globals["corr"] = _corr
 
     def datatype_not_apply_xbrl_tolerance(self, value):
-        return any(
-            [
-                isinstance(value, datatype)
-                for datatype in [str, bool, np.datetime64, pd.Timestamp]
-            ]
-        ) or any(
-            [
-                p(value)
-                for p in [
-                    pd.api.types.is_string_dtype,
-                    pd.api.types.is_bool_dtype,
-                    pd.api.types.is_datetime64_ns_dtype,
-                ]
-            ]
+        return (
+            isinstance(value, (str, bool, np.datetime64, pd.Timestamp))
+            or pd.api.types.is_string_dtype(value)
+            or pd.api.types.is_bool_dtype(value)
+            or pd.api.types.is_datetime64_ns_dtype(value)
         )
 
+    def column_kind(self, column: str):
+        """
+        Returns the kind of a column of the DataFrame for comparisons.
+
+        The kind is determined once per column of a dataset:
+        - KIND_NO_TOLERANCE: string, boolean or datetime columns, that are
+          compared without tolerance
+        - KIND_NUMERIC: numeric columns (integer or float numpy dtypes), that
+          are compared with tolerance
+        - KIND_OTHER: other columns (for example nullable integers), that are
+          compared with tolerance
+
+        Parameters:
+        - column (str): The name of the column.
+
+        Returns:
+        - str: The kind of the column, or None if the column is not in the data.
+        """
+        kind = self._column_kinds.get(column, None)
+        if kind is None:
+            data = self.globals.get(DUNDER_DF, None)
+            if not isinstance(data, pd.DataFrame) or column not in data.columns:
+                return None
+            values = data[column]
+            if not isinstance(values, pd.Series):
+                return None
+            if self.datatype_not_apply_xbrl_tolerance(values):
+                kind = KIND_NO_TOLERANCE
+            elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "iuf":
+                kind = KIND_NUMERIC
+            else:
+                kind = KIND_OTHER
+            self._column_kinds[column] = kind
+        return kind
+
+    def _log_strings(self, strings) -> None:
+        """
+        Add the log of a comparison to the logs of the expression, either a
+        string (the same for all rows) or a function that returns the strings
+        of rows by position (so that the strings are formatted on demand)
+        """
+        self._eval_logs.append(strings)
+
     def _log_result(
         self,
         result,
@@ -966,17 +1425,21 @@ class CodeEvaluator:
         """ """
         if hasattr(result, "__iter__"):
             # result is a list
-            if len(self._eval_logs) == 0:
-                for idx, item in enumerate(result):
-                    s = str(item)
-                    self._eval_logs.append(s)
-            else:
-                for idx, item in enumerate(result):
-                    s = str(item)
-                    self._eval_logs[idx] += "; " + s
+            values = np.asarray(result)
+            if values.dtype != bool and not isinstance(result, np.ndarray):
+                # the items are kept as they are, so that str gives the same string
+                values = np.fromiter(result, dtype=object, count=len(result))
+
+            def strings(positions):
+                if values.dtype == bool:
+                    return np.where(values[positions], "True", "False").astype(object)
+                # only the requested rows are formatted
+                return item_strings(values[positions])
+
+            self._log_strings(strings)
         else:
             # result is an item
-            self._eval_logs += str(result)
+            self._log_strings(str(result))
 
     def _log_float(
         self,
@@ -986,77 +1449,21 @@ class CodeEvaluator:
     ):
         """ """
         # {left} operator {right}
-        if hasattr(left_side, "__iter__"):
-            # left side is a list
-            left_side = [float(np.round(item, 8)) for item in left_side]
-            if hasattr(right_side, "__iter__"):
-                # right side is a list
-                right_side = [float(np.round(item, 8)) for item in right_side]
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(left_side)):
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + "} "
-                            + operator
-                            + " "
-                            + "{"
-                            + str(right_side[idx])
-                            + "}"
-                        )
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(left_side)):
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + "} "
-                            + operator
-                            + " "
-                            + "{"
-                            + str(right_side[idx])
-                            + "}"
-                        )
-                        self._eval_logs[idx] += "; " + s
-            else:
-                # right side is an item
-                right_side = float(np.round(right_side, 8))
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(left_side)):
-                        s = "{" + str(left_side[idx]) + "}"
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(left_side)):
-                        s = "{" + str(left_side[idx]) + "}"
-                        self._eval_logs[idx] += "; " + s
-                for idx in range(len(self._eval_logs)):
-                    self._eval_logs[idx] += " " + operator + " "
-                for idx in range(len(left_side)):
-                    self._eval_logs[idx] += "{" + str(right_side) + "}"
-        else:
-            # left side is an item
-            left_side = float(np.round(left_side, 8))
-            if hasattr(right_side, "__iter__"):
-                # right side is a list
-                right_side = [float(np.round(item, 8)) for item in right_side]
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(right_side)):
-                        s = "{" + str(left_side) + "}"
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(right_side)):
-                        s = "{" + str(left_side) + "}"
-                        self._eval_logs[idx] += "; " + s
-                for idx in range(len(self._eval_logs)):
-                    self._eval_logs[idx] += " " + operator + " "
-                for idx in range(len(right_side)):
-                    self._eval_logs[idx] += "{" + str(right_side) + "}"
-            else:
-                # right side is a item
-                right_side = float(np.round(right_side, 8))
-                self._eval_logs += "{" + str(left_side) + "}"
-                self._eval_logs += " " + operator + " "
-                self._eval_logs += "{" + str(right_side) + "}"
+        left_side = rounded(left_side)
+        right_side = rounded(right_side)
+
+        def strings(positions):
+            return join_strings(
+                [
+                    "{",
+                    float_strings(select(left_side, positions)),
+                    "} " + operator + " {",
+                    float_strings(select(right_side, positions)),
+                    "}",
+                ]
+            )
+
+        self._log_strings(strings)
 
     def _log_tol(
         self,
@@ -1070,234 +1477,57 @@ class CodeEvaluator:
     ):
         """ """
         # {left-right=diff} operator [a, b] of [a]
-        if hasattr(min_left, "__iter__") and hasattr(max_left, "__iter__"):
-            # left side is a list
-            left_side = [float(np.round(item, 8)) for item in left_side]
-            min_left = [float(np.round(item, 8)) for item in min_left]
-            max_left = [float(np.round(item, 8)) for item in max_left]
-            if hasattr(min_right, "__iter__") and hasattr(max_right, "__iter__"):
-                # right side is a list
-                right_side = [float(np.round(item, 8)) for item in right_side]
-                min_right = [float(np.round(item, 8)) for item in min_right]
-                max_right = [float(np.round(item, 8)) for item in max_right]
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(left_side)):
-                        diff = np.round(left_side[idx] - right_side[idx], 8)
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + " - "
-                            + str(right_side[idx])
-                            + " = "
-                            + str(diff)
-                            + "} "
-                            + operator
-                            + " "
-                        )
-                        lower_bound = (
-                            min_left[idx]
-                            - left_side[idx]
-                            - max_right[idx]
-                            + right_side[idx]
-                        )
-                        upper_bound = (
-                            max_left[idx]
-                            - left_side[idx]
-                            - min_right[idx]
-                            + right_side[idx]
-                        )
-                        if operator in ["==", "!="]:
-                            if lower_bound == upper_bound:
-                                s += "[" + str(lower_bound) + "]"
-                            else:
-                                s += (
-                                    "["
-                                    + str(lower_bound)
-                                    + ", "
-                                    + str(upper_bound)
-                                    + "]"
-                                )
-                        elif operator in ["<=", ">"]:
-                            s += "[" + str(upper_bound) + "]"
-                        elif operator in [">=", "<"]:
-                            s += "[" + str(lower_bound) + "]"
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(left_side)):
-                        diff = np.round(left_side[idx] - right_side[idx], 8)
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + " - "
-                            + str(right_side[idx])
-                            + " = "
-                            + str(diff)
-                            + "} "
-                            + operator
-                            + " "
-                        )
-                        lower_bound = np.round(
-                            min_left[idx]
-                            - left_side[idx]
-                            - max_right[idx]
-                            + right_side[idx],
-                            8,
-                        )
-                        upper_bound = np.round(
-                            max_left[idx]
-                            - left_side[idx]
-                            - min_right[idx]
-                            + right_side[idx],
-                            8,
-                        )
-                        if operator in ["==", "!="]:
-                            if lower_bound == upper_bound:
-                                s += "[" + str(lower_bound) + "]"
-                            else:
-                                s += (
-                                    "["
-                                    + str(lower_bound)
-                                    + ", "
-                                    + str(upper_bound)
-                                    + "]"
-                                )
-                        elif operator in ["<=", ">"]:
-                            s += "[" + str(upper_bound) + "]"
-                        elif operator in [">=", "<"]:
-                            s += "[" + str(lower_bound) + "]"
-                        self._eval_logs[idx] += "; " + s
-            else:
-                # right side is an item
-                right_side = float(np.round(right_side, 8))
-                max_right = float(np.round(max_right, 8))
-                min_right = float(np.round(min_right, 8))
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(left_side)):
-                        diff = np.round(left_side[idx] - right_side)
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + " - "
-                            + str(right_side)
-                            + " = "
-                            + str(diff)
-                            + "}"
-                        )
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(left_side)):
-                        diff = np.round(left_side[idx] - right_side, 8)
-                        s = (
-                            "{"
-                            + str(left_side[idx])
-                            + " - "
-                            + str(right_side)
-                            + " = "
-                            + str(diff)
-                            + "}"
-                        )
-                        self._eval_logs[idx] += "; " + s
-                for idx in range(len(self._eval_logs)):
-                    self._eval_logs[idx] += " " + operator + " "
-                for idx in range(len(left_side)):
-                    lower_bound = np.round(
-                        min_left[idx] - left_side[idx] - max_right + right_side, 8
-                    )
-                    upper_bound = np.round(
-                        max_left[idx] - left_side[idx] - min_right + right_side, 8
-                    )
-                    if operator in ["==", "!="]:
-                        if lower_bound == upper_bound:
-                            self._eval_logs[idx] += "[" + str(lower_bound) + "]"
-                        else:
-                            self._eval_logs[idx] += (
-                                "[" + str(lower_bound) + ", " + str(upper_bound) + "]"
-                            )
-                    elif operator in ["<=", ">"]:
-                        self._eval_logs[idx] += "[" + str(upper_bound) + "]"
-                    elif operator in [">=", "<"]:
-                        self._eval_logs[idx] += "[" + str(lower_bound) + "]"
+        left_list = hasattr(min_left, "__iter__") and hasattr(max_left, "__iter__")
+        right_list = hasattr(min_right, "__iter__") and hasattr(max_right, "__iter__")
+        left_side = rounded(left_side)
+        min_left = rounded(min_left)
+        max_left = rounded(max_left)
+        right_side = rounded(right_side)
+        min_right = rounded(min_right)
+        max_right = rounded(max_right)
+        lower_bound = min_left - left_side - max_right + right_side
+        upper_bound = max_left - left_side - min_right + right_side
+        if not left_list and not right_list:
+            # both sides are items
+            diff = float(left_side) - float(right_side)
+        elif left_list and not right_list and len(self._eval_logs) == 0:
+            diff = np.round(left_side - right_side)
         else:
-            # left side is an item
-            left_side = float(np.round(left_side, 8))
-            max_left = float(np.round(max_left, 8))
-            min_left = float(np.round(min_left, 8))
-            if hasattr(min_right, "__iter__") and hasattr(max_right, "__iter__"):
-                # right side is a list
-                right_side = [float(np.round(item, 8)) for item in right_side]
-                min_right = [float(np.round(item, 8)) for item in min_right]
-                max_right = [float(np.round(item, 8)) for item in max_right]
-                if len(self._eval_logs) == 0:
-                    for idx in range(len(right_side)):
-                        diff = np.round(left_side - right_side[idx], 8)
-                        s = (
-                            "{"
-                            + str(left_side)
-                            + " - "
-                            + str(right_side[idx])
-                            + " = "
-                            + str(diff)
-                            + "}"
-                        )
-                        self._eval_logs.append(s)
-                else:
-                    for idx in range(len(right_side)):
-                        diff = np.round(left_side - right_side[idx], 8)
-                        s = (
-                            "{"
-                            + str(left_side)
-                            + " - "
-                            + str(right_side[idx])
-                            + " = "
-                            + str(diff)
-                            + "}"
-                        )
-                        self._eval_logs[idx] += "; " + s
-                for idx in range(len(self._eval_logs)):
-                    self._eval_logs[idx] += " " + operator + " "
-                for idx in range(len(right_side)):
-                    lower_bound = np.round(
-                        min_left - left_side - max_right[idx] + right_side[idx], 8
-                    )
-                    upper_bound = np.round(
-                        max_left - left_side - min_right[idx] + right_side[idx], 8
+            diff = np.round(left_side - right_side, 8)
+        if not (left_list and right_list and len(self._eval_logs) == 0):
+            lower_bound = np.round(lower_bound, 8)
+            upper_bound = np.round(upper_bound, 8)
+        equal_bounds = lower_bound == upper_bound
+
+        def strings(positions):
+            lower = float_strings(select(lower_bound, positions))
+            upper = float_strings(select(upper_bound, positions))
+            if operator in ["==", "!="]:
+                bounds = join_strings(["[", lower, ", ", upper, "]"])
+                if left_list or right_list:
+                    bounds = np.where(
+                        select(equal_bounds, positions),
+                        join_strings(["[", lower, "]"]),
+                        bounds,
                     )
-                    if operator in ["==", "!="]:
-                        if lower_bound == upper_bound:
-                            self._eval_logs[idx] += "[" + str(lower_bound) + "]"
-                        else:
-                            self._eval_logs[idx] += (
-                                "[" + str(lower_bound) + ", " + str(upper_bound) + "]"
-                            )
-                    elif operator in ["<=", ">"]:
-                        self._eval_logs[idx] += "[" + str(upper_bound) + "]"
-                    elif operator in [">=", "<"]:
-                        self._eval_logs[idx] += "[" + str(lower_bound) + "]"
-            else:
-                # right side is a item
-                right_side = float(np.round(right_side, 8))
-                max_right = float(np.round(max_right, 8))
-                min_right = float(np.round(min_right, 8))
-                self._eval_logs += (
-                    "{"
-                    + str(left_side)
-                    + " - "
-                    + str(right_side)
-                    + " = "
-                    + str(left_side - right_side)
-                    + "}"
-                )
-                self._eval_logs += " " + operator + " "
-                lower_bound = np.round(min_left - left_side - max_right + right_side, 8)
-                upper_bound = np.round(max_left - left_side - min_right + right_side, 8)
-                if operator in ["==", "!="]:
-                    self._eval_logs += (
-                        "[" + str(lower_bound) + ", " + str(upper_bound) + "]"
-                    )
-                elif operator in ["<=", ">"]:
-                    self._eval_logs += "[" + str(upper_bound) + "]"
-                elif operator in [">=", "<"]:
-                    self._eval_logs += "[" + str(lower_bound) + "]"
+            elif operator in ["<=", ">"]:
+                bounds = join_strings(["[", upper, "]"])
+            elif operator in [">=", "<"]:
+                bounds = join_strings(["[", lower, "]"])
+            return join_strings(
+                [
+                    "{",
+                    float_strings(select(left_side, positions)),
+                    " - ",
+                    float_strings(select(right_side, positions)),
+                    " = ",
+                    float_strings(select(diff, positions)),
+                    "} " + operator + " ",
+                    bounds,
+                ]
+            )
+
+        self._log_strings(strings)
 
     def set_params(self, params):
         """
@@ -1322,7 +1552,21 @@ class CodeEvaluator:
         """
         self.params = params
         self.tables = dict()
+        self.table_indexes = dict()
+        self.code_cache_size = DEFAULT_CODE_CACHE_SIZE
+        self.tolerance = None
+        self._tolerance_bands = dict()
+        self._tolerance_cache = dict()
+        self.subexpression_cache_maxbytes = DEFAULT_SUBEXPRESSION_CACHE_BYTES
         if params is not None:
+            # set up size of the cache with compiled code objects
+            self.code_cache_size = self.params.get(
+                "code_cache_size", DEFAULT_CODE_CACHE_SIZE
+            )
+            # set up maximum number of bytes in the cache with subexpressions
+            self.subexpression_cache_maxbytes = self.params.get(
+                "subexpression_cache_bytes", DEFAULT_SUBEXPRESSION_CACHE_BYTES
+            )
             # set up tolerance dictionary
             self.tolerance = self.params.get("tolerance", None)
             if self.tolerance is not None:
@@ -1333,22 +1577,97 @@ class CodeEvaluator:
                         raise Exception(
                             "No spaces allowed in keys of tolerance definition."
                         )
+                # set up sorted tolerance bands for vectorized tolerances
+                for key, tol in self.tolerance.items():
+                    if tol is not None:
+                        self._tolerance_bands[key] = tolerance_bands(tol)
             # set up matrices for corr-function
             matrices = self.params.get("matrices", None)
             if matrices is not None:
                 self.matrices = dict()
                 for key, value in matrices.items():
-                    self.matrices[key] = np.array(value)
+                    self.matrices[key] = correlation_matrix(key, value)
 
             # set up tables
             tables = self.params.get("tables", None)
             if tables is not None:
                 for key, value in tables.items():
                     self.tables["_table_" + key] = value
+                    # index the rows of the table once for membership checks
+                    self.table_indexes[key] = TableIndex(value)
+        self._trim_code_cache()
+        # values of subexpressions depend on the parameters (for example the
+        # tolerance) and are not cached if intermediate results are logged
+        self.clear_subexpression_cache()
+        self.subexpression_cache_enabled = self.subexpression_cache_maxbytes != 0 and (
+            params is None or len(params.get("intermediate_results", [])) == 0
+        )
+        # comparisons are dispatched on the kinds of columns when the code is
+        # compiled, unless comparisons are logged
+        self.static_comparisons = params is None or COMPARISONS not in params.get(
+            "intermediate_results", []
+        )
+        # backend of numeric expressions
+        self.backend = "pandas"
+        if params is not None:
+            self.backend = params.get("backend", "pandas")
+            if self.backend == "numexpr":
+                if numexpr is None:
+                    self.logger.warning(
+                        "numexpr is not installed, the pandas backend is used"
+                    )
+                    self.backend = "pandas"
+                elif params.get("numexpr_threads", None) is not None:
+                    numexpr.set_num_threads(params["numexpr_threads"])
+        # compare strings as codes of dictionary-encoded columns
+        self.dictionary_encoding = params is not None and params.get(
+            "dictionary_encoding", False
+        )
+        # record the time and cardinality of each evaluated expression
+        self.profiling = params is not None and (
+            params.get("profile", False)
+            or params.get("profile_callback", None) is not None
+        )
+
+    def tolerance_offsets(
+        self,
+        abs_values: np.ndarray,
+        column: str,
+    ) -> np.ndarray:
+        """
+        Returns the tolerance offsets of an array of absolute values.
+
+        The offset of a value is 0.5 * 10 ** decimals of the first tolerance band
+        (start, end) of the tolerance definition with start <= value < end. If the
+        tolerance bands do not overlap then the band of each value is found with a
+        binary search over the sorted band edges.
+
+        Parameters:
+        - abs_values (np.ndarray): The absolute values.
+        - column (str): The key of the tolerance definition.
+
+        Returns:
+        - np.ndarray: The offsets, NaN if a value is not within a tolerance band.
+        """
+        starts, ends, offsets, disjoint = self._tolerance_bands[column]
+        if disjoint:
+            band = np.searchsorted(starts, abs_values, side="right") - 1
+            found = band >= 0
+            band[~found] = 0
+            found &= abs_values < ends[band]
+            return np.where(found, offsets[band], np.nan)
+        result = np.full(abs_values.shape, np.nan)
+        not_found = np.ones(abs_values.shape, dtype=bool)
+        for start, end, offset in zip(starts, ends, offsets):
+            found = not_found & (abs_values >= start) & (abs_values < end)
+            result[found] = offset
+            not_found &= ~found
+        return result
 
     def set_data(
         self,
         dataframe: pd.DataFrame = None,
+        polars_dataframe=None,
     ) -> None:
         """
         Sets the DataFrame to evaluate the expressions on.
@@ -1356,6 +1675,9 @@ class CodeEvaluator:
         Parameters:
         - dataframe (pd.DataFrame): The pandas DataFrame to be stored in the `globals`.
           If no DataFrame is provided, `None` is used by default.
+        - polars_dataframe (pl.DataFrame): The Polars DataFrame of which the
+          pandas DataFrame is a conversion (if the data is given as Polars
+          DataFrame), used without conversion by the Polars backend.
 
         Returns:
         - None: This method does not return any value. It updates the internal state
@@ -1364,13 +1686,335 @@ class CodeEvaluator:
         Notes:
         - The DataFrame is stored under the constant key `DUNDER_DF` within the
           `globals`.
+        - The caches with results derived from the data (tolerance bounds,
+          kinds of columns, factorized and dictionary-encoded columns, date
+          columns and parts, values of subexpressions, statistics and columns
+          converted to Polars) are cleared.
         """
         self.globals[DUNDER_DF] = dataframe
+        self._polars_dataframe = polars_dataframe
+        self._polars_columns = None
+        self._tolerance_cache = dict()
+        self._column_kinds = dict()
+        self._factorized_columns = dict()
+        self._dictionaries = dict()
+        self._date_cache = dict()
+        self.clear_subexpression_cache()
+        self.clear_statistics_cache()
+
+    def compile_code(
+        self,
+        expression: str,
+    ):
+        """
+        Returns the code object of an expression, compiled at most once.
+
+        Before compiling, the code is lowered into equivalent code that is
+        cheaper to evaluate (see the lowering module). Comparisons are then
+        dispatched on the kinds of the columns of the current data, a cached
+        code object is only used if these kinds have not changed.
+
+        Compiled code objects are kept in a least recently used cache keyed by
+        the expression text, so that the same rule code is not recompiled each
+        time it is evaluated (on every dataset and every period). The size of
+        the cache is set with the parameter `code_cache_size` (default 10000,
+        None for an unbounded cache and 0 to disable caching).
+
+        Parameters:
+        - expression (str): The expression to compile.
+
+        Returns:
+        - code: The compiled code object of the expression.
+
+        Raises:
+        - SyntaxError: If the expression cannot be compiled.
+        """
+        entry = self._code_cache.get(expression, None)
+        if entry is not None and self.valid_code(entry):
+            self.code_cache_hits += 1
+            self._code_cache.move_to_end(expression)
+            return entry[0]
+        self.code_cache_misses += 1
+        lowering = self.code_lowering()
+        code = compile(lowering.lower(expression), "<rule>", "eval")
+        if self.code_cache_size != 0:
+            self._code_cache[expression] = (
+                code,
+                (self.backend, self.dictionary_encoding),
+                lowering.dependencies,
+            )
+            self._code_cache.move_to_end(expression)
+            self._trim_code_cache()
+        return code
+
+    def code_lowering(self) -> CodeLowering:
+        """
+        Returns the lowering of code before it is compiled (see the lowering
+        module), with the options of the current parameters and data.
+
+        Returns:
+        - CodeLowering: The lowering, of which lower returns the lowered syntax
+          tree of an expression.
+        """
+        return CodeLowering(
+            subexpressions=True,
+            column_kinds=self.column_kind if self.static_comparisons else None,
+            numexpr=self.backend == "numexpr",
+            statistics=True,
+            dictionary=self.dictionary_encoding,
+        )
+
+    def valid_code(self, entry: tuple) -> bool:
+        """
+        Returns whether a compiled code object in the cache can be used.
+
+        Comparisons in the code may be dispatched and numeric expressions may be
+        fused on the kinds of the columns of the data on which the code was
+        compiled. The code can then only be used if comparisons are still
+        dispatched (they are not when comparisons are logged), the backend and
+        dictionary encoding are the same and the columns have the same kinds in
+        the current data.
+
+        Parameters:
+        - entry (tuple): The code object, the backend and dictionary encoding
+          and the kinds of the columns on which the code depends (None if it
+          does not depend on the kinds of columns).
+
+        Returns:
+        - bool: True if the code object can be used.
+        """
+        _, options, dependencies = entry
+        if dependencies is None:
+            return True
+        return (
+            self.static_comparisons
+            and options == (self.backend, self.dictionary_encoding)
+            and all(
+                self.column_kind(column) == kind
+                for column, kind in dependencies.items()
+            )
+        )
+
+    def _trim_code_cache(self):
+        """
+        Removes the least recently used code objects above the cache size
+        """
+        if self.code_cache_size is not None:
+            while len(self._code_cache) > max(self.code_cache_size, 0):
+                self._code_cache.popitem(last=False)
+
+    def code_cache_info(self) -> dict:
+        """
+        Returns the statistics of the cache with compiled code objects.
+
+        Returns:
+        - dict: A dictionary with the number of cache hits and misses, and the
+          current and maximum size of the cache.
+        """
+        return {
+            "hits": self.code_cache_hits,
+            "misses": self.code_cache_misses,
+            "size": len(self._code_cache),
+            "maxsize": self.code_cache_size,
+        }
+
+    def clear_code_cache(self):
+        """
+        Removes all compiled code objects and resets the cache statistics
+        """
+        self._code_cache.clear()
+        self.code_cache_hits = 0
+        self.code_cache_misses = 0
+
+    def cache_subexpression(self, key: str, value) -> None:
+        """
+        Adds the value of a subexpression to the cache with subexpressions.
+
+        The least recently used values are removed if the number of bytes in the
+        cache exceeds the parameter `subexpression_cache_bytes` (default 256 MB,
+        None for an unbounded cache and 0 to disable caching).
+
+        Parameters:
+        - key (str): The code of the subexpression.
+        - value: The value of the subexpression.
+        """
+        nbytes = value_nbytes(value)
+        if self.subexpression_cache_maxbytes is not None:
+            if nbytes > self.subexpression_cache_maxbytes:
+                return None
+            while (
+                self._subexpression_cache_nbytes + nbytes
+                > self.subexpression_cache_maxbytes
+            ):
+                _, (_, removed) = self._subexpression_cache.popitem(last=False)
+                self._subexpression_cache_nbytes -= removed
+        self._subexpression_cache[key] = (value, nbytes)
+        self._subexpression_cache_nbytes += nbytes
+
+    def subexpression_cache_info(self) -> dict:
+        """
+        Returns the statistics of the cache with values of subexpressions.
+
+        Returns:
+        - dict: A dictionary with the number of cache hits and misses, the hit
+          rate, the number of values in the cache, and the current and maximum
+          number of bytes of the cache.
+        """
+        lookups = self.subexpression_cache_hits + self.subexpression_cache_misses
+        return {
+            "hits": self.subexpression_cache_hits,
+            "misses": self.subexpression_cache_misses,
+            "hit_rate": self.subexpression_cache_hits / lookups if lookups else 0.0,
+            "size": len(self._subexpression_cache),
+            "bytes": self._subexpression_cache_nbytes,
+            "maxbytes": self.subexpression_cache_maxbytes,
+        }
+
+    def clear_subexpression_cache(self):
+        """
+        Removes all values of subexpressions and resets the cache statistics
+        """
+        self._subexpression_cache.clear()
+        self._subexpression_cache_nbytes = 0
+        self.subexpression_cache_hits = 0
+        self.subexpression_cache_misses = 0
+
+    def factorized(self, column: str) -> tuple:
+        """
+        Returns the factorized values of a column of the DataFrame (once per dataset).
+
+        Parameters:
+        - column (str): The column of the DataFrame.
+
+        Returns:
+        - tuple: The codes of the values (-1 for missing values) and the unique values.
+        """
+        entry = self._factorized_columns.get(column, None)
+        if entry is None:
+            entry = pd.factorize(self.globals[DUNDER_DF][column])
+            self._factorized_columns[column] = entry
+        return entry
+
+    def datetime_column(self, column: str) -> pd.Series:
+        """
+        Returns a date column of the DataFrame as datetimes (once per dataset).
+
+        Columns with object dtype that contain datetime or date objects are
+        converted to datetime64, other columns are returned as they are.
+
+        Parameters:
+        - column (str): The column of the DataFrame.
+
+        Returns:
+        - pd.Series: The values of the column.
+        """
+        cache_key = ("datetime", column)
+        values = self._date_cache.get(cache_key, None)
+        if values is None:
+            values = self.globals[DUNDER_DF][column]
+            if values.dtype == object and pd.api.types.infer_dtype(
+                values, skipna=True
+            ) in ("datetime", "datetime64", "date"):
+                try:
+                    values = pd.to_datetime(values)
+                except Exception as e:
+                    self.logger.debug(
+                        "Column '" + str(column) + "' not converted: " + repr(e)
+                    )
+            self._date_cache[cache_key] = values
+        return values
+
+    def dictionary(self, column: str):
+        """
+        Returns the dictionary encoding of a string column of the DataFrame (once
+        per dataset).
+
+        Only columns of strings (with missing values) with at most
+        DICTIONARY_MAX_SIZE unique values are encoded. The codes are stored in
+        the smallest integer type, with -1 for missing values.
+
+        Parameters:
+        - column (str): The column of the DataFrame.
+
+        Returns:
+        - tuple: The codes of the values and the unique values (pd.Index), or None
+          if the column is not encoded.
+        """
+        if column not in self._dictionaries:
+            values = self.globals[DUNDER_DF][column]
+            dictionary = None
+            if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+                codes, uniques = self.factorized(column)
+                if (
+                    len(uniques) <= DICTIONARY_MAX_SIZE
+                    and pd.api.types.infer_dtype(uniques, skipna=True) == "string"
+                ):
+                    dtype = np.int8 if len(uniques) < 2**7 else np.int16
+                    dictionary = (codes.astype(dtype), pd.Index(uniques))
+            self._dictionaries[column] = dictionary
+        return self._dictionaries[column]
+
+    def polars_columns(self) -> PolarsColumns:
+        """
+        Returns the columns of the data as Polars Series, converted at most once
+        per dataset (the columns of the Polars DataFrame if it is given).
+        """
+        if self._polars_columns is None:
+            if self._polars_dataframe is not None:
+                self._polars_columns = PolarsColumns(self._polars_dataframe)
+            else:
+                self._polars_columns = PolarsColumns(self.globals[DUNDER_DF])
+        return self._polars_columns
+
+    def statistics_cache_info(self) -> dict:
+        """
+        Returns the statistics of the cache with results of statistical functions.
+
+        Returns:
+        - dict: A dictionary with the number of cache hits and misses, the hit
+          rate and the number of results in the cache.
+        """
+        lookups = self.statistics_cache_hits + self.statistics_cache_misses
+        return {
+            "hits": self.statistics_cache_hits,
+            "misses": self.statistics_cache_misses,
+            "hit_rate": self.statistics_cache_hits / lookups if lookups else 0.0,
+            "size": len(self._statistics_cache),
+        }
+
+    def clear_statistics_cache(self):
+        """
+        Removes all results of statistical functions and resets the cache statistics
+        """
+        self._statistics_cache.clear()
+        self._dataset_statistics = False
+        self.statistics_cache_hits = 0
+        self.statistics_cache_misses = 0
+
+    def set_statistics(self, statistics: dict) -> None:
+        """
+        Sets the results of the statistical functions of the whole dataset.
+
+        If the data is a chunk of a dataset, the statistics of the rules (mean,
+        std and quantile over the rows) are calculated for the whole dataset
+        beforehand and set in the statistics cache. A statistic that is not in
+        the statistics then raises an Exception instead of being calculated on
+        the chunk. The statistics are cleared when the data is set.
+
+        Parameters:
+        - statistics (dict): The results (value, name of the values) by tuples of
+          the function, the key of the values and the other arguments, as
+          returned by dataset_statistics.
+        """
+        for (function, key, args), entry in statistics.items():
+            self._statistics_cache[(function, key, repr(args))] = entry
+        self._dataset_statistics = True
 
     def evaluate_dict(
         self,
         expressions: dict = {},
         encodings: dict = {},
+        lazy_logs: bool = False,
     ) -> dict:
         """
         Evaluates a set of mathematical expressions and stores the results in a dictionary.
@@ -1385,31 +2029,42 @@ class CodeEvaluator:
           the corresponding mathematical expressions as strings to be evaluated.
         - encodings (dict): A dictionary of additional variables or encoding values to be
           used during the evaluation of expressions.
+        - lazy_logs (bool): If True, the logs are returned as a LazyLog, of which the
+          strings are only formatted for the rows that are requested.
 
         Returns:
         - dict: A dictionary where keys are the variable names from the `expressions`
           dictionary, and values are the results of evaluating those expressions. If an error
           occurs during evaluation, the corresponding value is set to `NaN`.
+        - logs: The logs of the intermediate results of each row (pd.Series or LazyLog),
+          None if no intermediate results are defined.
 
         Logs:
         - Errors encountered during the evaluation of expressions are logged with a debug level.
 
+        Profile:
+        - If the parameter `profile` is True (or a `profile_callback` is set), the wall time,
+          cpu time and cardinality (number of selected rows) of each expression are recorded
+          in `profile_records`, which is reset at each call.
+
         """
         variables = dict()
         if (
             self.params is not None
             and len(self.params.get("intermediate_results", [])) > 0
         ):
-            # enable log is one or more intermediate results is defined
-            logs = pd.Series(
-                index=self.globals[DUNDER_DF].index,
-                data=[""] * len(self.globals[DUNDER_DF].index),
-                dtype="object",
-            )
+            # enable log is one or more intermediate results is defined, the
+            # parts of the logs are formatted and concatenated after all
+            # expressions are evaluated
+            logs = []
             logs_added = False
         else:
             logs = None
+        if self.profiling:
+            self.profile_records = []
         for key in expressions.keys():
+            if self.profiling:
+                wall_time, cpu_time = time.perf_counter(), time.process_time()
             if logs is not None:
                 # initialize logs
                 self._mean_logs = []
@@ -1417,13 +2072,15 @@ class CodeEvaluator:
                 self._quantile_logs = []
                 self._eval_logs = []
                 if key == "X":
-                    logs += "if ("
+                    logs.append("if (")
                     logs_added = False
                 elif key == "Y":
-                    logs += " then ("
+                    logs.append(" then (")
                     logs_added = False
             try:
-                variables[key] = eval(expressions[key], self.globals, encodings)
+                variables[key] = eval(
+                    self.compile_code(expressions[key]), self.globals, encodings
+                )
                 if logs is not None:
                     # collect log of statistics
                     log = []
@@ -1433,24 +2090,37 @@ class CodeEvaluator:
                         log.append("; ".join(self._std_logs))
                     if len(self._quantile_logs) > 0:
                         log.append("; ".join(self._quantile_logs))
-                    # put logs in pd.Series as a strings
-                    if len(self._eval_logs) > 0:
+                    # put logs of comparisons in the parts of the logs
+                    for eval_log in self._eval_logs:
                         if logs_added:
-                            logs += "; "
-                        logs += self._eval_logs
+                            logs.append("; ")
+                        logs.append(eval_log)
                         logs_added = True
                     if len(log) > 0:
                         if logs_added:
-                            logs += "; "
-                        logs += "; ".join(log)
+                            logs.append("; ")
+                        logs.append("; ".join(log))
                         logs_added = True
                     if key != "N":
-                        logs += ")"
+                        logs.append(")")
             except Exception as e:
                 self.logger.debug(
                     "Error evaluating the code '" + expressions[key] + "': " + repr(e)
                 )
                 variables[key] = np.nan
+            if self.profiling:
+                self.profile_records.append(
+                    {
+                        VARIABLE: key,
+                        WALL_TIME: time.perf_counter() - wall_time,
+                        CPU_TIME: time.process_time() - cpu_time,
+                        CARDINALITY: count(variables[key]),
+                    }
+                )
+        if logs is not None:
+            logs = LazyLog(parts=logs, index=self.globals[DUNDER_DF].index)
+            if not lazy_logs:
+                logs = logs.to_series()
         return variables, logs
 
     def evaluate_str(
@@ -1484,7 +2154,7 @@ class CodeEvaluator:
         variable = ""
         log = ""
         try:
-            variable = eval(expression, self.globals, encodings)
+            variable = eval(self.compile_code(expression), self.globals, encodings)
             log = variable
         except Exception as e:
             self.logger.debug(
@@ -1493,3 +2163,109 @@ class CodeEvaluator:
             variable = np.nan
             log = np.nan
         return variable, log
+
+
+def tolerance_bands(tolerance_def: dict) -> tuple:
+    """
+    Convert a tolerance definition to arrays of sorted tolerance bands.
+
+    Args:
+        tolerance_def (dict): A tolerance definition that maps (start, end)
+        ranges to a number of decimals.
+
+    Returns:
+        tuple: A tuple containing the following elements:
+            - np.ndarray: The starts of the bands.
+            - np.ndarray: The ends of the bands.
+            - np.ndarray: The offsets (0.5 * 10 ** decimals) of the bands.
+            - bool: True if the bands do not overlap. The bands are then sorted
+              by start, otherwise the order of the definition is retained.
+
+    Example:
+        tolerance_bands({(0, 1e3): 1, (1e3, np.inf): 2})
+
+            (array([0., 1000.]), array([1000., inf]), array([5., 50.]), True)
+    """
+    bands = [
+        (start, end, 0.5 * 10 ** (decimals))
+        for (start, end), decimals in tolerance_def.items()
+    ]
+    sorted_bands = sorted(bands, key=lambda band: band[0])
+    disjoint = all(
+        sorted_bands[idx][1] <= sorted_bands[idx + 1][0]
+        for idx in range(len(sorted_bands) - 1)
+    )
+    if disjoint:
+        bands = sorted_bands
+    starts = np.array([band[0] for band in bands], dtype=float)
+    ends = np.array([band[1] for band in bands], dtype=float)
+    offsets = np.array([band[2] for band in bands], dtype=float)
+    return starts, ends, offsets, disjoint
+
+
+def value_nbytes(value) -> int:
+    """
+    Returns the (approximate) number of bytes of the value of a subexpression
+
+    The index of a pd.Series is not counted, because it is shared with the
+    DataFrame.
+
+    Args:
+        value: The value of a subexpression.
+
+    Returns:
+        int: The number of bytes.
+    """
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False, deep=False))
+    elif isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    elif isinstance(value, Bitset):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def numexpr_array(values: pd.Series) -> np.ndarray:
+    """
+    Returns the values of a numeric column as an array with a dtype that is
+    supported by numexpr (int32, int64, float32 or float64)
+
+    Args:
+        values (pd.Series): The values of a numeric column.
+
+    Returns:
+        np.ndarray: The values as array.
+    """
+    values = values.to_numpy()
+    if values.dtype.kind in "iu" and values.dtype.itemsize < 4:
+        return values.astype(np.int32)
+    if values.dtype == np.uint32:
+        return values.astype(np.int64)
+    if values.dtype == np.uint64:
+        return values.astype(np.float64)
+    if values.dtype == np.float16:
+        return values.astype(np.float32)
+    return values
+
+
+def correlation_matrix(key: str, value) -> np.ndarray:
+    """
+    Returns a matrix of the corr-function as a square array of floats.
+
+    Args:
+        key (str): The key of the matrix in the parameters.
+        value: The matrix (list of lists or array).
+
+    Returns:
+        np.ndarray: The matrix.
+
+    Raises:
+        Exception: If the matrix is not square or contains missing or
+        infinite values.
+    """
+    matrix = np.array(value, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise Exception('Matrix "' + key + '" is not a square matrix.')
+    if not np.isfinite(matrix).all():
+        raise Exception('Matrix "' + key + '" contains missing or infinite values.')
+    return matrix
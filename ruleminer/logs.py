@@ -0,0 +1,217 @@
+"""Logs module."""
+
+import numpy as np
+import pandas as pd
+
+from .bitset import Bitset
+
+
+class LazyLog:
+    """
+    The LazyLog object
+
+    The log of the intermediate results of a rule for each row of a DataFrame,
+    of which the strings are only formatted for the rows that are requested.
+    The log consists of parts that are either a string (the same for all rows)
+    or a function that returns the strings of the given positions of the rows
+    (the values that are needed to format the strings are kept as arrays).
+
+    It supports:
+    - get (the strings of a selection of rows, like pd.Series.get)
+    - format (the strings of rows by position)
+    - to_series (the strings of all rows)
+
+    Example:
+        log = LazyLog(
+            parts=["if (", lambda positions: np.array(["a", "b"])[positions], ")"],
+            index=pd.Index(["x", "y"]),
+        )
+
+        print(log.get(pd.Index(["y"])))
+
+            ['if (b)']
+    """
+
+    __slots__ = ("parts", "index")
+
+    def __init__(self, parts: list, index: pd.Index):
+        """ """
+        self.parts = parts
+        self.index = index
+
+    def format(self, positions: np.ndarray = None) -> np.ndarray:
+        """
+        Returns the strings of the log of rows
+
+        Args:
+            positions (np.ndarray): The positions of the rows, all rows if None.
+
+        Returns:
+            np.ndarray: The strings of the rows.
+        """
+        if positions is None:
+            positions = np.arange(len(self.index))
+        else:
+            positions = np.asarray(positions, dtype=np.intp)
+        strings = join_strings(
+            [part if isinstance(part, str) else part(positions) for part in self.parts]
+        )
+        if isinstance(strings, str):
+            return np.full(len(positions), strings, dtype=object)
+        return strings
+
+    def get(self, selection, default=None):
+        """
+        Returns the strings of the log of a selection of rows
+
+        Args:
+            selection: The labels of the rows or a boolean mask of the rows (as
+            the key of pd.Series.get).
+            default: The value returned if the selection is not found.
+
+        Returns:
+            np.ndarray: The strings of the selected rows.
+        """
+        positions = self.positions(selection)
+        if positions is None:
+            return default
+        return self.format(positions)
+
+    def positions(self, selection):
+        """
+        Returns the positions of a selection of rows
+
+        A boolean mask (or Bitset) is converted with np.flatnonzero, labels are
+        looked up in the hash table of the index (built once per index).
+
+        Args:
+            selection: The labels of the rows, a boolean mask or a Bitset.
+
+        Returns:
+            np.ndarray: The positions of the rows, or None if a label is not found.
+        """
+        if isinstance(selection, Bitset):
+            return np.flatnonzero(selection.to_mask())
+        if not isinstance(selection, (pd.Index, pd.Series, np.ndarray, list)):
+            selection = [selection]
+        mask = np.asarray(selection)
+        if mask.dtype == bool and len(mask) == len(self.index):
+            return np.flatnonzero(mask)
+        if self.index.is_unique:
+            positions = self.index.get_indexer(selection)
+        else:
+            positions = self.index.get_indexer_for(selection)
+        if (positions < 0).any():
+            return None
+        return positions
+
+    def to_series(self) -> pd.Series:
+        """
+        Returns the strings of the log of all rows
+
+        Returns:
+            pd.Series: The strings of the rows, with the index of the DataFrame.
+        """
+        return pd.Series(data=self.format(), index=self.index, dtype="object")
+
+
+def select(values, positions: np.ndarray):
+    """
+    Returns the values at positions of the rows.
+
+    Args:
+        values: An item (the same for all rows) or an array of values.
+        positions (np.ndarray): The positions of the rows.
+
+    Returns:
+        The item or the values at the positions.
+    """
+    if isinstance(values, np.ndarray) and values.ndim > 0:
+        return values[positions]
+    return values
+
+
+def rounded(values):
+    """
+    Returns the values rounded to 8 decimals as floats.
+
+    Args:
+        values: An item or a list of values.
+
+    Returns:
+        The rounded item (float) or the rounded values (np.ndarray).
+    """
+    if hasattr(values, "__iter__"):
+        return np.round(np.asarray(values, dtype=float), 8)
+    return float(np.round(values, 8))
+
+
+def float_strings(values):
+    """
+    Returns floats as strings, the same as str(float(value)).
+
+    Args:
+        values: An item or an array of floats.
+
+    Returns:
+        The string of the item or an array with the strings of the values.
+    """
+    if isinstance(values, np.ndarray) and values.ndim > 0:
+        return item_strings(values)
+    return str(values)
+
+
+def item_strings(values: np.ndarray) -> np.ndarray:
+    """
+    Returns the items of an array as strings, the same as str(item).
+
+    The strings are still formatted one by one with str (numpy's vectorized
+    formatting of floats is not faster), but numbers are formatted once per
+    distinct value: the bits of the values are factorized, so that equal bits
+    give the same string and 0.0 and -0.0 are kept apart.
+
+    Args:
+        values (np.ndarray): The values.
+
+    Returns:
+        np.ndarray: The strings of the values (dtype object).
+    """
+    dtype = values.dtype
+    if dtype.kind in "iuf" and dtype.itemsize in (1, 2, 4, 8):
+        codes, uniques = pd.factorize(values.view("i" + str(dtype.itemsize)))
+        uniques = uniques.view(dtype)
+        if dtype.kind in "iu" or dtype.itemsize == 8:
+            # Python ints and floats have the same strings as these numbers
+            uniques = uniques.tolist()
+        return np.array([str(item) for item in uniques], dtype=object)[codes]
+    return np.array([str(item) for item in values], dtype=object)
+
+
+def join_strings(parts: list, separator: str = ""):
+    """
+    Concatenate strings and arrays of strings element-wise.
+
+    Consecutive strings are concatenated first, so that each array is
+    concatenated once.
+
+    Args:
+        parts (list): Strings (the same for all rows) and arrays of strings.
+        separator (str): The string placed between the parts.
+
+    Returns:
+        A string if all parts are strings, otherwise an array of strings.
+    """
+    merged = []
+    for idx, part in enumerate(parts):
+        if idx > 0 and separator != "":
+            merged.append(separator)
+        merged.append(part)
+    result = ""
+    text = ""
+    for part in merged:
+        if isinstance(part, str):
+            text += part
+        else:
+            result = result + (text + part)
+            text = ""
+    return result + text
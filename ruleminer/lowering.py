@@ -0,0 +1,1371 @@
+"""Lowering module."""
+
+import ast
+import copy
+from .const import DUNDER_DF
+
+
+# comparison functions and the corresponding operators
+COMPARISON_FUNCTIONS = {
+    "eq": ast.Eq,
+    "ne": ast.NotEq,
+    "ge": ast.GtE,
+    "le": ast.LtE,
+    "gt": ast.Gt,
+    "lt": ast.Lt,
+}
+
+# arithmetic operators of which the result of numeric operands is numeric
+ARITHMETIC_OPERATORS = (
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+)
+
+# operators that can be fused into numexpr expressions
+NUMEXPR_ARITHMETIC_OPERATORS = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+NUMEXPR_LOGICAL_OPERATORS = {ast.BitAnd: "&", ast.BitOr: "|"}
+NUMEXPR_COMPARISON_OPERATORS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.GtE: ">=",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.Lt: "<",
+}
+
+# kinds of operands of comparisons
+KIND_NO_TOLERANCE = "no tolerance"
+KIND_NUMERIC = "numeric"
+KIND_OTHER = "other"
+
+# names (besides the DataFrame and functions) that can be used in cached subexpressions
+CACHEABLE_NAMES = {DUNDER_DF, "_tol", "np", "pd", "nan"}
+
+# statistical functions of which the results are cached per dataset
+STATISTICAL_FUNCTIONS = ("mean", "std", "quantile")
+
+
+class CodeLowering(ast.NodeTransformer):
+    """
+    The CodeLowering object
+
+    Rewrites the syntax tree of the code generated by the RuleParser into
+    equivalent code that is cheaper to evaluate. The generated code itself
+    (as stored in the rules) is not changed, the rewriting is done when the
+    code is compiled by the CodeEvaluator.
+
+    Rewrites:
+    - `X.apply(_tol, args=("+", "key",))` to `_tol_vector(X, "+", "key")`, so
+      that tolerance bounds are calculated for a whole column at once instead
+      of per element
+    - `_df["A"].apply(_tol, args=("+", "key",))` to `_tol_column("A", "+", "key")`,
+      so that tolerance bounds of a column are calculated once per dataset
+    - string accessors with constant arguments on a column `_df["A"].str.slice(0, 3)`
+      (also chained, for example `_df["A"].str.split(",").str[0]`) to
+      `_str_column("A", lambda _values: _values.str.slice(0, 3))`, so that the
+      string operation is done on the unique values of the column only
+    - date parts of a column `_df["C"].dt.year` to `_dt_column("C", "year")` and
+      differences of date columns `(_df["C"] - _df["D"]) / np.timedelta64(1, "D")`
+      to `_timedelta_column("C", "D", "D")`, so that date columns are converted
+      and date parts and differences are calculated once per dataset
+    - the sums that the RuleParser generates for sum, sumif and countif, for
+      example `sum([K for K in [_df["A"], _df["B"]]], axis=0, dtype=float)` to
+      `_sum_rows([_df["A"], _df["B"]])`, `sum([K for K in [_df["A"].where(C,
+      other=0), ...]], ...)` and `sum([v.where(c, other=0) for (v,c) in zip(
+      [...], [...])], ...)` to `_sum_rows([_df["A"], ...], C)` (one condition)
+      or `_sum_rows([...], [C1, ...])` (a condition per value, also if the
+      conditions are identical while comparisons are logged), and the same
+      with `~v.where(c).isna()` to `_count_rows`, so that the values are
+      reduced as one 2-D array instead of per value in a list comprehension
+      (the comprehension is unrolled, so tolerance bounds of the columns are
+      also cached per dataset)
+    - if statistics is True: statistical functions `quantile(X, 0.95)` with
+      constant arguments to `_statistic("quantile", "X", lambda: X, 0.95)`,
+      so that statistics of the dataset are calculated once per dataset
+      instead of once per rule (the key is the code of X), and the same for
+      sums over the rows `sum([K for K in X], axis=0, dtype=float)` to
+      `_statistic("sum", "[K for K in X]", lambda: [K for K in X])`
+    - `pd.concat([X, Y], axis=1).apply(tuple, axis=1).isin(_table_T[["a", "b"]]
+      .apply(tuple, axis=1))` to `_in_table("T", ("a", "b"), [X, Y])`, so that
+      membership of rows in a table is checked with an index of the table
+      (built once) instead of with tuples of each row of the data and the table
+    - `pd.concat([X, Y], axis=1).apply(tuple, axis=1).isin([[1, "a"], [2, "b"]])`
+      to `_in_rows([X, Y], "[[1, 'a'], [2, 'b']]")`, so that membership of rows
+      in a constant list of rows is checked in the same way with an index of
+      the list (built once per list)
+    - if subexpressions is True: comparisons, tolerance bounds and outermost
+      binary operations X to `_sub("X", lambda: X)`, so that subexpressions
+      that are shared by rules are evaluated once per dataset (the key is the
+      code of the subexpression)
+    - if column_kinds is given: comparisons `ge(L, R, L+, L-, R+, R-)` of which
+      the kinds of the operands are known to `L >= R` (if an operand is a
+      string, boolean or datetime) or to `_ge_tol(L+, L-, R+, R-)` (otherwise),
+      so that the datatypes of the operands are not checked at each evaluation
+    - if column_kinds is given and dictionary is True: comparisons of a column
+      with a string `eq(_df["A"], "x")` (==, !=) to `_code_eq("A", "x")` and
+      `_df["A"].isin(["x", "y"])` to `_code_isin("A", ["x", "y"])`, so that
+      the strings of the column are compared as integer codes of the unique
+      values of the column
+    - if column_kinds is given and numexpr is True: arithmetic (+, -, *, /),
+      comparisons and logical operations (&, |, ~) on numeric columns and
+      numeric constants to a single `_numexpr("expression", {"v0": "A"})`, so
+      that these are evaluated as one fused numexpr expression over the arrays
+      of the columns instead of a chain of pandas operations
+
+    The kinds of the columns that were used to dispatch comparisons and to fuse
+    expressions are kept in dependencies (None if nothing depends on them).
+
+    """
+
+    def __init__(
+        self,
+        subexpressions: bool = False,
+        column_kinds=None,
+        numexpr: bool = False,
+        statistics: bool = False,
+        dictionary: bool = False,
+    ):
+        """ """
+        self.subexpressions = subexpressions
+        self.dictionary = dictionary and column_kinds is not None
+        self.statistics = statistics
+        self.column_kinds = column_kinds
+        self.numexpr = numexpr and column_kinds is not None
+        self.dependencies = None
+        self.in_binary_operation = False
+
+    def lower(self, expression: str) -> ast.Expression:
+        """
+        Parse code and return the lowered syntax tree
+
+        Args:
+            expression (str): The code to be lowered.
+
+        Returns:
+            ast.Expression: The lowered syntax tree, ready to be compiled.
+
+        Raises:
+            SyntaxError: If the code cannot be parsed.
+        """
+        tree = ast.parse(expression, mode="eval")
+        tree = self.visit(tree)
+        return ast.fix_missing_locations(tree)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        """ """
+        # identical conditions are only merged if comparisons are not logged
+        # (the comparisons of each condition are logged otherwise)
+        reduction = reduction_call(node, merge=self.column_kinds is not None)
+        if reduction is not None:
+            if len(reduction.args) > 1 and not isinstance(reduction.args[1], ast.List):
+                # the code is not valid if comparisons are logged later
+                if self.dependencies is None:
+                    self.dependencies = dict()
+            return self.visit(reduction)
+        if string_accessor_column(node) is not None:
+            return self.cached(self.subexpression_key(node), string_column(node))
+        key = None
+        dispatch = None
+        statistic = None
+        if isinstance(node.func, ast.Name) and node.func.id in COMPARISON_FUNCTIONS:
+            key = self.subexpression_key(node)
+            fused = self.fused(node)
+            if fused is not None:
+                return self.cached(key, fused)
+            dispatch = self.comparison_dispatch(node)
+        elif tolerance_apply_args(node) is not None:
+            key = self.subexpression_key(node)
+        elif table_membership_args(node) is not None:
+            key = self.subexpression_key(node)
+            node = ast.Call(
+                func=ast.Name(id="_in_table", ctx=ast.Load()),
+                args=table_membership_args(node),
+                keywords=[],
+            )
+        elif row_membership_args(node) is not None:
+            key = self.subexpression_key(node)
+            node = ast.Call(
+                func=ast.Name(id="_in_rows", ctx=ast.Load()),
+                args=row_membership_args(node),
+                keywords=[],
+            )
+        elif self.dictionary and dictionary_membership(node) is not None:
+            key = self.subexpression_key(node)
+        elif self.statistics:
+            statistic = self.statistic_key(node)
+        in_binary_operation = self.in_binary_operation
+        self.in_binary_operation = False
+        self.generic_visit(node)
+        self.in_binary_operation = in_binary_operation
+        if statistic is not None:
+            return ast.Call(
+                func=ast.Name(id="_statistic", ctx=ast.Load()),
+                args=[
+                    ast.Constant(value=node.func.id),
+                    ast.Constant(value=statistic),
+                    function_of_nothing(node.args[0]),
+                ]
+                + node.args[1:],
+                keywords=[],
+            )
+        if dispatch is not None:
+            tolerance, dependencies = dispatch
+            if self.dependencies is None:
+                self.dependencies = dict()
+            self.dependencies.update(dependencies)
+            if tolerance:
+                node = ast.Call(
+                    func=ast.Name(id="_" + node.func.id + "_tol", ctx=ast.Load()),
+                    args=node.args[2:6],
+                    keywords=[],
+                )
+            elif self.dictionary and dictionary_comparison(node) is not None:
+                node = dictionary_comparison(node)
+            else:
+                node = ast.Compare(
+                    left=node.args[0],
+                    ops=[COMPARISON_FUNCTIONS[node.func.id]()],
+                    comparators=[node.args[1]],
+                )
+            return self.cached(key, node)
+        if self.dictionary and dictionary_membership(node) is not None:
+            # the code depends on the dictionary encoding
+            if self.dependencies is None:
+                self.dependencies = dict()
+            return self.cached(key, dictionary_membership(node))
+        tolerance_args = tolerance_apply_args(node)
+        if tolerance_args is not None:
+            column = column_name(node.func.value)
+            if column is not None:
+                node = ast.Call(
+                    func=ast.Name(id="_tol_column", ctx=ast.Load()),
+                    args=[ast.Constant(value=column)] + tolerance_args,
+                    keywords=[],
+                )
+                # tolerance bounds of columns are already cached per dataset
+                key = None
+            else:
+                node = ast.Call(
+                    func=ast.Name(id="_tol_vector", ctx=ast.Load()),
+                    args=[node.func.value] + tolerance_args,
+                    keywords=[],
+                )
+        return self.cached(key, node)
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        """ """
+        if string_accessor_column(node) is not None:
+            return self.cached(self.subexpression_key(node), string_column(node))
+        self.generic_visit(node)
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        """ """
+        column = date_part_column(node)
+        if column is not None:
+            return ast.Call(
+                func=ast.Name(id="_dt_column", ctx=ast.Load()),
+                args=[ast.Constant(value=column), ast.Constant(value=node.attr)],
+                keywords=[],
+            )
+        self.generic_visit(node)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        """ """
+        args = timedelta_args(node)
+        if args is not None:
+            return ast.Call(
+                func=ast.Name(id="_timedelta_column", ctx=ast.Load()),
+                args=[ast.Constant(value=arg) for arg in args],
+                keywords=[],
+            )
+        key = None
+        if not self.in_binary_operation:
+            key = self.subexpression_key(node)
+        fused = self.fused(node)
+        if fused is not None:
+            return self.cached(key, fused)
+        in_binary_operation = self.in_binary_operation
+        self.in_binary_operation = True
+        self.generic_visit(node)
+        self.in_binary_operation = in_binary_operation
+        return self.cached(key, node)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        """ """
+        fused = self.fused(node)
+        if fused is not None:
+            return self.cached(self.subexpression_key(node), fused)
+        self.generic_visit(node)
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        """ """
+        if not self.in_binary_operation:
+            fused = self.fused(node)
+            if fused is not None:
+                return self.cached(self.subexpression_key(node), fused)
+        self.generic_visit(node)
+        return node
+
+    def fused(self, node: ast.AST):
+        """
+        Returns the node as a fused numexpr expression, or None if the node
+        cannot be (or is not worth being) evaluated with numexpr
+
+        """
+        if not self.numexpr:
+            return None
+        columns = dict()
+        dependencies = dict()
+        result = self.numexpr_expression(node, columns, dependencies)
+        if (
+            result is None
+            or len(columns) == 0
+            or not isinstance(node, (ast.BinOp, ast.Compare, ast.UnaryOp, ast.Call))
+        ):
+            return None
+        expression, _ = result
+        if self.dependencies is None:
+            self.dependencies = dict()
+        self.dependencies.update(dependencies)
+        return ast.Call(
+            func=ast.Name(id="_numexpr", ctx=ast.Load()),
+            args=[
+                ast.Constant(value=expression),
+                ast.Dict(
+                    keys=[ast.Constant(value=name) for name in columns.values()],
+                    values=[ast.Constant(value=column) for column in columns.keys()],
+                ),
+            ],
+            keywords=[],
+        )
+
+    def numexpr_expression(self, node: ast.AST, columns: dict, dependencies: dict):
+        """
+        Returns the numexpr expression of a node and whether its result is a
+        number or a boolean, or None if the node cannot be evaluated with numexpr
+
+        Numeric columns are replaced by variables (v0, v1, ...), that are added
+        to columns, the kinds of the columns are added to dependencies.
+        """
+        column = column_name(node)
+        if column is not None:
+            if self.column_kinds(column) != KIND_NUMERIC:
+                return None
+            dependencies[column] = KIND_NUMERIC
+            if column not in columns:
+                columns[column] = "v" + str(len(columns))
+            return columns[column], "number"
+        if isinstance(node, ast.Constant):
+            if (
+                isinstance(node.value, (int, float))
+                and not isinstance(node.value, bool)
+                and abs(node.value) < 2**63
+            ):
+                return repr(node.value), "number"
+            return None
+        if isinstance(node, ast.UnaryOp):
+            operand = self.numexpr_expression(node.operand, columns, dependencies)
+            if operand is None:
+                return None
+            if isinstance(node.op, ast.USub) and operand[1] == "number":
+                return "(-" + operand[0] + ")", "number"
+            if isinstance(node.op, ast.Invert) and operand[1] == "boolean":
+                return "(~" + operand[0] + ")", "boolean"
+            return None
+        if isinstance(node, ast.BinOp):
+            if type(node.op) in NUMEXPR_ARITHMETIC_OPERATORS:
+                operator, operand_type = (
+                    NUMEXPR_ARITHMETIC_OPERATORS[type(node.op)],
+                    "number",
+                )
+            elif type(node.op) in NUMEXPR_LOGICAL_OPERATORS:
+                operator, operand_type = (
+                    NUMEXPR_LOGICAL_OPERATORS[type(node.op)],
+                    "boolean",
+                )
+            else:
+                return None
+            left = self.numexpr_expression(node.left, columns, dependencies)
+            right = self.numexpr_expression(node.right, columns, dependencies)
+            if left is None or right is None:
+                return None
+            if left[1] != operand_type or right[1] != operand_type:
+                return None
+            return "(" + left[0] + " " + operator + " " + right[0] + ")", operand_type
+        if isinstance(node, ast.Compare):
+            if len(node.ops) != 1 or type(node.ops[0]) not in (
+                NUMEXPR_COMPARISON_OPERATORS
+            ):
+                return None
+            return self.numexpr_comparison(
+                node.left,
+                node.comparators[0],
+                NUMEXPR_COMPARISON_OPERATORS[type(node.ops[0])],
+                columns,
+                dependencies,
+            )
+        if isinstance(node, ast.Call) and (
+            isinstance(node.func, ast.Name) and node.func.id in COMPARISON_FUNCTIONS
+        ):
+            # only comparisons without tolerance
+            dispatch = self.comparison_dispatch(node)
+            if dispatch is None or dispatch[0]:
+                return None
+            dependencies.update(dispatch[1])
+            return self.numexpr_comparison(
+                node.args[0],
+                node.args[1],
+                NUMEXPR_COMPARISON_OPERATORS[COMPARISON_FUNCTIONS[node.func.id]],
+                columns,
+                dependencies,
+            )
+        return None
+
+    def numexpr_comparison(
+        self,
+        left: ast.AST,
+        right: ast.AST,
+        operator: str,
+        columns: dict,
+        dependencies: dict,
+    ):
+        """
+        Returns the numexpr expression of a comparison of two numbers, or None
+        """
+        left = self.numexpr_expression(left, columns, dependencies)
+        right = self.numexpr_expression(right, columns, dependencies)
+        if left is None or right is None:
+            return None
+        if left[1] != "number" or right[1] != "number":
+            return None
+        return "(" + left[0] + " " + operator + " " + right[0] + ")", "boolean"
+
+    def comparison_dispatch(self, node: ast.Call):
+        """
+        Returns how a comparison is evaluated given the kinds of its operands,
+        or None if this is only known at evaluation
+
+        Returns:
+            tuple: True if the comparison is evaluated with tolerance and False
+            if not, and the kinds of the columns this depends on.
+        """
+        if (
+            self.column_kinds is None
+            or len(node.keywords) > 0
+            or len(node.args) not in (2, 6)
+            or any(isinstance(arg, ast.Starred) for arg in node.args)
+        ):
+            return None
+        left_kind, left_dependencies = self.operand_kind(node.args[0])
+        if left_kind == KIND_NO_TOLERANCE:
+            return False, left_dependencies
+        right_kind, right_dependencies = self.operand_kind(node.args[1])
+        if right_kind == KIND_NO_TOLERANCE:
+            return False, right_dependencies
+        if left_kind is None or right_kind is None:
+            return None
+        tolerance = len(node.args) == 6 and not all(
+            isinstance(arg, ast.Constant) and arg.value is None
+            for arg in node.args[2:6]
+        )
+        return tolerance, {**left_dependencies, **right_dependencies}
+
+    def operand_kind(self, node: ast.AST) -> tuple:
+        """
+        Returns the kind of an operand of a comparison (None if unknown) and
+        the kinds of the columns this depends on
+
+        """
+        column = column_name(node)
+        if column is not None:
+            kind = self.column_kinds(column)
+            if kind is None:
+                return None, {}
+            return kind, {column: kind}
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (str, bool)):
+                return KIND_NO_TOLERANCE, {}
+            if isinstance(node.value, (int, float)):
+                return KIND_NUMERIC, {}
+            return None, {}
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            kind, dependencies = self.operand_kind(node.operand)
+            if kind == KIND_NUMERIC:
+                return kind, dependencies
+            return None, {}
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ARITHMETIC_OPERATORS):
+            left_kind, left_dependencies = self.operand_kind(node.left)
+            right_kind, right_dependencies = self.operand_kind(node.right)
+            if left_kind == KIND_NUMERIC and right_kind == KIND_NUMERIC:
+                return KIND_NUMERIC, {**left_dependencies, **right_dependencies}
+        return None, {}
+
+    def statistic_key(self, node: ast.Call):
+        """
+        Returns the key of the values of a statistical function in the
+        statistics cache, or None if the result should not be cached
+
+        The result is only cached if the values depend on the DataFrame only
+        and the other arguments (for example the quantile) are constants
+        """
+        values = row_sum_values(node)
+        if values is not None:
+            return row_sum_key(values)
+        if (
+            not isinstance(node.func, ast.Name)
+            or node.func.id not in STATISTICAL_FUNCTIONS
+            or len(node.keywords) > 0
+            or len(node.args) == 0
+            or any(isinstance(arg, ast.Starred) for arg in node.args)
+        ):
+            return None
+        for arg in node.args[1:]:
+            try:
+                ast.literal_eval(arg)
+            except ValueError:
+                return None
+        return dataset_key(node.args[0])
+
+    def subexpression_key(self, node: ast.AST):
+        """
+        Returns the key of a subexpression in the subexpression cache, or None
+        if the subexpression should not be cached
+
+        A subexpression is only cached if it depends on the DataFrame and on
+        nothing else than functions and tables of the evaluator (so for example
+        not on variables of comprehensions)
+        """
+        if not self.subexpressions:
+            return None
+        return dataset_key(node)
+
+    def cached(self, key, node: ast.AST) -> ast.AST:
+        """
+        Returns the node wrapped in a lookup in the subexpression cache if the
+        key is not None
+        """
+        if key is None:
+            return node
+        return ast.Call(
+            func=ast.Name(id="_sub", ctx=ast.Load()),
+            args=[ast.Constant(value=key), function_of_nothing(node)],
+            keywords=[],
+        )
+
+
+def dataset_key(node: ast.AST):
+    """
+    Returns the code of a node if its value depends on the DataFrame and on
+    nothing else than functions and tables of the evaluator, or None
+
+    Example:
+        node = ast.parse('_df["A"] + 1').body
+
+        print(dataset_key(node))
+
+            _df['A'] + 1
+    """
+    function_names = set(
+        child.func.id
+        for child in ast.walk(node)
+        if isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+    )
+    for child in ast.walk(node):
+        if isinstance(
+            child,
+            (
+                ast.Lambda,
+                ast.NamedExpr,
+                ast.ListComp,
+                ast.SetComp,
+                ast.DictComp,
+                ast.GeneratorExp,
+            ),
+        ):
+            return None
+        if isinstance(child, ast.Name) and not (
+            child.id in CACHEABLE_NAMES
+            or child.id in function_names
+            or child.id.startswith("_table_")
+        ):
+            return None
+    if not any(
+        isinstance(child, ast.Name) and child.id == DUNDER_DF
+        for child in ast.walk(node)
+    ):
+        # subexpressions that do not depend on the data are cheap
+        return None
+    return ast.unparse(node)
+
+
+def function_of_nothing(node: ast.AST) -> ast.Lambda:
+    """
+    Returns a lambda without arguments that returns the value of the node
+
+    Example:
+        node = ast.parse('_df["A"]').body
+
+        print(ast.unparse(function_of_nothing(node)))
+
+            lambda: _df['A']
+    """
+    return ast.Lambda(
+        args=ast.arguments(
+            posonlyargs=[],
+            args=[],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        ),
+        body=node,
+    )
+
+
+def column_name(node: ast.AST):
+    """
+    Returns the column name if the node is a column of the DataFrame or None
+
+    Example:
+        node = ast.parse('_df["A"]').body
+
+        print(column_name(node))
+
+            "A"
+    """
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == DUNDER_DF
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+    return None
+
+
+def date_part_column(node: ast.AST):
+    """
+    Returns the column name if the node is a date part of a column of the
+    DataFrame `_df["C"].dt.year` or None
+    """
+    if (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Attribute)
+        and node.value.attr == "dt"
+    ):
+        return column_name(node.value.value)
+    return None
+
+
+def timedelta_args(node: ast.AST):
+    """
+    Returns the columns and the unit if the node is the difference of two
+    columns of the DataFrame in a unit of time or None
+
+    Example:
+        node = ast.parse('(_df["C"] - _df["D"]) / np.timedelta64(1, "D")').body
+
+        print(timedelta_args(node))
+
+            ("C", "D", "D")
+    """
+    if not (
+        isinstance(node, ast.BinOp)
+        and isinstance(node.op, ast.Div)
+        and isinstance(node.left, ast.BinOp)
+        and isinstance(node.left.op, ast.Sub)
+        and column_name(node.left.left) is not None
+        and column_name(node.left.right) is not None
+    ):
+        return None
+    unit = node.right
+    if (
+        isinstance(unit, ast.Call)
+        and isinstance(unit.func, ast.Attribute)
+        and unit.func.attr == "timedelta64"
+        and isinstance(unit.func.value, ast.Name)
+        and unit.func.value.id == "np"
+        and len(unit.args) == 2
+        and len(unit.keywords) == 0
+        and isinstance(unit.args[0], ast.Constant)
+        and unit.args[0].value == 1
+        and isinstance(unit.args[1], ast.Constant)
+        and isinstance(unit.args[1].value, str)
+    ):
+        return (
+            column_name(node.left.left),
+            column_name(node.left.right),
+            unit.args[1].value,
+        )
+    return None
+
+
+def string_accessor_column(node: ast.AST):
+    """
+    Returns the column name if the node is a chain of string accessors with
+    constant arguments on a column of the DataFrame or None
+
+    Example:
+        node = ast.parse('_df["A"].str.split(",").str[0]').body
+
+        print(string_accessor_column(node))
+
+            "A"
+    """
+    if isinstance(node, ast.Call):
+        if not (
+            isinstance(node.func, ast.Attribute)
+            and is_string_accessor(node.func.value)
+            and all(is_constant(arg) for arg in node.args)
+            and all(
+                keyword.arg is not None and is_constant(keyword.value)
+                for keyword in node.keywords
+            )
+        ):
+            return None
+        values = node.func.value.value
+    elif isinstance(node, ast.Subscript):
+        if not (is_string_accessor(node.value) and is_constant(node.slice)):
+            return None
+        values = node.value.value
+    else:
+        return None
+    column = column_name(values)
+    if column is not None:
+        return column
+    return string_accessor_column(values)
+
+
+def string_column(node: ast.AST) -> ast.Call:
+    """
+    Returns the call of `_str_column` of a chain of string accessors on a
+    column, in which the column is replaced by the argument of a lambda
+
+    Example:
+        node = ast.parse('_df["A"].str.slice(0, 3)').body
+
+        print(ast.unparse(string_column(node)))
+
+            _str_column('A', lambda _values: _values.str.slice(0, 3))
+    """
+    column = string_accessor_column(node)
+
+    def replace_column(node: ast.AST) -> ast.AST:
+        if column_name(node) is not None:
+            return ast.Name(id="_values", ctx=ast.Load())
+        if isinstance(node, ast.Call):
+            return ast.Call(
+                func=ast.Attribute(
+                    value=ast.Attribute(
+                        value=replace_column(node.func.value.value),
+                        attr="str",
+                        ctx=ast.Load(),
+                    ),
+                    attr=node.func.attr,
+                    ctx=ast.Load(),
+                ),
+                args=node.args,
+                keywords=node.keywords,
+            )
+        return ast.Subscript(
+            value=ast.Attribute(
+                value=replace_column(node.value.value), attr="str", ctx=ast.Load()
+            ),
+            slice=node.slice,
+            ctx=ast.Load(),
+        )
+
+    return ast.Call(
+        func=ast.Name(id="_str_column", ctx=ast.Load()),
+        args=[
+            ast.Constant(value=column),
+            ast.Lambda(
+                args=ast.arguments(
+                    posonlyargs=[],
+                    args=[ast.arg(arg="_values")],
+                    kwonlyargs=[],
+                    kw_defaults=[],
+                    defaults=[],
+                ),
+                body=replace_column(node),
+            ),
+        ],
+        keywords=[],
+    )
+
+
+def is_string_accessor(node: ast.AST) -> bool:
+    """
+    Returns whether the node is the string accessor `X.str`
+    """
+    return isinstance(node, ast.Attribute) and node.attr == "str"
+
+
+def is_constant(node: ast.AST) -> bool:
+    """
+    Returns whether the node is a constant (for example a number, a string or
+    a list or slice of constants)
+    """
+    if isinstance(node, ast.Slice):
+        return all(
+            part is None or is_constant(part)
+            for part in (node.lower, node.upper, node.step)
+        )
+    try:
+        ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return False
+    return True
+
+
+def reduction_call(node: ast.AST, merge: bool = True):
+    """
+    Returns the call of `_sum_rows` or `_count_rows` of a sum that is generated
+    by the RuleParser for sum, sumif and countif, or None
+
+    If merge is True then identical conditions of the values are merged into
+    one condition that applies to all values (evaluated once).
+
+    Example:
+        node = ast.parse(
+            'sum([K.where(_df["C"] > 0, other=0) for K in [_df["A"], _df["B"]]]'
+            ', axis=0, dtype=float)'
+        ).body
+
+        print(ast.unparse(reduction_call(node)))
+
+            _sum_rows([_df['A'], _df['B']], _df['C'] > 0)
+    """
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "sum"
+        and len(node.args) == 1
+        and {keyword.arg: ast.unparse(keyword.value) for keyword in node.keywords}
+        == {"axis": "0", "dtype": "float"}
+    ):
+        return None
+    function = "_sum_rows"
+    conditions = None
+    arg = node.args[0]
+    if (
+        isinstance(arg, ast.ListComp)
+        and len(arg.generators) == 1
+        and isinstance(arg.generators[0].target, ast.Tuple)
+    ):
+        # sum([v.where(c, other=0) for (v,c) in zip([...], [...])], ...)
+        generator = arg.generators[0]
+        names = [
+            element.id
+            for element in generator.target.elts
+            if isinstance(element, ast.Name)
+        ]
+        if not (
+            len(names) == 2
+            and len(generator.ifs) == 0
+            and not generator.is_async
+            and isinstance(generator.iter, ast.Call)
+            and isinstance(generator.iter.func, ast.Name)
+            and generator.iter.func.id == "zip"
+            and len(generator.iter.args) == 2
+            and len(generator.iter.keywords) == 0
+        ):
+            return None
+        values = list_items(generator.iter.args[0])
+        conditions = list_items(generator.iter.args[1])
+        if values is None or conditions is None:
+            return None
+        size = min(len(values), len(conditions))
+        values, conditions = values[:size], conditions[:size]
+        if where_args(arg.elt, other=True) is not None:
+            element = where_args(arg.elt, other=True)
+        elif count_args(arg.elt) is not None:
+            element = count_args(arg.elt)
+            function = "_count_rows"
+        else:
+            return None
+        if [ast.unparse(part) for part in element] != names:
+            return None
+    else:
+        # sum([K for K in [...]], ...), with K.where(C, other=0) or
+        # ~K.where(C).isna() as items for sumif and countif
+        items = list_items(arg)
+        if items is None:
+            return None
+        values = items
+        if len(items) > 0 and all(
+            where_args(item, other=True) is not None for item in items
+        ):
+            values = [where_args(item, other=True)[0] for item in items]
+            conditions = [where_args(item, other=True)[1] for item in items]
+        elif len(items) > 0 and all(count_args(item) is not None for item in items):
+            values = [count_args(item)[0] for item in items]
+            conditions = [count_args(item)[1] for item in items]
+            function = "_count_rows"
+    args = [ast.List(elts=values, ctx=ast.Load())]
+    if conditions is not None:
+        if merge and len(set(ast.unparse(condition) for condition in conditions)) == 1:
+            # a single condition that applies to all values
+            args.append(conditions[0])
+        else:
+            args.append(ast.List(elts=conditions, ctx=ast.Load()))
+    return ast.Call(func=ast.Name(id=function, ctx=ast.Load()), args=args, keywords=[])
+
+
+def row_sum_values(node: ast.AST):
+    """
+    Returns the list comprehension of a sum over the rows that is generated by
+    the RuleParser for sum of a column, or None
+
+    Sums of lists of values (per row) and of sumif and countif (a zip of lists)
+    are not sums over the rows.
+
+    Example:
+        node = ast.parse('sum([K for K in _df["A"]], axis=0, dtype=float)').body
+
+        print(ast.unparse(row_sum_values(node)))
+
+            [K for K in _df['A']]
+    """
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "sum"
+        and len(node.args) == 1
+        and {keyword.arg: ast.unparse(keyword.value) for keyword in node.keywords}
+        == {"axis": "0", "dtype": "float"}
+        and isinstance(node.args[0], ast.ListComp)
+        and len(node.args[0].generators) == 1
+    ):
+        return None
+    generator = node.args[0].generators[0]
+    if (
+        not isinstance(generator.target, ast.Name)
+        or len(generator.ifs) > 0
+        or generator.is_async
+        or isinstance(generator.iter, ast.List)
+        or (
+            isinstance(generator.iter, ast.Call)
+            and isinstance(generator.iter.func, ast.Name)
+            and generator.iter.func.id == "zip"
+        )
+    ):
+        return None
+    return node.args[0]
+
+
+def row_sum_key(node: ast.ListComp):
+    """
+    Returns the code of the values of a sum over the rows if they depend on the
+    DataFrame and on nothing else than the variable of the comprehension,
+    functions and tables of the evaluator, or None
+    """
+    generator = node.generators[0]
+    if dataset_key(generator.iter) is None:
+        return None
+    function_names = set(
+        child.func.id
+        for child in ast.walk(node.elt)
+        if isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+    )
+    for child in ast.walk(node.elt):
+        if isinstance(
+            child,
+            (
+                ast.Lambda,
+                ast.NamedExpr,
+                ast.ListComp,
+                ast.SetComp,
+                ast.DictComp,
+                ast.GeneratorExp,
+            ),
+        ):
+            return None
+        if isinstance(child, ast.Name) and not (
+            child.id == generator.target.id
+            or child.id in CACHEABLE_NAMES
+            or child.id in function_names
+            or child.id.startswith("_table_")
+        ):
+            return None
+    return ast.unparse(node)
+
+
+def list_items(node: ast.AST):
+    """
+    Returns the items of a list or of a list comprehension over a list (with
+    the variable replaced by each item of the list), or None
+
+    Example:
+        node = ast.parse('[K + 1 for K in [_df["A"], _df["B"]]]').body
+
+        print([ast.unparse(item) for item in list_items(node)])
+
+            ["_df['A'] + 1", "_df['B'] + 1"]
+    """
+    if isinstance(node, ast.List):
+        if any(isinstance(item, ast.Starred) for item in node.elts):
+            return None
+        return [copy.deepcopy(item) for item in node.elts]
+    if not (
+        isinstance(node, ast.ListComp)
+        and len(node.generators) == 1
+        and isinstance(node.generators[0].target, ast.Name)
+        and len(node.generators[0].ifs) == 0
+        and not node.generators[0].is_async
+        and isinstance(node.generators[0].iter, ast.List)
+    ):
+        return None
+    name = node.generators[0].target.id
+    items = node.generators[0].iter.elts
+    if any(isinstance(item, ast.Starred) for item in items) or any(
+        isinstance(
+            child,
+            (
+                ast.Lambda,
+                ast.NamedExpr,
+                ast.ListComp,
+                ast.SetComp,
+                ast.DictComp,
+                ast.GeneratorExp,
+            ),
+        )
+        for child in ast.walk(node.elt)
+    ):
+        # the variable may be bound again in the element
+        return None
+    uses = sum(
+        isinstance(child, ast.Name) and child.id == name for child in ast.walk(node.elt)
+    )
+    if uses > 1 and not all(
+        column_name(item) is not None or is_constant(item) for item in items
+    ):
+        # items that are expressions are not evaluated more than once
+        return None
+
+    class ReplaceName(ast.NodeTransformer):
+        def __init__(self, item: ast.AST):
+            self.item = item
+
+        def visit_Name(self, child: ast.Name) -> ast.AST:
+            if child.id == name:
+                return copy.deepcopy(self.item)
+            return child
+
+    return [ReplaceName(item).visit(copy.deepcopy(node.elt)) for item in items]
+
+
+def where_args(node: ast.AST, other: bool):
+    """
+    Returns the values and the condition of `V.where(C, other=0)` (if other is
+    True) or `V.where(C)` (otherwise), or None
+    """
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "where"
+        and len(node.args) == 1
+        and not isinstance(node.args[0], ast.Starred)
+        and (
+            [(keyword.arg, ast.unparse(keyword.value)) for keyword in node.keywords]
+            == ([("other", "0")] if other else [])
+        )
+    ):
+        return node.func.value, node.args[0]
+    return None
+
+
+def count_args(node: ast.AST):
+    """
+    Returns the values and the condition of `~V.where(C).isna()`, or None
+    """
+    if (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.Invert)
+        and isinstance(node.operand, ast.Call)
+        and isinstance(node.operand.func, ast.Attribute)
+        and node.operand.func.attr == "isna"
+        and len(node.operand.args) == 0
+        and len(node.operand.keywords) == 0
+    ):
+        return where_args(node.operand.func.value, other=False)
+    return None
+
+
+def tolerance_apply_args(node: ast.AST):
+    """
+    Returns the arguments of a tolerance apply or None
+
+    Example:
+        node = ast.parse('_df["A"].apply(_tol, args=("+", "default",))').body
+
+        print(tolerance_apply_args(node))
+
+            [Constant("+"), Constant("default")]
+    """
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "apply"
+        and len(node.args) == 1
+        and isinstance(node.args[0], ast.Name)
+        and node.args[0].id == "_tol"
+        and len(node.keywords) == 1
+        and node.keywords[0].arg == "args"
+        and isinstance(node.keywords[0].value, ast.Tuple)
+        and len(node.keywords[0].value.elts) == 2
+    ):
+        return list(node.keywords[0].value.elts)
+    return None
+
+
+def dictionary_comparison(node: ast.Call):
+    """
+    Returns the comparison of a column with a string as comparison of codes
+    `_code_eq("A", "x")` or `_code_ne("A", "x")`, or None
+
+    Example:
+        node = ast.parse('eq(_df["A"], "x")').body
+
+        print(ast.unparse(dictionary_comparison(node)))
+
+            _code_eq('A', 'x')
+    """
+    if node.func.id not in ("eq", "ne") or len(node.args) < 2:
+        return None
+    for column, value in (node.args[:2], node.args[1::-1]):
+        if (
+            column_name(column) is not None
+            and isinstance(value, ast.Constant)
+            and isinstance(value.value, str)
+        ):
+            return ast.Call(
+                func=ast.Name(id="_code_" + node.func.id, ctx=ast.Load()),
+                args=[ast.Constant(value=column_name(column)), value],
+                keywords=[],
+            )
+    return None
+
+
+def dictionary_membership(node: ast.Call):
+    """
+    Returns the membership of a column in a list of strings as membership of
+    codes `_code_isin("A", ["x", "y"])`, or None
+
+    Example:
+        node = ast.parse('_df["A"].isin(["x", "y"])').body
+
+        print(ast.unparse(dictionary_membership(node)))
+
+            _code_isin('A', ['x', 'y'])
+    """
+    if (
+        isinstance(node.func, ast.Attribute)
+        and node.func.attr == "isin"
+        and column_name(node.func.value) is not None
+        and len(node.args) == 1
+        and len(node.keywords) == 0
+        and isinstance(node.args[0], ast.List)
+        and all(
+            isinstance(elt, ast.Constant) and isinstance(elt.value, str)
+            for elt in node.args[0].elts
+        )
+    ):
+        return ast.Call(
+            func=ast.Name(id="_code_isin", ctx=ast.Load()),
+            args=[ast.Constant(value=column_name(node.func.value)), node.args[0]],
+            keywords=[],
+        )
+    return None
+
+
+def tuple_columns(node: ast.AST):
+    """
+    Returns the columns of which rows are converted to tuples or None
+
+    Example:
+        node = ast.parse('pd.concat([_df["A"], _df["B"]], axis=1)'
+                         '.apply(tuple, axis=1)').body
+
+        print(tuple_columns(node))
+
+            [Subscript(_df["A"]), Subscript(_df["B"])]
+    """
+    if not is_tuple_apply(node):
+        return None
+    node = node.func.value
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "concat"
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == "pd"
+        and len(node.args) == 1
+        and isinstance(node.args[0], ast.List)
+        and len(node.args[0].elts) > 0
+        and not any(isinstance(elt, ast.Starred) for elt in node.args[0].elts)
+        and len(node.keywords) == 1
+        and node.keywords[0].arg == "axis"
+        and isinstance(node.keywords[0].value, ast.Constant)
+        and node.keywords[0].value.value == 1
+    ):
+        return list(node.args[0].elts)
+    return None
+
+
+def table_membership_args(node: ast.AST):
+    """
+    Returns the arguments of `_in_table` if the node checks whether rows of
+    columns are rows of a table or None
+
+    Example:
+        node = ast.parse('pd.concat([_df["A"]], axis=1).apply(tuple, axis=1)'
+                         '.isin(_table_T[["a"]].apply(tuple, axis=1))').body
+
+        print(table_membership_args(node))
+
+            [Constant("T"), Tuple(Constant("a")), List(Subscript(_df["A"]))]
+    """
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "isin"
+        and len(node.args) == 1
+        and len(node.keywords) == 0
+        and is_tuple_apply(node.args[0])
+    ):
+        return None
+    values = tuple_columns(node.func.value)
+    table = node.args[0].func.value
+    if (
+        values is None
+        or not isinstance(table, ast.Subscript)
+        or not isinstance(table.value, ast.Name)
+        or not table.value.id.startswith("_table_")
+        or not isinstance(table.slice, ast.List)
+        or len(table.slice.elts) != len(values)
+        or not all(
+            isinstance(elt, ast.Constant) and isinstance(elt.value, str)
+            for elt in table.slice.elts
+        )
+    ):
+        return None
+    return [
+        ast.Constant(value=table.value.id[len("_table_") :]),
+        ast.Tuple(elts=table.slice.elts, ctx=ast.Load()),
+        ast.List(elts=values, ctx=ast.Load()),
+    ]
+
+
+def row_membership_args(node: ast.AST):
+    """
+    Returns the arguments of `_in_rows` if the node checks whether rows of
+    columns are in a constant list of rows or None
+
+    Example:
+        node = ast.parse('pd.concat([_df["A"]], axis=1).apply(tuple, axis=1)'
+                         '.isin([[1], [2]])').body
+
+        print(row_membership_args(node))
+
+            [List(Subscript(_df["A"])), Constant("[[1], [2]]")]
+    """
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "isin"
+        and len(node.args) == 1
+        and len(node.keywords) == 0
+    ):
+        return None
+    values = tuple_columns(node.func.value)
+    if values is None:
+        return None
+    try:
+        rows = ast.literal_eval(node.args[0])
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+    if not isinstance(rows, (list, tuple)) or not all(
+        isinstance(row, (list, tuple)) and len(row) == len(values) for row in rows
+    ):
+        return None
+    return [
+        ast.List(elts=values, ctx=ast.Load()),
+        ast.Constant(value=ast.unparse(node.args[0])),
+    ]
+
+
+def is_tuple_apply(node: ast.AST) -> bool:
+    """
+    Returns whether the node converts rows to tuples with
+    `X.apply(tuple, axis=1)`
+    """
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "apply"
+        and len(node.args) == 1
+        and isinstance(node.args[0], ast.Name)
+        and node.args[0].id == "tuple"
+        and len(node.keywords) == 1
+        and node.keywords[0].arg == "axis"
+        and isinstance(node.keywords[0].value, ast.Constant)
+        and node.keywords[0].value.value == 1
+    )
+
+
+def dataset_statistics(expression: str) -> list:
+    """
+    Returns the statistics of the dataset that the code uses, as tuples of the
+    statistical function, the key of the values and the other (constant)
+    arguments
+
+    These are the statistics over the rows (mean, std, quantile and sum) that the
+    lowered code looks up in the statistics cache of the evaluator, including
+    statistics of which the values contain other statistics (these are
+    returned after the statistics of the values).
+
+    Args:
+        expression (str): The code.
+
+    Returns:
+        list: The statistics of the dataset.
+
+    Raises:
+        Exception: If the result of a statistical function cannot be looked up
+        in the statistics cache (for example if its values depend on a variable
+        of a list comprehension).
+
+    Example:
+        print(dataset_statistics('_df["A"] > quantile(_df["A"], 0.95)'))
+
+            [('quantile', "_df['A']", (0.95,))]
+    """
+    tree = CodeLowering(statistics=True).lower(expression)
+    statistics = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+            continue
+        if node.func.id == "_statistic":
+            statistic = (
+                node.args[0].value,
+                node.args[1].value,
+                tuple(ast.literal_eval(arg) for arg in node.args[3:]),
+            )
+            if statistic not in statistics:
+                statistics.append(statistic)
+        elif node.func.id in STATISTICAL_FUNCTIONS or row_sum_values(node) is not None:
+            raise Exception(
+                "Statistic in '" + ast.unparse(node) + "' cannot be calculated "
+                "for the dataset."
+            )
+    # ast.walk visits the outer statistics first
+    return statistics[::-1]
@@ -0,0 +1,120 @@
+"""Membership module."""
+
+import numpy as np
+import pandas as pd
+
+# maximum of combined keys, larger keys are factorized again
+MAX_KEY = 2**62
+
+
+class TableIndex:
+    """
+    The TableIndex object
+
+    An index of the rows of a table to check whether rows of values (for
+    example of columns of a DataFrame) are rows of the table, without building
+    a tuple for each row.
+
+    The values of each column of the table are factorized once into codes
+    (positions in the unique values of the column). To check a set of columns,
+    the codes of the columns are combined into one int64 key per row and the
+    sorted unique keys of the table are kept (once per set of columns). Values
+    are looked up in the unique values of each column, combined in the same
+    way and searched in the keys of the table. Missing values (None and nan)
+    in the values are equal to missing values in the table.
+
+    Example:
+        index = TableIndex(pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}))
+        values = [pd.Series([1, 1, 2]), pd.Series(["x", "y", "y"])]
+
+        print(index.isin(("a", "b"), values))
+
+            [ True False  True]
+    """
+
+    __slots__ = ("size", "uniques", "codes", "missing", "keys")
+
+    def __init__(self, table: pd.DataFrame):
+        """ """
+        self.size = len(table)
+        self.uniques = dict()
+        self.codes = dict()
+        self.missing = dict()
+        self.keys = dict()
+        for column in table.columns:
+            codes, uniques = pd.factorize(table[column], use_na_sentinel=False)
+            uniques = pd.Index(uniques)
+            missing = np.flatnonzero(pd.isna(uniques))
+            self.uniques[column] = uniques
+            self.codes[column] = codes.astype(np.int64)
+            self.missing[column] = missing[0] if len(missing) > 0 else -1
+
+    def column_codes(self, column, values) -> np.ndarray:
+        """
+        Returns the codes of values in the unique values of a column of the
+        table (-1 if a value is not in the column)
+        """
+        codes = self.uniques[column].get_indexer(values)
+        if self.missing[column] >= 0:
+            codes[np.asarray(pd.isna(values))] = self.missing[column]
+        return codes
+
+    def table_keys(self, columns: tuple) -> tuple:
+        """
+        Returns the sorted unique keys of the rows of the table in the columns
+        and the steps to combine codes of values into these keys
+
+        Returns:
+            tuple: The keys and per column None or the index of the keys if
+            the keys are factorized before this column (to keep them within
+            int64) and the size with which the keys are multiplied before the
+            codes of the column are added.
+        """
+        entry = self.keys.get(columns, None)
+        if entry is not None:
+            return entry
+        steps = []
+        keys = np.zeros(self.size, dtype=np.int64)
+        bound = 1
+        for column in columns:
+            uniques = None
+            size = len(self.uniques[column])
+            if bound * size > MAX_KEY:
+                codes, uniques = pd.factorize(keys)
+                keys = codes.astype(np.int64)
+                uniques = pd.Index(uniques)
+                bound = len(uniques)
+            keys = keys * size + self.codes[column]
+            bound *= size
+            steps.append((uniques, size))
+        entry = (np.unique(keys), steps)
+        self.keys[columns] = entry
+        return entry
+
+    def isin(self, columns: tuple, values: list) -> np.ndarray:
+        """
+        Returns whether the rows of values are rows of the table in the columns
+
+        Args:
+            columns (tuple): The columns of the table.
+            values (list): Per column of the table the values to check, all of
+            the same length.
+
+        Returns:
+            np.ndarray: A boolean mask of the rows of values in the table.
+        """
+        table_keys, steps = self.table_keys(columns)
+        found = np.ones(len(values[0]), dtype=bool)
+        keys = np.zeros(len(values[0]), dtype=np.int64)
+        if len(table_keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        for column, column_values, (uniques, size) in zip(columns, values, steps):
+            if uniques is not None:
+                keys = uniques.get_indexer(keys)
+                found &= keys >= 0
+            codes = self.column_codes(column, column_values)
+            found &= codes >= 0
+            keys = keys * size + codes
+        positions = np.searchsorted(table_keys, keys)
+        positions[positions == len(table_keys)] = 0
+        return found & (table_keys[positions] == keys)
@@ -18,8 +18,10 @@ from .const import VAR_N
 from .const import VAR_X_AND_Y
 from .const import VAR_X_AND_NOT_Y
 from .const import VAR_NOT_X_AND_NOT_Y
+from .bitset import Bitset
 
 import numpy as np
+import pandas as pd
 
 METRICS = {
     ABSOLUTE_SUPPORT: [VAR_X_AND_Y],
@@ -53,45 +55,84 @@ def metrics(metrics: list = []):
     return [metric for metric in metrics if metric in METRICS.keys()]
 
 
+def difference(a, b):
+    """
+    Rows in the result a that are not in the result b, where the results are
+    either labels of the DataFrame index or (packed) masks of the rows
+
+    """
+    if isinstance(a, pd.Index):
+        return a.difference(b)
+    return a & ~b
+
+
+def intersection(a, b):
+    """
+    Rows in both the result a and the result b, where the results are either
+    labels of the DataFrame index or (packed) masks of the rows
+
+    """
+    if isinstance(a, pd.Index):
+        return a.intersection(b)
+    return a & b
+
+
+def count(result) -> int:
+    """
+    Number of rows in the result of a variable, where the result is labels of
+    the DataFrame index, a Bitset or a boolean mask of the rows (NaN, i.e. a
+    result that could not be evaluated, has no rows)
+
+    """
+    if result is None or isinstance(result, float):
+        return 0
+    if isinstance(result, Bitset):
+        return result.count()
+    if isinstance(result, np.ndarray) and result.dtype == bool:
+        return int(np.count_nonzero(result))
+    return len(result)
+
+
 def add_required_variables(required_vars: list, results: dict) -> dict():
     """
-    Calculation of required variables based on indices of DataFrame
+    Calculation of required variables based on indices of DataFrame or on
+    (packed) masks of the rows of the DataFrame
 
     """
     if VAR_NOT_Y in required_vars:
         if not isinstance(results[VAR_N], float) and not isinstance(
             results[VAR_Y], float
         ):
-            results[VAR_NOT_Y] = results[VAR_N].difference(results[VAR_Y])
+            results[VAR_NOT_Y] = difference(results[VAR_N], results[VAR_Y])
         else:
             results[VAR_NOT_Y] = np.nan
     if VAR_NOT_X in required_vars:
         if not isinstance(results[VAR_N], float) and not isinstance(
             results[VAR_X], float
         ):
-            results[VAR_NOT_X] = results[VAR_N].difference(results[VAR_X])
+            results[VAR_NOT_X] = difference(results[VAR_N], results[VAR_X])
         else:
             results[VAR_NOT_X] = np.nan
     if VAR_X_AND_Y in required_vars:
         if not isinstance(results[VAR_X], float) and not isinstance(
             results[VAR_Y], float
         ):
-            results[VAR_X_AND_Y] = results[VAR_X].intersection(results[VAR_Y])
+            results[VAR_X_AND_Y] = intersection(results[VAR_X], results[VAR_Y])
         else:
             results[VAR_X_AND_Y] = np.nan
     if VAR_X_AND_NOT_Y in required_vars:
         if not isinstance(results[VAR_X], float) and not isinstance(
             results[VAR_NOT_Y], float
         ):
-            results[VAR_X_AND_NOT_Y] = results[VAR_X].intersection(results[VAR_NOT_Y])
+            results[VAR_X_AND_NOT_Y] = intersection(results[VAR_X], results[VAR_NOT_Y])
         else:
             results[VAR_X_AND_NOT_Y] = np.nan
     if VAR_NOT_X_AND_NOT_Y in required_vars:
         if not isinstance(results[VAR_NOT_X], float) and not isinstance(
             results[VAR_NOT_Y], float
         ):
-            results[VAR_NOT_X_AND_NOT_Y] = results[VAR_NOT_X].intersection(
-                results[VAR_NOT_Y]
+            results[VAR_NOT_X_AND_NOT_Y] = intersection(
+                results[VAR_NOT_X], results[VAR_NOT_Y]
             )
         else:
             results[VAR_NOT_X_AND_NOT_Y] = np.nan
@@ -1,9 +1,11 @@
 """Pandas parser module."""
 
 import re
+import numpy as np
 import pandas as pd
 from typing import Dict
 
+from .bitset import Bitset
 from .const import DUNDER_DF
 from .const import VAR_X
 from .const import VAR_Y
@@ -59,6 +61,102 @@ def dataframe_index(
     return expressions
 
 
+def dataframe_mask(
+    expression: str,
+    data: pd.DataFrame,
+) -> Dict[str, str]:
+    """
+    Parse a rule expression and generate corresponding boolean mask expressions.
+
+    This function generates the same selections as dataframe_index, but instead of
+    selecting the labels of the DataFrame index, each selection is evaluated to a
+    Bitset with one bit per row of the DataFrame. Derived variables
+    can then be calculated with element-wise operations and the labels are only
+    needed for the rows that are part of the output.
+
+    Args:
+        expression (str): A rule expression in the format 'if A then B'.
+        data (pd.DataFrame): The DataFrame on which the rule is evaluated.
+
+    Returns:
+        Dict[str, str]: A dictionary where keys are required variable names, and
+        values are corresponding boolean mask expressions.
+
+    Example:
+        >>> expression = 'if ({"A"} > 0) then ({"B"} < 10)'
+        >>> result = ruleminer.dataframe_mask(expression, data)
+        >>> print(result)
+        {
+          'N': '_mask()',
+          'X': '_mask(((_df["A"] > 0)))',
+          'Y': '_mask(((_df["B"] < 10)))',
+        }
+    """
+    prefix = DUNDER_DF + ".index"
+    expressions = dataframe_index(expression=expression, data=data)
+    for e in expressions.keys():
+        if expressions[e] == prefix:
+            expressions[e] = "_mask()"
+        elif expressions[e].startswith(prefix + "[") and expressions[e].endswith("]"):
+            expressions[e] = "_mask(" + expressions[e][len(prefix) + 1 : -1] + ")"
+    return expressions
+
+
+def row_selection(result):
+    """
+    Return the result of a rule variable as a selection of rows.
+
+    Args:
+        result: the result of a rule variable, either the selected labels of
+        the DataFrame index, a Bitset or a boolean mask of the rows.
+
+    Returns:
+        The selected labels or a boolean mask of the rows, that can be used to
+        select rows of a pd.Series or pd.DataFrame indexed like the data.
+    """
+    if isinstance(result, Bitset):
+        return result.to_mask()
+    return result
+
+
+def index_labels(
+    result,
+    data: pd.DataFrame,
+):
+    """
+    Return the labels of the rows in the result of a rule variable.
+
+    Args:
+        result: the result of a rule variable, either the selected labels of
+        the DataFrame index, a Bitset or a boolean mask of the rows.
+        data (pd.DataFrame): The DataFrame on which the rule was evaluated.
+
+    Returns:
+        pd.Index: The labels of the selected rows of the DataFrame.
+    """
+    result = row_selection(result)
+    if isinstance(result, np.ndarray):
+        return data.index[result]
+    return result
+
+
+def index_columns(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a shallow copy of the DataFrame with the levels of the index as
+    columns (to allow rules based on index data), without changing the data.
+
+    Args:
+        data (pd.DataFrame): The DataFrame.
+
+    Returns:
+        pd.DataFrame: The copy with the levels of the index as columns.
+    """
+    data = data.copy(deep=False)
+    for level in range(len(data.index.names)):
+        data[str(data.index.names[level])] = data.index.get_level_values(level=level)
+    return data
+
+
 def pandas_column(
     expression: str,
     data: pd.DataFrame,
@@ -27,6 +27,11 @@ class RuleParser:
 
     The parse function call underlying functions for specific structures
 
+    If statistics are evaluated when rules are parsed (parameter
+    `evaluate_statistics`), they are calculated with the evaluator set with
+    set_evaluator, so that statistics calculated by the parser are kept in
+    the statistics cache of that evaluator
+
     """
 
     def __init__(
@@ -85,9 +90,32 @@ class RuleParser:
         ]
 
         self.params = dict()
+        self.data = None
+        self.evaluator = None
+        self.shared_evaluator = False
+
+    def set_evaluator(self, evaluator: CodeEvaluator):
+        """
+        Sets the evaluator that calculates statistics when rules are parsed
+
+        The evaluator should have the same params and data as the parser
+        """
+        self.evaluator = evaluator
+        self.shared_evaluator = evaluator is not None
+
+    def statistics_evaluator(self) -> CodeEvaluator:
+        """
+        Returns the evaluator that calculates statistics when rules are parsed
+        """
+        if self.evaluator is None:
+            self.evaluator = CodeEvaluator(self.params)
+            self.evaluator.set_data(self.data)
+        return self.evaluator
 
     def set_params(self, params):
         self.params = params
+        if not self.shared_evaluator:
+            self.evaluator = None
         self.tolerance = self.params.get("tolerance", None)
         if self.tolerance is not None:
             if "default" not in self.tolerance.keys():
@@ -100,6 +128,8 @@ class RuleParser:
 
     def set_data(self, data):
         self.data = data
+        if not self.shared_evaluator:
+            self.evaluator = None
 
     def parse(
         self,
@@ -941,10 +971,7 @@ class RuleParser:
                 expression=flatten(expression[idx : idx + 2]),
                 data=self.data,
             )
-            evaluator = CodeEvaluator(self.params)
-            evaluator.set_params(self.params)
-            evaluator.set_data(self.data)
-            quantile_result, _ = evaluator.evaluate_str(
+            quantile_result, _ = self.statistics_evaluator().evaluate_str(
                 expression=quantile_code, encodings={}
             )
             res += str(np.round(quantile_result, 8))
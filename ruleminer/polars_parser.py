@@ -0,0 +1,500 @@
+"""Polars parser module."""
+
+import ast
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from .bitset import Bitset
+from .const import DUNDER_DF
+
+try:
+    import polars as pl
+
+    logging.debug("polars imported")
+except ImportError:
+    pl = None
+
+logger = logging.getLogger(__name__)
+
+# kinds of the values of Polars expressions
+KIND_NUMERIC = "numeric"
+KIND_STRING = "string"
+KIND_BOOLEAN = "boolean"
+
+# comparison functions of the RuleParser and the corresponding operators
+COMPARISON_FUNCTIONS = {
+    "eq": ast.Eq,
+    "ne": ast.NotEq,
+    "ge": ast.GtE,
+    "le": ast.LtE,
+    "gt": ast.Gt,
+    "lt": ast.Lt,
+}
+
+
+class PolarsTranslation:
+    """
+    The PolarsTranslation object
+
+    Translates the code of a rule variable that is generated by dataframe_index,
+    for example `_df.index[((gt(_df["A"], 0)) & (_df["B"] == "x"))]`, into a
+    Polars expression that evaluates to a boolean column with the selected rows.
+
+    The supported code is:
+    - numeric, boolean and string columns, and int, float, str and bool constants
+    - arithmetic (+, -, *, /), unary minus and abs of numeric values
+    - comparisons (operators or the functions eq, ne, ge, le, gt and lt) of
+      numeric values, and equality (==, !=) of strings or booleans; a comparison
+      with tolerance of numeric values is not supported
+    - isin with a list of constants
+    - logical operations (&, |, ~) of boolean values
+
+    Missing values are null in Polars and NaN in Pandas. The results of
+    comparisons with missing values are the same as in Pandas: False, except
+    for not equal, which is True.
+
+    Raises NotImplementedError for code that is not supported, so that the
+    rule can be evaluated with the CodeEvaluator instead.
+
+    """
+
+    def __init__(self, column_kinds: dict):
+        """ """
+        self.column_kinds = column_kinds
+        self.columns = set()
+
+    def translate(self, code: str):
+        """
+        Translate the code of a rule variable
+
+        Args:
+            code (str): The code of the rule variable.
+
+        Returns:
+            pl.Expr: The Polars expression of the selected rows, or None if all
+            rows are selected.
+
+        Raises:
+            NotImplementedError: If the code cannot be translated.
+        """
+        node = ast.parse(code, mode="eval").body
+        if is_dataframe_index(node):
+            return None
+        if not (isinstance(node, ast.Subscript) and is_dataframe_index(node.value)):
+            raise NotImplementedError("no selection of the index: " + code)
+        expression, kind = self.visit(node.slice)
+        if kind != KIND_BOOLEAN:
+            raise NotImplementedError("no boolean selection: " + code)
+        return expression
+
+    def visit(self, node: ast.AST) -> tuple:
+        """
+        Returns the Polars expression and the kind of its values of a node
+        """
+        method = getattr(self, "visit_" + node.__class__.__name__, None)
+        if method is None:
+            raise NotImplementedError(
+                node.__class__.__name__ + " not supported: " + ast.unparse(node)
+            )
+        return method(node)
+
+    def visit_Constant(self, node: ast.Constant) -> tuple:
+        """ """
+        if isinstance(node.value, bool):
+            return pl.lit(node.value), KIND_BOOLEAN
+        if isinstance(node.value, (int, float)):
+            return pl.lit(node.value), KIND_NUMERIC
+        if isinstance(node.value, str):
+            return pl.lit(node.value), KIND_STRING
+        raise NotImplementedError("constant not supported: " + ast.unparse(node))
+
+    def visit_Subscript(self, node: ast.Subscript) -> tuple:
+        """ """
+        column = column_name(node)
+        kind = self.column_kinds.get(column, None)
+        if kind is None:
+            raise NotImplementedError("column not supported: " + ast.unparse(node))
+        self.columns.add(column)
+        return pl.col(column), kind
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> tuple:
+        """ """
+        operand, kind = self.visit(node.operand)
+        if isinstance(node.op, ast.Invert) and kind == KIND_BOOLEAN:
+            return ~operand, kind
+        if isinstance(node.op, ast.USub) and kind == KIND_NUMERIC:
+            return -operand, kind
+        raise NotImplementedError("operator not supported: " + ast.unparse(node))
+
+    def visit_BinOp(self, node: ast.BinOp) -> tuple:
+        """ """
+        left, left_kind = self.visit(node.left)
+        right, right_kind = self.visit(node.right)
+        if left_kind == KIND_NUMERIC and right_kind == KIND_NUMERIC:
+            if isinstance(node.op, ast.Add):
+                return left + right, KIND_NUMERIC
+            if isinstance(node.op, ast.Sub):
+                return left - right, KIND_NUMERIC
+            if isinstance(node.op, ast.Mult):
+                return left * right, KIND_NUMERIC
+            if isinstance(node.op, ast.Div):
+                return left / right, KIND_NUMERIC
+        if left_kind == KIND_BOOLEAN and right_kind == KIND_BOOLEAN:
+            if isinstance(node.op, ast.BitAnd):
+                return left & right, KIND_BOOLEAN
+            if isinstance(node.op, ast.BitOr):
+                return left | right, KIND_BOOLEAN
+        raise NotImplementedError("operator not supported: " + ast.unparse(node))
+
+    def visit_Compare(self, node: ast.Compare) -> tuple:
+        """ """
+        if len(node.ops) != 1:
+            raise NotImplementedError("chained comparison: " + ast.unparse(node))
+        return self.comparison(node.left, node.ops[0], node.comparators[0])
+
+    def visit_Call(self, node: ast.Call) -> tuple:
+        """ """
+        if node.keywords:
+            raise NotImplementedError("keywords not supported: " + ast.unparse(node))
+        if isinstance(node.func, ast.Name):
+            if node.func.id in COMPARISON_FUNCTIONS and len(node.args) in (2, 6):
+                return self.comparison(
+                    node.args[0],
+                    COMPARISON_FUNCTIONS[node.func.id](),
+                    node.args[1],
+                    tolerance=len(node.args) == 6,
+                )
+            if node.func.id == "abs" and len(node.args) == 1:
+                operand, kind = self.visit(node.args[0])
+                if kind == KIND_NUMERIC:
+                    return operand.abs(), kind
+        elif (
+            isinstance(node.func, ast.Attribute)
+            and node.func.attr == "isin"
+            and len(node.args) == 1
+            and isinstance(node.args[0], ast.List)
+        ):
+            return self.isin(node.func.value, node.args[0])
+        raise NotImplementedError("function not supported: " + ast.unparse(node))
+
+    def comparison(
+        self,
+        left_node: ast.AST,
+        operator: ast.cmpop,
+        right_node: ast.AST,
+        tolerance: bool = False,
+    ) -> tuple:
+        """
+        Returns the Polars expression of a comparison of two nodes
+
+        Comparisons of numeric values with tolerance are not supported, the
+        tolerance is not applied to strings and booleans (as in the CodeEvaluator).
+        """
+        left, left_kind = self.visit(left_node)
+        right, right_kind = self.visit(right_node)
+        if left_kind != right_kind:
+            raise NotImplementedError(
+                "comparison of " + left_kind + " and " + right_kind + " values"
+            )
+        if left_kind == KIND_NUMERIC:
+            if tolerance:
+                raise NotImplementedError("comparison with tolerance")
+            # NaN is a value in Polars (larger than all numbers), in Pandas it
+            # is a missing value
+            left = left.fill_nan(None)
+            right = right.fill_nan(None)
+        elif not isinstance(operator, (ast.Eq, ast.NotEq)):
+            raise NotImplementedError("ordering of " + left_kind + " values")
+        if isinstance(operator, ast.Eq):
+            return (left == right).fill_null(False), KIND_BOOLEAN
+        if isinstance(operator, ast.NotEq):
+            return (left != right).fill_null(True), KIND_BOOLEAN
+        if isinstance(operator, ast.GtE):
+            return (left >= right).fill_null(False), KIND_BOOLEAN
+        if isinstance(operator, ast.LtE):
+            return (left <= right).fill_null(False), KIND_BOOLEAN
+        if isinstance(operator, ast.Gt):
+            return (left > right).fill_null(False), KIND_BOOLEAN
+        if isinstance(operator, ast.Lt):
+            return (left < right).fill_null(False), KIND_BOOLEAN
+        raise NotImplementedError("comparison not supported")
+
+    def isin(self, operand_node: ast.AST, values_node: ast.List) -> tuple:
+        """
+        Returns the Polars expression of a membership test with a list of constants
+        """
+        operand, kind = self.visit(operand_node)
+        values = []
+        for element in values_node.elts:
+            value, value_kind = self.visit(element)
+            if not isinstance(element, ast.Constant) or value_kind != kind:
+                raise NotImplementedError("isin not supported: " + ast.unparse(element))
+            values.append(element.value)
+        if kind == KIND_NUMERIC:
+            # Polars requires the same datatype of the operand and the values
+            return (
+                operand.cast(pl.Float64)
+                .fill_nan(None)
+                .is_in(pl.lit(pl.Series(values, dtype=pl.Float64)).implode())
+                .fill_null(False),
+                KIND_BOOLEAN,
+            )
+        if kind == KIND_STRING:
+            # the values are one list (a Series of values is deprecated)
+            return (
+                operand.is_in(
+                    pl.lit(pl.Series(values, dtype=pl.String)).implode()
+                ).fill_null(False),
+                KIND_BOOLEAN,
+            )
+        raise NotImplementedError("isin of " + kind + " values")
+
+
+def is_dataframe_index(node: ast.AST) -> bool:
+    """
+    Returns whether a node is the index of the DataFrame (`_df.index`)
+    """
+    return (
+        isinstance(node, ast.Attribute)
+        and node.attr == "index"
+        and isinstance(node.value, ast.Name)
+        and node.value.id == DUNDER_DF
+    )
+
+
+def column_name(node: ast.Subscript) -> str:
+    """
+    Returns the name of the column of a node `_df["A"]`
+    """
+    if (
+        isinstance(node.value, ast.Name)
+        and node.value.id == DUNDER_DF
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+    raise NotImplementedError("subscript not supported: " + ast.unparse(node))
+
+
+def polars_kind(values) -> str:
+    """
+    Returns the kind of the values of a column in Polars, or None if the column
+    cannot be converted to Polars
+
+    Args:
+        values: The values of the column (a pd.Series or a pl.Series).
+
+    Returns:
+        str: numeric (numpy integers and floats, or Polars numbers), boolean
+        (numpy booleans, or Polars booleans without missing values) or string
+        (only strings and missing values), otherwise None.
+    """
+    if pl is not None and isinstance(values, pl.Series):
+        if values.dtype.is_numeric():
+            return KIND_NUMERIC
+        if values.dtype == pl.Boolean and values.null_count() == 0:
+            return KIND_BOOLEAN
+        if values.dtype == pl.String:
+            return KIND_STRING
+        return None
+    if not isinstance(values, pd.Series):
+        return None
+    if values.dtype.kind in "iuf":
+        return KIND_NUMERIC
+    if values.dtype.kind == "b":
+        return KIND_BOOLEAN
+    if pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(
+        values.dtype
+    ):
+        if pd.api.types.infer_dtype(values, skipna=True) == "string":
+            return KIND_STRING
+    return None
+
+
+def polars_series(values, name: str, kind: str):
+    """
+    Returns the values of a column as Polars Series with missing values as null
+
+    Args:
+        values: The values of the column (a pd.Series or a pl.Series).
+        name (str): The name of the column.
+        kind (str): The kind of the values (see polars_kind).
+
+    Returns:
+        pl.Series: The values of the column.
+    """
+    if isinstance(values, pl.Series):
+        if values.dtype.is_float():
+            # NaN is a missing value in Pandas
+            return values.fill_nan(None)
+        return values
+    if kind == KIND_STRING:
+        # only the unique strings are converted, missing values are the last
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        codes = np.where(codes < 0, len(uniques), codes)
+        return (
+            pl.Series(name, list(uniques) + [None], dtype=pl.String)
+            .gather(codes)
+            .alias(name)
+        )
+    return pl.Series(name, values.to_numpy(), nan_to_null=kind == KIND_NUMERIC)
+
+
+def polars_dataframe(data):
+    """
+    Returns the data as Polars DataFrame if the data is a Polars DataFrame or
+    another Arrow table (for example a pyarrow Table), otherwise None
+
+    Arrow tables are converted without copying the data.
+    """
+    if pl is None or data is None or isinstance(data, pd.DataFrame):
+        return None
+    if isinstance(data, pl.DataFrame):
+        return data
+    if hasattr(data, "__arrow_c_stream__"):
+        return pl.DataFrame(data)
+    return None
+
+
+def pandas_dataframe(data) -> pd.DataFrame:
+    """
+    Returns a Polars DataFrame as Pandas DataFrame, with missing values of
+    numbers as NaN and of other values as None (without pyarrow)
+    """
+    return pd.DataFrame(
+        {column: data.get_column(column).to_numpy() for column in data.columns},
+        columns=data.columns,
+    )
+
+
+class PolarsColumns:
+    """
+    The PolarsColumns object
+
+    The columns of a dataset (a Pandas or a Polars DataFrame) as Polars Series.
+    The kind of each column is determined and each column is converted at most
+    once, and only when it is used, so that the columns of a dataset are not
+    converted again for each evaluation. The columns of a Polars DataFrame are
+    used without conversion.
+
+    Example:
+        columns = PolarsColumns(pd.DataFrame({"A": [1.0, np.nan]}))
+
+        print(columns.kind("A"), columns.values("A").to_list())
+
+            numeric [1.0, None]
+    """
+
+    def __init__(self, data):
+        """ """
+        self.data = data
+        self.kinds = dict()
+        self.series = dict()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows of the dataset
+        """
+        if isinstance(self.data, pd.DataFrame):
+            return len(self.data.index)
+        return self.data.height
+
+    def names(self) -> list:
+        """
+        Returns the names of the columns that are strings
+        """
+        return [column for column in self.data.columns if isinstance(column, str)]
+
+    def column(self, column: str):
+        """
+        Returns the values of a column of the dataset
+        """
+        if isinstance(self.data, pd.DataFrame):
+            return self.data[column]
+        return self.data.get_column(column)
+
+    def kind(self, column: str) -> str:
+        """
+        Returns the kind of a column (see polars_kind)
+        """
+        if column not in self.kinds:
+            self.kinds[column] = polars_kind(self.column(column))
+        return self.kinds[column]
+
+    def values(self, column: str):
+        """
+        Returns the values of a column as Polars Series (see polars_series)
+        """
+        if column not in self.series:
+            self.series[column] = polars_series(
+                self.column(column), column, self.kind(column)
+            )
+        return self.series[column]
+
+
+def polars_masks(
+    codes: Dict[str, dict],
+    data,
+) -> Dict[str, dict]:
+    """
+    Evaluate the rule variables of rules with Polars.
+
+    The code of the rule variables (generated by dataframe_index) is translated
+    into Polars expressions and the variables of all rules are evaluated in one
+    query plan of a LazyFrame, so that the rules are evaluated in parallel, only
+    the columns that are used are converted to Polars and subexpressions that
+    are shared by rules are evaluated once.
+
+    Args:
+        codes (Dict[str, dict]): The code of the rule variables (N, X and Y) by key
+        of the rule.
+        data: The data on which the rules are evaluated: a PolarsColumns (with
+        the columns that are already converted), or a Pandas or Polars
+        DataFrame.
+
+    Returns:
+        Dict[str, dict]: The rule variables (Bitsets of the selected rows) by key
+        of the rule, only for the rules of which all variables could be
+        translated.
+    """
+    if not isinstance(data, PolarsColumns):
+        data = PolarsColumns(data)
+    column_kinds = {column: data.kind(column) for column in data.names()}
+    translation = PolarsTranslation(column_kinds=column_kinds)
+    expressions = dict()
+    for key, code in codes.items():
+        try:
+            expressions[key] = {
+                variable: translation.translate(code[variable]) for variable in code
+            }
+        except (NotImplementedError, SyntaxError) as e:
+            logger.debug("Rule not evaluated with Polars: " + repr(e))
+    names = []
+    selection = []
+    for key in expressions.keys():
+        for variable, expression in expressions[key].items():
+            if expression is not None:
+                selection.append(expression.alias(str(len(names))))
+                names.append((key, variable))
+    results = dict()
+    if len(names) > 0:
+        frame = pl.LazyFrame(
+            [data.values(column) for column in sorted(translation.columns)]
+        )
+        try:
+            frame = frame.select(selection).collect()
+        except Exception as e:
+            logger.debug("Error evaluating rules with Polars: " + repr(e))
+            return dict()
+        for (key, variable), values in zip(names, frame.iter_columns()):
+            mask = np.broadcast_to(values.to_numpy(), len(data))
+            results.setdefault(key, dict())[variable] = Bitset.from_mask(mask)
+    for key in expressions.keys():
+        results.setdefault(key, dict())
+        for variable, expression in expressions[key].items():
+            if expression is None:
+                results[key][variable] = Bitset.full(len(data))
+        results[key] = {variable: results[key][variable] for variable in codes[key]}
+    return results
@@ -0,0 +1,161 @@
+"""Reductions module."""
+
+import numpy as np
+import pandas as pd
+
+# number of rows of the blocks that are reduced at once
+BLOCK_SIZE = 2**14
+
+
+def sum_rows(values: list, conditions=None):
+    """
+    Returns the sum per row of a list of values, optionally only of the values
+    for which the corresponding condition is True
+
+    This is the same as `np.sum(values, axis=0, dtype=float)` (without
+    conditions) and `np.sum([v.where(c, other=0) for (v, c) in zip(values,
+    conditions)], axis=0, dtype=float)` (with conditions), including the
+    propagation of NaN values, but the values are reduced as one 2-D array
+    (values by rows) in blocks of rows, without creating intermediate Series.
+    The order of the additions is the same, so the results are identical.
+
+    Args:
+        values (list): The values (Series or arrays of the same length).
+        conditions: None, a list of conditions (one per value) or a single
+        condition that applies to all values.
+
+    Returns:
+        np.ndarray: The sum per row.
+
+    Example:
+        values = [pd.Series([1.0, 2.0]), pd.Series([3.0, np.nan])]
+        conditions = [pd.Series([True, True]), pd.Series([True, False])]
+
+        print(sum_rows(values, conditions))
+
+            [4. 2.]
+    """
+    conditions = condition_list(conditions, len(values))
+    arrays = numeric_arrays(values)
+    masks = condition_arrays(values, conditions)
+    if arrays is None or masks is None:
+        if conditions is None:
+            return np.sum(values, axis=0, dtype=float)
+        return np.sum(
+            [v.where(c, other=0) for (v, c) in zip(values, conditions)],
+            axis=0,
+            dtype=float,
+        )
+    n = len(arrays[0])
+    result = np.empty(n, dtype=float)
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        block = np.empty((len(arrays), stop - start), dtype=float)
+        for row, array in enumerate(arrays):
+            if masks[row] is None:
+                block[row] = array[start:stop]
+            else:
+                block[row] = 0
+                np.copyto(block[row], array[start:stop], where=masks[row][start:stop])
+        np.sum(block, axis=0, out=result[start:stop])
+    return result
+
+
+def count_rows(values: list, conditions):
+    """
+    Returns the number per row of values that are not missing and for which
+    the corresponding condition is True
+
+    This is the same as `np.sum([~v.where(c).isna() for (v, c) in zip(values,
+    conditions)], axis=0, dtype=float)`, but the counts are reduced as one 2-D
+    array (values by rows).
+
+    Args:
+        values (list): The values (Series of the same length).
+        conditions: A list of conditions (one per value) or a single condition
+        that applies to all values.
+
+    Returns:
+        np.ndarray: The count per row.
+    """
+    conditions = condition_list(conditions, len(values))
+    masks = condition_arrays(values, conditions)
+    if (
+        masks is None
+        or len(values) == 0
+        or not all(
+            isinstance(v, pd.Series) and len(v) == len(values[0]) for v in values
+        )
+    ):
+        return np.sum(
+            [~v.where(c).isna() for (v, c) in zip(values, conditions)],
+            axis=0,
+            dtype=float,
+        )
+    block = np.empty((len(values), len(values[0])), dtype=bool)
+    for row, (v, mask) in enumerate(zip(values, masks)):
+        np.logical_and(mask, v.notna().to_numpy(), out=block[row])
+    return np.sum(block, axis=0, dtype=float)
+
+
+def condition_list(conditions, size: int):
+    """
+    Returns the conditions as a list of conditions (one per value), or None
+    """
+    if conditions is None or isinstance(conditions, list):
+        return conditions
+    return [conditions] * size
+
+
+def numeric_arrays(values: list):
+    """
+    Returns the numpy arrays of values if all values are one-dimensional
+    numeric (or boolean) Series or arrays of the same length, or None
+    """
+    if len(values) == 0:
+        return None
+    arrays = []
+    for value in values:
+        if isinstance(value, pd.Series):
+            if not isinstance(value.dtype, np.dtype):
+                return None
+            value = value.to_numpy()
+        if (
+            not isinstance(value, np.ndarray)
+            or value.ndim != 1
+            or value.dtype.kind not in "biuf"
+            or len(value) != len(values[0])
+        ):
+            return None
+        arrays.append(value)
+    return arrays
+
+
+def condition_arrays(values: list, conditions):
+    """
+    Returns per value the boolean array of its condition (or None if there
+    are no conditions), or None if a condition is not a boolean Series or
+    array with the same index as the value (a Series)
+    """
+    if conditions is None:
+        return [None] * len(values)
+    if len(conditions) != len(values):
+        return None
+    masks = []
+    for value, condition in zip(values, conditions):
+        if not isinstance(value, pd.Series):
+            return None
+        if isinstance(condition, pd.Series):
+            if not (
+                condition.index is value.index or condition.index.equals(value.index)
+            ):
+                return None
+            condition = condition.to_numpy()
+        if (
+            not isinstance(condition, np.ndarray)
+            or condition.dtype != bool
+            or condition.shape != (len(value),)
+        ):
+            return None
+        masks.append(condition)
+    return masks
@@ -0,0 +1,194 @@
+"""Results module."""
+
+import numpy as np
+import pandas as pd
+
+from .const import (
+    RULE_ID,
+    RULE_GROUP,
+    RULE_DEF,
+    ABSOLUTE_SUPPORT,
+    ABSOLUTE_EXCEPTIONS,
+    CONFIDENCE,
+    NOT_APPLICABLE,
+    RESULT,
+    INDICES,
+    LOG,
+)
+
+# the columns of the results and their datatypes (None for the columns of the
+# rules, which are categorical with the values of the rules as categories)
+RESULT_COLUMNS = {
+    RULE_ID: None,
+    RULE_GROUP: None,
+    RULE_DEF: None,
+    ABSOLUTE_SUPPORT: "Int64",
+    ABSOLUTE_EXCEPTIONS: "Int64",
+    CONFIDENCE: "Float64",
+    NOT_APPLICABLE: "Int64",
+    RESULT: "object",
+    INDICES: "object",
+    LOG: "object",
+}
+
+# the columns of the rules
+RULE_COLUMNS = (RULE_ID, RULE_GROUP, RULE_DEF)
+
+# the columns of the metrics of the rules
+METRIC_COLUMNS = (ABSOLUTE_SUPPORT, ABSOLUTE_EXCEPTIONS, CONFIDENCE, NOT_APPLICABLE)
+
+
+class ResultColumns:
+    """
+    The ResultColumns object
+
+    Collects the results of the evaluation of rules per block of rows (the
+    confirmations, the exceptions or the not applicable row of a rule) and
+    builds the columns of the results at once, without a Python object per
+    row for the values that are the same for all rows of a block.
+
+    For each block only the position of the rule, the number of rows, the
+    metrics of the rule, the result, the labels of the rows and the logs (if
+    any) are kept. The values of the rules and the metrics are repeated over
+    the number of rows of each block with np.repeat. In a DataFrame the rule
+    id, group and definition are categorical, with the values of the rules as
+    categories (in the order of the rules).
+
+    Example:
+        results = ResultColumns(rules)
+        results.add(0, metrics, True, pd.Index([0, 2]))
+        results.add(0, metrics, False, pd.Index([1]))
+
+        print(results.to_dataframe())
+    """
+
+    __slots__ = (
+        "rules",
+        "size",
+        "positions",
+        "counts",
+        "metrics",
+        "result",
+        "indices",
+        "logs",
+    )
+
+    def __init__(self, rules: pd.DataFrame):
+        """ """
+        self.rules = rules
+        self.size = 0
+        self.positions = []
+        self.counts = []
+        self.metrics = {column: [] for column in METRIC_COLUMNS}
+        self.result = []
+        self.indices = []
+        self.logs = []
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows of the results
+        """
+        return self.size
+
+    def add(self, position: int, metrics: dict, result, indices, logs=None) -> None:
+        """
+        Adds a block of rows with the same rule, metrics and result
+
+        Args:
+            position (int): The position of the rule in the rules.
+            metrics (dict): The metrics of the rule.
+            result: The result of the rows (True, False or None).
+            indices: The labels of the rows (a pd.Index or array), or None for a
+            single row without labels.
+            logs: The logs of the rows (an array of strings), or None.
+
+        Returns:
+            None
+        """
+        if indices is None:
+            indices = np.array([None], dtype=object)
+        self.positions.append(position)
+        self.counts.append(len(indices))
+        self.size += len(indices)
+        for column in METRIC_COLUMNS:
+            self.metrics[column].append(metrics[column])
+        self.result.append(result)
+        self.indices.append(indices)
+        self.logs.append(logs)
+
+    def rows(self) -> np.ndarray:
+        """
+        Returns per row the position of its block
+        """
+        return np.repeat(
+            np.arange(len(self.counts)), np.asarray(self.counts, dtype=np.int64)
+        )
+
+    def rule_column(self, column: str, rows: np.ndarray) -> pd.Categorical:
+        """
+        Returns a column of the rules as categorical values per row
+        """
+        codes, categories = pd.factorize(self.rules[column], use_na_sentinel=True)
+        block_codes = codes[np.asarray(self.positions, dtype=np.int64)]
+        return pd.Categorical.from_codes(block_codes[rows], categories=categories)
+
+    def object_column(self, blocks: list) -> np.ndarray:
+        """
+        Returns the values of the blocks as one object array
+        """
+        values = np.empty(len(self), dtype=object)
+        start = 0
+        for block, size in zip(blocks, self.counts):
+            if isinstance(block, pd.Index):
+                values[start : start + size] = block.to_numpy()
+            elif isinstance(block, np.ndarray):
+                values[start : start + size] = block
+            elif block is not None:
+                # for example a list of tuples
+                values[start : start + size] = np.fromiter(
+                    block, dtype=object, count=size
+                )
+            start += size
+        return values
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the results as a DataFrame
+
+        Returns:
+            pd.DataFrame: The results, with the rule id, group and definition as
+            categorical columns.
+        """
+        rows = self.rows()
+        columns = dict()
+        for column in RULE_COLUMNS:
+            columns[column] = self.rule_column(column, rows)
+        for column in METRIC_COLUMNS:
+            columns[column] = pd.array(
+                self.metrics[column], dtype=RESULT_COLUMNS[column]
+            ).take(rows)
+        columns[RESULT] = np.array(self.result, dtype=object)[rows]
+        columns[INDICES] = self.object_column(self.indices)
+        columns[LOG] = self.object_column(self.logs)
+        return pd.DataFrame(columns, copy=False)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the results as a dict with per column a list of values
+
+        Returns:
+            dict: The results.
+        """
+        rows = self.rows()
+        positions = np.asarray(self.positions, dtype=np.int64)[rows]
+        results = dict()
+        for column in RULE_COLUMNS:
+            results[column] = self.rules[column].to_numpy()[positions].tolist()
+        for column in METRIC_COLUMNS:
+            results[column] = np.array(self.metrics[column], dtype=object)[
+                rows
+            ].tolist()
+        results[RESULT] = np.array(self.result, dtype=object)[rows].tolist()
+        results[INDICES] = self.object_column(self.indices).tolist()
+        results[LOG] = self.object_column(self.logs).tolist()
+        return results
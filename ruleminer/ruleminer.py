@@ -3,6 +3,7 @@
 import logging
 import itertools
 import re
+import time
 import numpy as np
 from typing import Union
 from collections import OrderedDict
@@ -24,22 +25,38 @@ from .grammar import (
     rule_expression,
 )
 from .parser import RuleParser
-from .evaluator import CodeEvaluator
+from .evaluator import CodeEvaluator, DATASET_STATISTICS
+from .lowering import dataset_statistics
+from .chunks import (
+    data_chunks,
+    merge_counts,
+    concat_values,
+    concat_labels,
+    concat_logs,
+)
 from .pandas_parser import (
     dataframe_index,
+    dataframe_mask,
     dataframe_values,
+    index_columns,
+    index_labels,
+    row_selection,
 )
+from . import polars_parser
+from .polars_parser import polars_masks
 from .utils import (
     flatten,
     generate_substitutions,
     is_column,
     is_string,
 )
+from .results import ResultColumns
 from .metrics import (
     metrics,
     required_variables,
     calculate_metrics,
     add_required_variables,
+    count,
 )
 from .const import (
     CONFIDENCE,
@@ -49,13 +66,18 @@ from .const import (
     RULE_ID,
     RULE_GROUP,
     RULE_DEF,
-    RESULT,
-    INDICES,
     ENCODINGS,
+    DUNDER_DF,
+    VARIABLE,
+    WALL_TIME,
+    CPU_TIME,
+    CARDINALITY,
+    PROFILE_RULE,
+    RESULTS_MODE,
+    METRICS_MODE,
     VAR_X_AND_Y,
     VAR_NOT_X,
     VAR_X_AND_NOT_Y,
-    LOG,
 )
 
 
@@ -82,8 +104,11 @@ class RuleMiner:
     ):
         """ """
         self.params = dict()
+        self.profile = None
         self.parser = RuleParser()
         self.evaluator = CodeEvaluator(params)
+        self.parser.set_evaluator(self.evaluator)
+        self._metrics_evaluator = None
         self.update(templates=templates, rules=rules, data=data, params=params)
 
     def update(
@@ -107,7 +132,7 @@ class RuleMiner:
             rules (Union[pd.DataFrame, pl.DataFrame], optional): A DataFrame containing the rules
                                                                   to evaluate. If provided, the method
                                                                   will evaluate the rules based on the
-                                                                  current data.
+                                                                  current data (if there is data).
             data (Union[pd.DataFrame, pl.DataFrame], optional): A DataFrame containing the data to
                                                                  be used in the analysis. If provided,
                                                                  the method will update the internal
@@ -130,10 +155,17 @@ class RuleMiner:
             self.params = params
             self.parser.set_params(params)
             self.evaluator.set_params(params)
+            self._metrics_evaluator = None
 
+        # data in Polars (or another Arrow table) is used without conversion by
+        # the Polars backend, the other evaluations use a Pandas conversion
+        self.polars_data = polars_parser.polars_dataframe(data)
+        if self.polars_data is not None:
+            data = polars_parser.pandas_dataframe(self.polars_data)
         self.data = data
+        self._rules_data = None
         self.parser.set_data(data)
-        self.evaluator.set_data(data)
+        self.evaluator.set_data(data, polars_dataframe=self.polars_data)
 
         self.metrics = self.params.get(
             "metrics",
@@ -151,6 +183,13 @@ class RuleMiner:
                     raise Exception(
                         "No spaces allowed in keys of tolerance definition."
                     )
+        self.boolean_masks = self.params.get("boolean_masks", False)
+        self.backend = self.params.get("backend", "pandas")
+        if self.backend == "polars" and polars_parser.pl is None:
+            logging.getLogger(__name__).warning(
+                "polars is not installed, the pandas backend is used"
+            )
+            self.backend = "pandas"
         self.rules_datatype = self.params.get("rules_datatype", pd.DataFrame)
         self.results_datatype = self.params.get("results_datatype", pd.DataFrame)
 
@@ -160,7 +199,9 @@ class RuleMiner:
 
         if rules is not None:
             self.rules = rules
-            self.evaluate()
+            if self.data is not None:
+                # without data the rules are kept (for example for evaluate_chunks)
+                self.evaluate()
 
         return None
 
@@ -194,6 +235,7 @@ class RuleMiner:
     def evaluate(
         self,
         data: pd.DataFrame = None,
+        mode: str = RESULTS_MODE,
     ) -> pd.DataFrame:
         """
         Evaluates the defined rules on the given data and returns the results.
@@ -208,6 +250,11 @@ class RuleMiner:
             data (pd.DataFrame, optional): A DataFrame containing the data to evaluate. If not
                                             provided, the method uses the current data stored in
                                             the object.
+            mode (str, optional): "results" (default) for a row per confirmation and exception
+                                  of each rule, or "metrics" for one row per rule with the rule
+                                  id, rule group, rule definition and the metrics of the rule
+                                  only. With "metrics" the rows are only counted: no index
+                                  labels are selected and no logs are formatted.
 
         Returns:
             pd.DataFrame: A DataFrame containing the evaluation results with columns for rule id,
@@ -216,65 +263,341 @@ class RuleMiner:
 
         Raises:
             AssertionError: If no rules are defined or no data is available for evaluation.
+            Exception: If the mode is unknown.
         """
-        logger = logging.getLogger(__name__)
+        if mode not in (RESULTS_MODE, METRICS_MODE):
+            raise Exception("Unknown evaluation mode " + repr(mode) + ".")
         if data is not None:
             self.update(data=data)
 
         assert self.rules is not None, "Unable to evaluate data, no rules defined."
         assert self.data is not None, "Unable to evaluate data, no data defined."
 
-        results = OrderedDict(
-            {
-                RULE_ID: [],
-                RULE_GROUP: [],
-                RULE_DEF: [],
-                ABSOLUTE_SUPPORT: [],
-                ABSOLUTE_EXCEPTIONS: [],
-                CONFIDENCE: [],
-                NOT_APPLICABLE: [],
-                RESULT: [],
-                INDICES: [],
-                LOG: [],
-            }
-        )
+        results = ResultColumns(self.rules)
+        rules_metrics = self.rules_metrics()
+        for position, _, rule_metrics, blocks in self.evaluate_rules(mode=mode):
+            self.add_rule_results(
+                results, rules_metrics, position, rule_metrics, blocks, mode
+            )
+        self.results = self.format_results(results, rules_metrics, mode)
 
-        mapping_dtypes = {
-            RULE_ID: self.rules[RULE_ID].dtype,
-            RULE_GROUP: self.rules[RULE_GROUP].dtype,
-            RULE_DEF: self.rules[RULE_DEF].dtype,
-            ABSOLUTE_SUPPORT: "Int64",
-            ABSOLUTE_EXCEPTIONS: "Int64",
-            CONFIDENCE: "Float64",
-            NOT_APPLICABLE: "Int64",
-            RESULT: "object",
-            INDICES: "object",
-            LOG: "object",
-        }
+        return self.results
 
-        if self.params.get("apply_rules_on_indices", True):
-            # add temporary index columns (to allow rules based on index data)
-            for level in range(len(self.data.index.names)):
-                self.data[str(self.data.index.names[level])] = (
-                    self.data.index.get_level_values(level=level)
+    def iter_evaluate(
+        self,
+        data: pd.DataFrame = None,
+        batch_size: int = 1,
+        mode: str = RESULTS_MODE,
+    ):
+        """
+        Evaluates the defined rules on the given data and yields the results per
+        batch of rules
+
+        This is the same as evaluate, but the results are yielded as soon as a
+        batch of rules is evaluated, so only the results of one batch are kept in
+        memory. The results of each batch have the same columns and datatypes as
+        the results of evaluate (with the rule id, group and definition of all
+        rules as categories), so concatenating the batches gives the results of
+        evaluate. The results are not stored in the results attribute, the
+        profile (if any) is stored after the last batch.
+
+        Args:
+            data (pd.DataFrame, optional): A DataFrame containing the data to evaluate. If not
+                                            provided, the method uses the current data stored in
+                                            the object.
+            batch_size (int, optional): The number of rules per batch (default 1).
+            mode (str, optional): "results" (default) or "metrics", as in evaluate.
+
+        Returns:
+            A generator of the results of each batch of rules, in the datatype of
+            the results.
+
+        Raises:
+            AssertionError: If no rules are defined or no data is available for evaluation.
+            Exception: If the mode is unknown or the batch size is not positive.
+
+        Example:
+            for results in miner.iter_evaluate(data=df, batch_size=10):
+                results.to_parquet(...)
+        """
+        if mode not in (RESULTS_MODE, METRICS_MODE):
+            raise Exception("Unknown evaluation mode " + repr(mode) + ".")
+        if batch_size < 1:
+            raise Exception("Batch size should be at least 1.")
+        if data is not None:
+            self.update(data=data)
+
+        assert self.rules is not None, "Unable to evaluate data, no rules defined."
+        assert self.data is not None, "Unable to evaluate data, no data defined."
+
+        return self.evaluate_batches(batch_size=batch_size, mode=mode)
+
+    def evaluate_batches(self, batch_size: int = 1, mode: str = RESULTS_MODE):
+        """
+        Evaluates the defined rules and yields the results per batch of rules
+        (see iter_evaluate)
+        """
+        results, rules_metrics, n_rules = None, None, 0
+        for position, _, rule_metrics, blocks in self.evaluate_rules(mode=mode):
+            if n_rules == 0:
+                results = ResultColumns(self.rules)
+                rules_metrics = self.rules_metrics()
+            self.add_rule_results(
+                results, rules_metrics, position, rule_metrics, blocks, mode
+            )
+            n_rules += 1
+            if n_rules == batch_size:
+                yield self.format_results(results, rules_metrics, mode)
+                results, rules_metrics, n_rules = None, None, 0
+        if n_rules > 0:
+            yield self.format_results(results, rules_metrics, mode)
+
+    def evaluate_chunks(self, chunks, mode: str = RESULTS_MODE):
+        """
+        Evaluates the defined rules on data in chunks and returns the results.
+
+        The data is read chunk by chunk (for example the chunks of a CSV file or
+        the row groups of a Parquet file, see csv_chunks and parquet_chunks), so
+        that only one chunk and the evaluation of one chunk are kept in memory.
+        The numbers of rows of the rule variables of the chunks are added up, so
+        the metrics are the metrics of the whole dataset, and the rows of the
+        results of the chunks are combined per rule. The results are the same as
+        the results of evaluate on the whole dataset (given that the datatypes of
+        the columns are the same in all chunks).
+
+        Statistics over the rows of the dataset (mean, std, quantile and sum) are
+        detected in the code of the rules and calculated for the whole dataset
+        in a pre-pass over the chunks before the rules are evaluated. Only the
+        values of the statistics are kept in memory for this.
+
+        Args:
+            chunks: The chunks of the data: an iterable of DataFrames or a function
+                    without arguments that returns one (for example csv_chunks). If
+                    the rules contain statistics the data is read twice, so then
+                    an iterator over the chunks, for example the result of
+                    pd.read_csv with chunksize, cannot be used.
+            mode (str, optional): "results" (default) or "metrics", as in evaluate.
+
+        Returns:
+            pd.DataFrame: The results, as in evaluate. The data of the object is
+                          not changed.
+
+        Raises:
+            AssertionError: If no rules are defined or the data has no chunks.
+            Exception: If the mode is unknown, if a statistic cannot be calculated
+                       for the whole dataset or if the chunks are an iterator while
+                       the rules contain statistics.
+        """
+        if mode not in (RESULTS_MODE, METRICS_MODE):
+            raise Exception("Unknown evaluation mode " + repr(mode) + ".")
+        assert self.rules is not None, "Unable to evaluate data, no rules defined."
+
+        data = self.data
+        counts = [None] * len(self.rules.index)
+        confirmations = [[] for _ in range(len(self.rules.index))]
+        exceptions = [[] for _ in range(len(self.rules.index))]
+        profiles = []
+        try:
+            statistics = self.chunk_statistics(chunks)
+            for chunk in data_chunks(chunks):
+                self.update(data=chunk)
+                for position, len_results, _, blocks in self.evaluate_rules(
+                    mode=mode, statistics=statistics
+                ):
+                    counts[position] = merge_counts(counts[position], len_results)
+                    for result, indices, logs in blocks:
+                        if result is True:
+                            confirmations[position].append((indices, logs))
+                        elif result is False:
+                            exceptions[position].append((indices, logs))
+                if self.profile is not None and self.evaluator.profiling:
+                    profiles.append(self.profile)
+        finally:
+            self.update(data=data)
+        assert all(
+            rule_counts is not None for rule_counts in counts
+        ), "Unable to evaluate data, no data defined."
+
+        results = ResultColumns(self.rules)
+        rules_metrics = self.rules_metrics()
+        for position, rule_counts in enumerate(counts):
+            rule_metrics = calculate_metrics(
+                len_results=rule_counts, metrics=self.metrics
+            )
+            blocks = []
+            for result, rows in [
+                (True, confirmations[position]),
+                (False, exceptions[position]),
+            ]:
+                if len(rows) > 0:
+                    blocks.append(
+                        (
+                            result,
+                            concat_labels([indices for indices, _ in rows]),
+                            concat_logs([logs for _, logs in rows]),
+                        )
+                    )
+            if mode != METRICS_MODE and self.params.get("output_not_applicable", False):
+                if (
+                    rule_counts.get(VAR_X_AND_Y, 0) == 0
+                    and rule_counts.get(VAR_X_AND_NOT_Y, 0) == 0
+                    and rule_counts.get(VAR_NOT_X, 0) > 0
+                ):
+                    blocks.append((None, None, None))
+            self.add_rule_results(
+                results, rules_metrics, position, rule_metrics, blocks, mode
+            )
+        if len(profiles) > 0:
+            self.profile = pd.concat(profiles, ignore_index=True)
+        self.results = self.format_results(results, rules_metrics, mode)
+
+        return self.results
+
+    def chunk_statistics(self, chunks) -> dict:
+        """
+        Returns the statistics over the rows of the whole dataset that are used
+        by the rules, calculated in a pre-pass over the chunks of the data.
+
+        The values of each statistic are evaluated per chunk and the statistic is
+        calculated once on the values of all chunks, so the result is the same as
+        on the whole dataset. Statistics of which the values contain other
+        statistics are calculated in a next pass, after the other statistics.
+
+        Args:
+            chunks: The chunks of the data, as in evaluate_chunks.
+
+        Returns:
+            dict: The results (value, name of the values) by statistic (see
+            dataset_statistics), without the statistics that could not be
+            evaluated.
+
+        Raises:
+            Exception: If a statistic cannot be calculated for the whole dataset or
+                       if the chunks are an iterator.
+        """
+        rule_statistics = []
+        for rule_def in self.rules[RULE_DEF].unique():
+            for code in self.rule_code(expression=rule_def).values():
+                if code is not None:
+                    for statistic in dataset_statistics(code):
+                        if statistic not in rule_statistics:
+                            rule_statistics.append(statistic)
+        statistics = dict()
+        if len(rule_statistics) == 0:
+            return statistics
+        if not callable(chunks) and iter(chunks) is chunks:
+            raise Exception(
+                "The rules contain statistics of the dataset, so the chunks should "
+                "be a function that returns the chunks or a list of chunks."
+            )
+
+        # statistics of which the values contain statistics come after these
+        passes = []
+        for statistic in rule_statistics:
+            values_statistics = dataset_statistics(statistic[1])
+            level = max(
+                [
+                    passes_level + 1
+                    for passes_level, pass_statistics in enumerate(passes)
+                    if any(s in pass_statistics for s in values_statistics)
+                ]
+                + [0]
+            )
+            if level == len(passes):
+                passes.append([])
+            passes[level].append(statistic)
+
+        for pass_statistics in passes:
+            values = {statistic: [] for statistic in pass_statistics}
+            for chunk in data_chunks(chunks):
+                if self.params.get("apply_rules_on_indices", True):
+                    chunk = index_columns(chunk)
+                self.evaluator.set_data(chunk)
+                self.evaluator.set_statistics(statistics)
+                for statistic in pass_statistics:
+                    chunk_values, _ = self.evaluator.evaluate_str(
+                        expression=statistic[1], encodings={}
+                    )
+                    values[statistic].append(chunk_values)
+            for (function, key, args), statistic_values in values.items():
+                if any(
+                    isinstance(chunk_values, float) and np.isnan(chunk_values)
+                    for chunk_values in statistic_values
+                ):
+                    # the values could not be evaluated
+                    continue
+                statistic_values = concat_values(statistic_values)
+                statistics[(function, key, args)] = (
+                    DATASET_STATISTICS[function](statistic_values, *args),
+                    getattr(statistic_values, "name", None),
                 )
+        return statistics
+
+    def evaluate_rules(self, mode: str = RESULTS_MODE, statistics: dict = None):
+        """
+        Evaluates the defined rules one by one and yields the results per rule
 
-        for rule_idx, row in self.rules.iterrows():
-            rule_id = row[RULE_ID]
-            rule_def = row[RULE_DEF]
-            rule_group = row[RULE_GROUP]
-            rule_code = dataframe_index(expression=rule_def, data=self.data)
-            code_results, code_log = self.evaluator.evaluate_dict(
-                expressions=rule_code, encodings={}
+        Args:
+            mode (str, optional): "results" (default) or "metrics", as in evaluate.
+            statistics (dict, optional): The statistics of the whole dataset if the
+                                         data is a chunk of the dataset (see
+                                         evaluate_chunks).
+
+        Yields:
+            tuple: The position of the rule, the numbers of rows of the rule
+            variables, the metrics of the rule and a list of blocks (result,
+            indices, logs) with the rows of the results of the rule (empty with
+            mode "metrics").
+        """
+        logger = logging.getLogger(__name__)
+        metrics_only = mode == METRICS_MODE
+
+        data = self.rules_data()
+        if self.evaluator.globals[DUNDER_DF] is not data:
+            self.evaluator.set_data(data, polars_dataframe=self.polars_data)
+        polars_results = self.polars_results()
+        profile = [] if self.evaluator.profiling else None
+        if metrics_only:
+            evaluator = self.metrics_evaluator()
+            # the rows are counted as masks if the labels of the rows are unique
+            boolean_masks = self.boolean_masks or data.index.is_unique
+        else:
+            evaluator = self.evaluator
+            boolean_masks = self.boolean_masks
+        if statistics is not None:
+            evaluator.set_statistics(statistics)
+
+        for position, (rule_idx, rule_id, rule_group, rule_def) in enumerate(
+            zip(
+                self.rules.index,
+                self.rules[RULE_ID],
+                self.rules[RULE_GROUP],
+                self.rules[RULE_DEF],
             )
+        ):
+            if evaluator.globals.get(DUNDER_DF, None) is not data:
+                # the data of the evaluator is set here, and again if it was
+                # changed (for example by another evaluation) since the last rule
+                evaluator.set_data(data, polars_dataframe=self.polars_data)
+                if statistics is not None:
+                    evaluator.set_statistics(statistics)
+            if profile is not None:
+                wall_time, cpu_time = time.perf_counter(), time.process_time()
+            if rule_def in polars_results:
+                code_results, code_log = polars_results[rule_def], None
+            else:
+                rule_code = self.rule_code(
+                    expression=rule_def, boolean_masks=boolean_masks
+                )
+                code_results, code_log = evaluator.evaluate_dict(
+                    expressions=rule_code, encodings={}, lazy_logs=True
+                )
             code_results = add_required_variables(
                 required_vars=self.required_vars,
                 results=code_results,
             )
             len_results = {
-                key: len(code_results[key])
-                if not isinstance(code_results[key], float)
-                else 0
+                key: count(code_results[key])
                 for key in code_results.keys()
                 if code_results[key] is not None
             }
@@ -283,79 +606,49 @@ class RuleMiner:
                 metrics=self.metrics,
             )
 
-            co_indices = code_results[VAR_X_AND_Y]
-            ex_indices = code_results[VAR_X_AND_NOT_Y]
-            na_indices = code_results[VAR_NOT_X]
-            if code_log is not None:
-                co_log = code_log.get(code_results[VAR_X_AND_Y], "")
-                ex_log = code_log.get(code_results[VAR_X_AND_NOT_Y], "")
-                # na_log = code_log[VAR_NOT_X]
-
-            if co_indices is not None and not isinstance(co_indices, float):
-                nco = len(co_indices)
-            else:
-                nco = 0
-            if ex_indices is not None and not isinstance(ex_indices, float):
-                nex = len(ex_indices)
-            else:
-                nex = 0
-            if na_indices is not None and not isinstance(na_indices, float):
-                nna = len(na_indices)
+            if metrics_only:
+                # the variables are only there if the metrics require them
+                co_indices = code_results.get(VAR_X_AND_Y, None)
+                ex_indices = code_results.get(VAR_X_AND_NOT_Y, None)
+                na_indices = code_results.get(VAR_NOT_X, None)
             else:
-                nna = 0
+                co_indices = code_results[VAR_X_AND_Y]
+                ex_indices = code_results[VAR_X_AND_NOT_Y]
+                na_indices = code_results[VAR_NOT_X]
 
-            if self.params.get("output_confirmations", True):
+            nco = count(co_indices)
+            nex = count(ex_indices)
+            nna = count(na_indices)
+
+            blocks = []
+            if not metrics_only and self.params.get("output_confirmations", True):
                 if nco > 0:
-                    results[RULE_ID].extend([rule_id] * nco)
-                    results[RULE_GROUP].extend([rule_group] * nco)
-                    results[RULE_DEF].extend([rule_def] * nco)
-                    results[ABSOLUTE_SUPPORT].extend(
-                        [rule_metrics[ABSOLUTE_SUPPORT]] * nco
-                    )
-                    results[ABSOLUTE_EXCEPTIONS].extend(
-                        [rule_metrics[ABSOLUTE_EXCEPTIONS]] * nco
-                    )
-                    results[CONFIDENCE].extend([rule_metrics[CONFIDENCE]] * nco)
-                    results[NOT_APPLICABLE].extend([rule_metrics[NOT_APPLICABLE]] * nco)
-                    results[RESULT].extend([True] * nco)
-                    results[INDICES].extend(co_indices)
-                    results[LOG].extend(
-                        co_log if code_log is not None else [None] * nco
+                    # the logs are only formatted for the rows in the results
+                    blocks.append(
+                        (
+                            True,
+                            index_labels(co_indices, data),
+                            code_log.get(row_selection(co_indices), "")
+                            if code_log is not None
+                            else None,
+                        )
                     )
 
-            if self.params.get("output_exceptions", True):
+            if not metrics_only and self.params.get("output_exceptions", True):
                 if nex > 0:
-                    results[RULE_ID].extend([rule_id] * nex)
-                    results[RULE_GROUP].extend([rule_group] * nex)
-                    results[RULE_DEF].extend([rule_def] * nex)
-                    results[ABSOLUTE_SUPPORT].extend(
-                        [rule_metrics[ABSOLUTE_SUPPORT]] * nex
-                    )
-                    results[ABSOLUTE_EXCEPTIONS].extend(
-                        [rule_metrics[ABSOLUTE_EXCEPTIONS]] * nex
-                    )
-                    results[CONFIDENCE].extend([rule_metrics[CONFIDENCE]] * nex)
-                    results[NOT_APPLICABLE].extend([rule_metrics[NOT_APPLICABLE]] * nex)
-                    results[RESULT].extend([False] * nex)
-                    results[INDICES].extend(ex_indices)
-                    results[LOG].extend(
-                        ex_log if code_log is not None else [None] * nex
+                    blocks.append(
+                        (
+                            False,
+                            index_labels(ex_indices, data),
+                            code_log.get(row_selection(ex_indices), "")
+                            if code_log is not None
+                            else None,
+                        )
                     )
 
-            if self.params.get("output_not_applicable", False):
+            if not metrics_only and self.params.get("output_not_applicable", False):
                 if (nco == 0 and nex == 0) and nna > 0:
-                    results[RULE_ID].extend([rule_id])
-                    results[RULE_GROUP].extend([rule_group])
-                    results[RULE_DEF].extend([rule_def])
-                    results[ABSOLUTE_SUPPORT].extend([rule_metrics[ABSOLUTE_SUPPORT]])
-                    results[ABSOLUTE_EXCEPTIONS].extend(
-                        [rule_metrics[ABSOLUTE_EXCEPTIONS]]
-                    )
-                    results[CONFIDENCE].extend([rule_metrics[CONFIDENCE]])
-                    results[NOT_APPLICABLE].extend([rule_metrics[NOT_APPLICABLE]])
-                    results[RESULT].extend([None])
-                    results[INDICES].extend([None])
-                    results[LOG].extend([None])
+                    blocks.append((None, None, None))
 
             logger.info(
                 "Finished: "
@@ -372,19 +665,279 @@ class RuleMiner:
                 + " exceptions]"
             )
 
-        if self.results_datatype == pd.DataFrame:
-            self.results = pd.DataFrame.from_dict(results).astype(mapping_dtypes)
+            if profile is not None:
+                rule_records = (
+                    [] if rule_def in polars_results else evaluator.profile_records
+                )
+                rule_records = rule_records + [
+                    {
+                        VARIABLE: PROFILE_RULE,
+                        WALL_TIME: time.perf_counter() - wall_time,
+                        CPU_TIME: time.process_time() - cpu_time,
+                        CARDINALITY: 1
+                        if metrics_only
+                        else sum(
+                            1 if indices is None else len(indices)
+                            for _, indices, _ in blocks
+                        ),
+                    }
+                ]
+                self.add_profile_records(
+                    profile=profile,
+                    records=rule_records,
+                    rule_id=rule_id,
+                    rule_group=rule_group,
+                    rule_def=rule_def,
+                )
+
+            yield position, len_results, rule_metrics, blocks
+
+        if profile is not None:
+            self.profile = pd.DataFrame(
+                profile,
+                columns=[
+                    RULE_ID,
+                    RULE_GROUP,
+                    RULE_DEF,
+                    VARIABLE,
+                    WALL_TIME,
+                    CPU_TIME,
+                    CARDINALITY,
+                ],
+            )
+
+    def rules_metrics(self) -> OrderedDict:
+        """
+        Returns an empty dict with the columns of the results in mode "metrics"
+        """
+        return OrderedDict(
+            {
+                RULE_ID: [],
+                RULE_GROUP: [],
+                RULE_DEF: [],
+                **{metric: [] for metric in self.metrics},
+            }
+        )
+
+    def add_rule_results(
+        self,
+        results: ResultColumns,
+        rules_metrics: OrderedDict,
+        position: int,
+        rule_metrics: dict,
+        blocks: list,
+        mode: str,
+    ) -> None:
+        """
+        Adds the results of a rule to the results (or to the rules metrics in
+        mode "metrics")
+        """
+        if mode == METRICS_MODE:
+            rules_metrics[RULE_ID].append(self.rules[RULE_ID].iat[position])
+            rules_metrics[RULE_GROUP].append(self.rules[RULE_GROUP].iat[position])
+            rules_metrics[RULE_DEF].append(self.rules[RULE_DEF].iat[position])
+            for metric, value in rule_metrics.items():
+                rules_metrics[metric].append(value)
+        else:
+            for result, indices, logs in blocks:
+                results.add(position, rule_metrics, result, indices, logs)
+
+    def format_results(
+        self, results: ResultColumns, rules_metrics: OrderedDict, mode: str
+    ):
+        """
+        Returns the results (or the rules metrics in mode "metrics") in the
+        datatype of the results
+        """
+        if mode == METRICS_MODE:
+            if self.results_datatype == pd.DataFrame:
+                return pd.DataFrame.from_dict(rules_metrics)
+            elif self.results_datatype == pl.DataFrame:
+                return pl.DataFrame(rules_metrics)
+            elif isinstance(self.results_datatype, dict):
+                return rules_metrics
+        elif self.results_datatype == pd.DataFrame:
+            return results.to_dataframe()
         elif self.results_datatype == pl.DataFrame:
-            self.results = pl.DataFrame(results)
+            return pl.DataFrame(results.to_dict())
         elif isinstance(self.results_datatype, dict):
-            self.results = results
+            return results.to_dict()
+        return None
 
-        if self.params.get("apply_rules_on_indices", True):
-            # remove temporarily added index columns
-            for level in range(len(self.data.index.names)):
-                del self.data[str(self.data.index.names[level])]
+    def add_profile_records(
+        self,
+        profile: list,
+        records: list,
+        rule_id,
+        rule_group,
+        rule_def: str,
+    ) -> None:
+        """
+        Adds the profile records of a rule to the profile and passes them to the
+        profile callback.
 
-        return self.results
+        With the parameter "profile" set to True (or a "profile_callback" set) the
+        wall time, cpu time and cardinality of the variables N, X and Y of each rule
+        (the number of selected rows) and of the rule as a whole (the number of
+        rows in the results) are recorded. The records are available after
+        evaluation as the DataFrame `profile`, and each record (a dict) is passed
+        to the callable in the parameter "profile_callback" as soon as the rule is
+        evaluated.
+
+        Args:
+            profile (list): The records of the evaluated rules.
+            records (list): The records of the variables of the rule and of the rule.
+            rule_id: The id of the rule.
+            rule_group: The group of the rule.
+            rule_def (str): The definition of the rule.
+
+        Returns:
+            None
+        """
+        callback = self.params.get("profile_callback", None)
+        for record in records:
+            record = {
+                RULE_ID: rule_id,
+                RULE_GROUP: rule_group,
+                RULE_DEF: rule_def,
+                **record,
+            }
+            profile.append(record)
+            if callback is not None:
+                callback(record)
+
+    def explain(self, rule_id, index) -> str:
+        """
+        Returns the log of the intermediate results of a rule for one row of the data.
+
+        The rule is evaluated and the log is only formatted for the requested row,
+        so that a row can be explained on request, also if it is not part of the
+        results.
+
+        Args:
+            rule_id: The id of the rule.
+            index: The label of the row in the index of the data.
+
+        Returns:
+            str: The log of the row, for example 'if ({1.0} > {0.0}) then (...)'.
+
+        Raises:
+            AssertionError: If no rules or no data are defined.
+            Exception: If no intermediate results are defined in the parameters
+                or if the rule id is not found.
+        """
+        assert self.rules is not None, "Unable to explain, no rules defined."
+        assert self.data is not None, "Unable to explain, no data defined."
+        if len(self.params.get("intermediate_results", [])) == 0:
+            raise Exception("No intermediate results defined in the parameters.")
+        rules = self.rules[self.rules[RULE_ID] == rule_id]
+        if len(rules.index) == 0:
+            raise Exception("Rule id " + repr(rule_id) + " not found.")
+        positions = np.arange(len(self.data.index))[self.data.index.get_loc(index)]
+
+        data = self.rules_data()
+        if self.evaluator.globals[DUNDER_DF] is not data:
+            self.evaluator.set_data(data, polars_dataframe=self.polars_data)
+        _, code_log = self.evaluator.evaluate_dict(
+            expressions=self.rule_code(expression=rules[RULE_DEF].iloc[0]),
+            encodings={},
+            lazy_logs=True,
+        )
+        return code_log.format(np.atleast_1d(positions)[:1])[0]
+
+    def metrics_evaluator(self) -> CodeEvaluator:
+        """
+        Returns the evaluator of the metrics of the rules.
+
+        The metrics do not depend on the logs of intermediate results, so if
+        intermediate results are logged then the metrics are evaluated with an
+        evaluator without logs (on the same data). Otherwise this is the
+        evaluator of the RuleMiner.
+
+        The evaluator without logs is made once per set of parameters, so that
+        its caches remain valid between evaluations. Its data is set by
+        evaluate_rules (which clears the caches of a previous dataset).
+
+        Returns:
+            CodeEvaluator: The evaluator of the metrics.
+        """
+        if len(self.params.get("intermediate_results", [])) == 0:
+            return self.evaluator
+        if self._metrics_evaluator is None:
+            self._metrics_evaluator = CodeEvaluator(
+                {**self.params, "intermediate_results": []}
+            )
+        return self._metrics_evaluator
+
+    def rules_data(self) -> pd.DataFrame:
+        """
+        Returns the data on which the rules are evaluated.
+
+        With the parameter "apply_rules_on_indices" (default True) this is a
+        shallow copy of the data with the levels of the index as columns (to
+        allow rules based on index data), so that the data itself is not
+        changed while rules are evaluated. The copy is made once per dataset,
+        so that the caches of the evaluator remain valid between evaluations.
+
+        Returns:
+            pd.DataFrame: The data on which the rules are evaluated.
+        """
+        if not self.params.get("apply_rules_on_indices", True):
+            return self.data
+        if self._rules_data is None or self._rules_data[0] is not self.data:
+            self._rules_data = (self.data, index_columns(self.data))
+        return self._rules_data[1]
+
+    def polars_results(self) -> dict:
+        """
+        Returns the rule variables of the rules that are evaluated with Polars.
+
+        With the parameter "backend" set to "polars" the rules are translated
+        into Polars expressions and evaluated in one query plan (see
+        polars_masks). Rules that cannot be translated (for example rules with
+        tolerance or functions) are evaluated with the CodeEvaluator. If
+        intermediate results are logged then all rules are evaluated with the
+        CodeEvaluator. The columns are converted to Polars once per dataset by
+        the evaluator (data in Polars is not converted).
+
+        Returns:
+            dict: The rule variables (Bitsets of the selected rows) by rule
+            definition.
+        """
+        if (
+            self.backend != "polars"
+            or len(self.params.get("intermediate_results", [])) > 0
+        ):
+            return dict()
+        codes = dict()
+        for rule_def in self.rules[RULE_DEF]:
+            if rule_def not in codes:
+                codes[rule_def] = dataframe_index(expression=rule_def, data=self.data)
+        return polars_masks(codes=codes, data=self.evaluator.polars_columns())
+
+    def rule_code(self, expression: str, boolean_masks: bool = None) -> dict:
+        """
+        Returns the code of the rule variables N, X and Y of a rule expression.
+
+        By default the variables select labels of the DataFrame index. With the
+        parameter "boolean_masks" the variables are masks of the rows of the
+        DataFrame, packed in a Bitset, so that derived variables are calculated
+        with bitwise operations instead of set operations on the index, counts
+        are popcounts and only the rows in the output are converted to labels.
+
+        Args:
+            expression (str): The rule expression in the format 'if A then B'.
+            boolean_masks (bool): Whether the variables are masks of the rows
+            (None for the parameter "boolean_masks").
+
+        Returns:
+            dict: The code of the variables N, X and Y.
+        """
+        if boolean_masks is None:
+            boolean_masks = self.boolean_masks
+        if boolean_masks:
+            return dataframe_mask(expression=expression, data=self.data)
+        return dataframe_index(expression=expression, data=self.data)
 
     def convert(self, templates: list = []) -> None:
         """
@@ -617,21 +1170,16 @@ class RuleMiner:
                     reformulated_expression = self.parser.parse(candidate)
                     if sorted_expression not in sorted_expressions.keys():
                         sorted_expressions[sorted_expression] = True
-                        rule_code = dataframe_index(
-                            expression=reformulated_expression,
-                            data=self.data,
-                        )
+                        rule_code = self.rule_code(expression=reformulated_expression)
                         code_results, _ = self.evaluator.evaluate_dict(
-                            expressions=rule_code, encodings={}
+                            expressions=rule_code, encodings={}, lazy_logs=True
                         )
                         code_results = add_required_variables(
                             required_vars=self.required_vars,
                             results=code_results,
                         )
                         len_results = {
-                            key: len(code_results[key])
-                            if not isinstance(code_results[key], float)
-                            else 0
+                            key: count(code_results[key])
                             for key in code_results.keys()
                             if code_results[key] is not None
                         }
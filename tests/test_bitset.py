@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""Tests for `ruleminer` package / bitset."""
+
+import unittest
+import numpy as np
+from ruleminer.bitset import Bitset, POPCOUNT_TABLE
+
+
+class TestBitset(unittest.TestCase):
+    """Tests for `ruleminer` package / bitset."""
+
+    def test_bitset_1(self):
+        rng = np.random.default_rng(0)
+        for size in [0, 1, 7, 63, 64, 65, 130]:
+            a = rng.random(size) < 0.5
+            b = rng.random(size) < 0.5
+            bitset_a = Bitset.from_mask(a)
+            bitset_b = Bitset.from_mask(b)
+            self.assertListEqual(list(bitset_a.to_mask()), list(a))
+            self.assertEqual(bitset_a.count(), np.count_nonzero(a))
+            self.assertListEqual(list((bitset_a & bitset_b).to_mask()), list(a & b))
+            self.assertListEqual(list((bitset_a | bitset_b).to_mask()), list(a | b))
+            self.assertListEqual(list((~bitset_a).to_mask()), list(~a))
+            # bits after the last row are not counted
+            self.assertEqual((~bitset_a).count(), np.count_nonzero(~a))
+            self.assertEqual(Bitset.full(size).count(), size)
+            self.assertEqual(
+                int(POPCOUNT_TABLE[bitset_a.words.view(np.uint8)].sum()),
+                np.count_nonzero(a),
+            )
+
+    def test_bitset_2(self):
+        bitset = Bitset.from_mask(np.ones(1000, dtype=bool))
+        self.assertEqual(bitset.nbytes, 128)
+        self.assertEqual(repr(bitset), "Bitset(size=1000, count=1000)")
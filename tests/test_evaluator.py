@@ -0,0 +1,581 @@
+#!/usr/bin/env python
+
+"""Tests for `ruleminer` package / evaluator."""
+
+import ast
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import ruleminer
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+df = pd.DataFrame(
+    [
+        ["Test_1", 0.0, 0.5],
+        ["Test_2", 1.0, 0.5],
+        ["Test_3", 2.0, 0.5],
+    ],
+    columns=["Name", "A", "B"],
+)
+
+
+class TestEvaluator(unittest.TestCase):
+    """Tests for `ruleminer` package / evaluator."""
+
+    def test_code_cache_1(self):
+        formulas = ['({"A"} >= 1)', '({"B"} > 0)']
+        r = ruleminer.RuleMiner(templates=[{"expression": form} for form in formulas])
+        r = ruleminer.RuleMiner(rules=r.rules, data=df)
+        info = r.evaluator.code_cache_info()
+        # first evaluation compiles N, X and Y code of both rules
+        self.assertEqual(info["misses"], 3)
+        self.assertEqual(info["hits"], 3)
+        r.evaluate()
+        info = r.evaluator.code_cache_info()
+        self.assertEqual(info["misses"], 3)
+        self.assertEqual(info["hits"], 9)
+        self.assertEqual(info["size"], 3)
+
+    def test_code_cache_2(self):
+        evaluator = ruleminer.CodeEvaluator({"code_cache_size": 2})
+        evaluator.set_data(df)
+        for expression in ['_df["A"]', '_df["B"]', '_df["A"]', '_df["Name"]']:
+            evaluator.evaluate_str(expression)
+        info = evaluator.code_cache_info()
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 3)
+        self.assertEqual(info["size"], 2)
+        # least recently used expression is removed
+        self.assertListEqual(
+            list(evaluator._code_cache.keys()), ['_df["A"]', '_df["Name"]']
+        )
+
+    def test_code_cache_3(self):
+        evaluator = ruleminer.CodeEvaluator({"code_cache_size": 0})
+        evaluator.set_data(df)
+        evaluator.evaluate_str('_df["A"]')
+        evaluator.evaluate_str('_df["A"]')
+        self.assertEqual(evaluator.code_cache_info()["misses"], 2)
+        self.assertEqual(evaluator.code_cache_info()["size"], 0)
+        # syntax errors result in nan
+        variable, _ = evaluator.evaluate_str('_df["A"')
+        self.assertTrue(pd.isna(variable))
+
+    def test_tolerance_1(self):
+        parameters = {
+            "tolerance": {
+                "default": {(0, 1e3): 1, (1e3, 1e6): 2, (1e6, np.inf): 3},
+                "overlap": {(0, 10): 0, (5, 100): 1},
+            },
+        }
+        evaluator = ruleminer.CodeEvaluator(parameters)
+        values = pd.Series([-2500.0, 0.0, 999.0, np.nan, 2e7, 7.0])
+        for key in ["default", "overlap"]:
+            for direction in ["+", "-"]:
+                expected = values.apply(
+                    evaluator.globals["_tol"], args=(direction, key)
+                )
+                actual = evaluator.globals["_tol_vector"](values, direction, key)
+                pd.testing.assert_series_equal(actual, expected.astype(float))
+        # strings and datetimes are not changed
+        values = pd.Series(["a", None])
+        actual = evaluator.globals["_tol_vector"](values, "+", "default")
+        self.assertListEqual(list(actual), ["a", None])
+
+    def test_tolerance_2(self):
+        evaluator = ruleminer.CodeEvaluator(
+            {"tolerance": {"default": {(0, np.inf): 0.5}}}
+        )
+        evaluator.set_data(df)
+        # generated code with tolerance is rewritten to vectorized tolerances
+        tree = evaluator.code_lowering().lower(
+            'sum([K.apply(_tol, args=("-", "default",)) for K in [_df["A"]]])'
+        )
+        self.assertEqual(
+            ast.unparse(tree),
+            "sum([_tol_vector(K, '-', 'default') for K in [_df['A']]])",
+        )
+        tree = evaluator.code_lowering().lower(
+            'ge(_df["A"], 0, _df["A"].apply(_tol, args=("+", "default",)), 0, 0)'
+        )
+        self.assertEqual(
+            ast.unparse(tree),
+            "_sub(\"ge(_df['A'], 0, _df['A'].apply(_tol, args=('+', 'default')), 0, "
+            "0)\", lambda: ge(_df['A'], 0, _tol_column('A', '+', 'default'), 0, 0))",
+        )
+
+    def test_tolerance_3(self):
+        parameters = {
+            "tolerance": {"default": {(0, np.inf): 0}},
+        }
+        formulas = ['({"A"} >= 1)', '({"A"} <= 1.5)', '(({"A"} + {"B"}) > 1)']
+        r = ruleminer.RuleMiner(
+            templates=[{"expression": form} for form in formulas],
+            params=parameters,
+        )
+        r = ruleminer.RuleMiner(rules=r.rules, data=df, params=parameters)
+        # bounds of each column and direction are calculated once for all rules
+        self.assertEqual(
+            set(r.evaluator._tolerance_cache.keys()),
+            {
+                ("A", "default", "+"),
+                ("A", "default", "-"),
+                ("B", "default", "+"),
+                ("B", "default", "-"),
+            },
+        )
+        self.assertListEqual(
+            list(r.evaluator._tolerance_cache[("A", "default", "+")]),
+            [0.5, 1.5, 2.5],
+        )
+        r.evaluator.set_data(df)
+        self.assertEqual(r.evaluator._tolerance_cache, {})
+
+    def test_interval_kernels_1(self):
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(df)
+        a_pos = pd.Series([-1.0, 3.0, np.nan])
+        a_neg = pd.Series([-3.0, -2.0, 1.0])
+        b_pos = pd.Series([2.0, 2.0, 2.0])
+        b_neg = pd.Series([1.0, -1.0, 1.0])
+        mul = evaluator.globals["mul"]
+        self.assertListEqual(
+            list(mul(a_pos, a_neg, b_pos, b_neg, "+")), [-1.0, 6.0, 2.0]
+        )
+        self.assertListEqual(
+            list(mul(a_pos, a_neg, b_pos, b_neg, "-")), [-6.0, -4.0, 1.0]
+        )
+        # scalar and series operands are combined on the index of the data
+        result = mul(a_pos, a_neg, 2.0, 2.0, "+")
+        self.assertListEqual(list(result.index), list(df.index))
+        self.assertListEqual(list(result), [-2.0, 6.0, 2.0])
+        _abs = evaluator.globals["_abs"]
+        self.assertListEqual(list(_abs(a_pos, a_neg, "+")), [3.0, 3.0, 1.0])
+        self.assertListEqual(list(_abs(a_pos, a_neg, "-")), [1.0, 0.0, 1.0])
+        self.assertEqual(mul(2.0, 1.0, 3.0, -1.0, "+"), 6.0)
+
+    def test_subexpression_cache_1(self):
+        formulas = [
+            'if ({"A"} >= 1) then ({"B"} > 0)',
+            'if ({"A"} >= 1) then (({"A"} + {"B"}) > 1)',
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r = ruleminer.RuleMiner(templates=[{"expression": form} for form in formulas])
+        r1 = ruleminer.RuleMiner(rules=r.rules, data=df, params=parameters)
+        info = r1.evaluator.subexpression_cache_info()
+        # the condition of the if-part is evaluated once for both rules
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 4)
+        self.assertEqual(info["size"], 4)
+        r2 = ruleminer.RuleMiner(
+            rules=r.rules,
+            data=df,
+            params={**parameters, "subexpression_cache_bytes": 0},
+        )
+        self.assertEqual(r2.evaluator.subexpression_cache_info()["size"], 0)
+        pd.testing.assert_frame_equal(r1.results, r2.results)
+        r1.evaluator.set_data(df)
+        self.assertEqual(r1.evaluator.subexpression_cache_info()["size"], 0)
+
+    def test_subexpression_cache_2(self):
+        evaluator = ruleminer.CodeEvaluator({"subexpression_cache_bytes": 50})
+        for key in ["a", "b", "c"]:
+            evaluator.cache_subexpression(key, pd.Series([1.0, 2.0, 3.0]))
+        # least recently used values are removed above the number of bytes
+        self.assertListEqual(list(evaluator._subexpression_cache.keys()), ["b", "c"])
+        self.assertEqual(evaluator.subexpression_cache_info()["bytes"], 48)
+        # values larger than the cache are not cached
+        evaluator.cache_subexpression("d", pd.Series(np.zeros(10)))
+        self.assertListEqual(list(evaluator._subexpression_cache.keys()), ["b", "c"])
+
+    def test_subexpression_cache_3(self):
+        # comparisons are not dispatched if they are logged
+        evaluator = ruleminer.CodeEvaluator({"intermediate_results": ["comparisons"]})
+        evaluator.set_data(df)
+        tree = evaluator.code_lowering().lower(
+            '_df.index[(gt(_df["A"] + 1, 0)) & (lt(sum([_df["A"] * k for k in [1]]), 1))]'
+        )
+        # subexpressions with variables of comprehensions are not cached
+        self.assertEqual(
+            ast.unparse(tree),
+            "_df.index[_sub(\"gt(_df['A'] + 1, 0)\", lambda: gt(_sub(\"_df['A'] + 1\", "
+            "lambda: _df['A'] + 1), 0)) & lt(sum([_df['A'] * k for k in [1]]), 1)]",
+        )
+
+    def test_comparison_dispatch_1(self):
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(df)
+        self.assertEqual(evaluator.column_kind("Name"), "no tolerance")
+        self.assertEqual(evaluator.column_kind("A"), "numeric")
+        self.assertEqual(evaluator.column_kind("C"), None)
+        lowering = ruleminer.lowering.CodeLowering(column_kinds=evaluator.column_kind)
+        tree = lowering.lower(
+            '(eq(_df["Name"], "Test_1", _df["Name"], _df["Name"], "Test_1", "Test_1"))'
+            ' & (ge(_df["A"] + 1, 0, _df["A"] + 2, _df["A"], 0, 0))'
+            ' & (le(_df["C"], 0, _df["C"], _df["C"], 0, 0))'
+        )
+        # comparisons of unknown columns are dispatched at evaluation
+        self.assertEqual(
+            ast.unparse(tree),
+            "(_df['Name'] == 'Test_1') & _ge_tol(_df['A'] + 2, _df['A'], 0, 0) & "
+            "le(_df['C'], 0, _df['C'], _df['C'], 0, 0)",
+        )
+        self.assertEqual(
+            lowering.dependencies, {"Name": "no tolerance", "A": "numeric"}
+        )
+
+    def test_comparison_dispatch_2(self):
+        evaluator = ruleminer.CodeEvaluator({})
+        expression = '_df.index[(eq(_df["A"], 1, _df["A"], _df["A"], 1, 1))]'
+        evaluator.set_data(df)
+        variable, _ = evaluator.evaluate_str(expression)
+        self.assertListEqual(list(variable), [1])
+        # the code is compiled again if the kind of a column changes
+        evaluator.set_data(df.astype({"A": str}))
+        variable, _ = evaluator.evaluate_str(expression)
+        self.assertListEqual(list(variable), [])
+        info = evaluator.code_cache_info()
+        self.assertEqual(info["misses"], 2)
+        self.assertEqual(info["hits"], 0)
+        evaluator.evaluate_str(expression)
+        self.assertEqual(evaluator.code_cache_info()["hits"], 1)
+
+    @unittest.skipIf(numexpr is None, "numexpr is not installed")
+    def test_numexpr_1(self):
+        data = pd.DataFrame(
+            {
+                "A": [1.0, 2.0, np.nan, -4.0],
+                "B": np.array([1, 3, 5, 7], dtype=np.int16),
+                "T": ["life", "life", "non-life", "life"],
+            }
+        )
+        evaluator = ruleminer.CodeEvaluator({"backend": "numexpr"})
+        evaluator.set_data(data)
+        tree = evaluator.code_lowering().lower(
+            '_df.index[(gt(_df["A"] + _df["B"], 1)) & (eq(_df["T"], "life"))]'
+        )
+        # numeric expressions are fused, strings are compared with pandas
+        self.assertEqual(
+            ast.unparse(tree),
+            "_df.index[_sub(\"gt(_df['A'] + _df['B'], 1) & eq(_df['T'], 'life')\", "
+            "lambda: _sub(\"gt(_df['A'] + _df['B'], 1)\", lambda: "
+            "_numexpr('((v0 + v1) > 1)', {'v0': 'A', 'v1': 'B'})) & "
+            "_sub(\"eq(_df['T'], 'life')\", lambda: _df['T'] == 'life'))]",
+        )
+        formulas = [
+            'if ({"T"} == "life") then (({"A"} + {"B"}) > 2)',
+            'if ({"T"} == "life") then ((({"A"} * 2) - {"B"}) <= 1)',
+            'if ({"A"} < 0) then ({"B"} >= 5)',
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r = ruleminer.RuleMiner(templates=[{"expression": form} for form in formulas])
+        r1 = ruleminer.RuleMiner(rules=r.rules, data=data, params=parameters)
+        r2 = ruleminer.RuleMiner(
+            rules=r.rules, data=data, params={**parameters, "backend": "numexpr"}
+        )
+        pd.testing.assert_frame_equal(r1.results, r2.results)
+
+        def names(code):
+            return set(code.co_names).union(
+                *[names(c) for c in code.co_consts if hasattr(c, "co_names")]
+            )
+
+        self.assertTrue(
+            any(
+                "_numexpr" in names(code)
+                for code, _, _ in r2.evaluator._code_cache.values()
+            )
+        )
+
+    def test_lazy_logs_1(self):
+        evaluator = ruleminer.CodeEvaluator(
+            {"intermediate_results": ["comparisons"], "tolerance": None}
+        )
+        evaluator.set_data(df)
+        expressions = {
+            "N": "_df.index",
+            "X": '_df.index[(gt(_df["A"], 0))]',
+            "Y": '_df.index[(eq(_df["B"], _df["A"] * 2))]',
+        }
+        _, logs = evaluator.evaluate_dict(expressions=expressions)
+        _, lazy_logs = evaluator.evaluate_dict(expressions=expressions, lazy_logs=True)
+        self.assertIsInstance(lazy_logs, ruleminer.logs.LazyLog)
+        pd.testing.assert_series_equal(lazy_logs.to_series(), logs)
+        # the strings are only formatted for the requested rows
+        selection = df.index[[2, 0]]
+        self.assertListEqual(list(lazy_logs.get(selection)), list(logs.get(selection)))
+        self.assertListEqual(list(lazy_logs.format([1])), [logs.iloc[1]])
+        # the rows can be selected by labels, a boolean mask or a Bitset
+        mask = np.array([True, False, True] + [False] * (len(df.index) - 3))
+        expected = list(logs[mask])
+        self.assertListEqual(list(lazy_logs.get(mask)), expected)
+        self.assertListEqual(
+            list(lazy_logs.get(ruleminer.bitset.Bitset.from_mask(mask))), expected
+        )
+        self.assertListEqual(list(lazy_logs.get(df.index[0])), [logs.iloc[0]])
+        self.assertEqual(lazy_logs.get(["unknown"], ""), "")
+
+    def test_reduction_logs_1(self):
+        data = pd.DataFrame(
+            {"A": [5.0, None, 3.0], "B": [2.0, 4.0, None], "C": [5.0, 1.0, 3.0]}
+        )
+        sumif = (
+            '_df.index[ge(sum([K.where(gt(_df["C"], 2), other=0) for K in '
+            '[_df["A"], _df["B"]]], axis=0, dtype=float), 0)]'
+        )
+        countif = (
+            '_df.index[ge(sum([~K.where(gt(_df["C"], 2)).isna() for K in '
+            '[_df["A"], _df["B"]]], axis=0, dtype=float), 1)]'
+        )
+        evaluator = ruleminer.CodeEvaluator({"intermediate_results": ["comparisons"]})
+        evaluator.set_data(data)
+        # the comparisons of the condition are logged for each value
+        for code, expected in [
+            (
+                sumif,
+                [
+                    "if ({5.0} > {2.0}; {5.0} > {2.0}; {7.0} >= {0.0})",
+                    "if ({1.0} > {2.0}; {1.0} > {2.0}; {0.0} >= {0.0})",
+                    "if ({3.0} > {2.0}; {3.0} > {2.0}; {nan} >= {0.0})",
+                ],
+            ),
+            (
+                countif,
+                [
+                    "if ({5.0} > {2.0}; {5.0} > {2.0}; {2.0} >= {1.0})",
+                    "if ({1.0} > {2.0}; {1.0} > {2.0}; {0.0} >= {1.0})",
+                    "if ({3.0} > {2.0}; {3.0} > {2.0}; {1.0} >= {1.0})",
+                ],
+            ),
+        ]:
+            _, logs = evaluator.evaluate_dict(expressions={"X": code})
+            self.assertListEqual(list(logs), expected)
+
+    def test_item_strings_1(self):
+        # numbers are formatted once per distinct value, the same as str
+        for values in [
+            np.array([0.0, -0.0, np.nan, 1e16, 0.1, np.inf, 0.1, 1e-5]),
+            np.array([0.1, 0.1, 2.5], dtype=np.float32),
+            np.array([3, -1, 3], dtype=np.int8),
+            np.array(["a", 1, None, 1.0], dtype=object),
+        ]:
+            self.assertListEqual(
+                list(ruleminer.logs.item_strings(values)),
+                [str(item) for item in values],
+            )
+
+    def test_corr_1(self):
+        matrix = [[1.0, 0.5, 0.25], [0.5, 1.0, 0.5], [0.25, 0.5, 1.0]]
+        evaluator = ruleminer.CodeEvaluator({"matrices": {"m": matrix}})
+        data = pd.DataFrame(
+            {
+                "a": [1.0, np.nan, -2.0, 3.0],
+                "b": [2.0, 1.0, np.inf, 0.5],
+                "c": [0.0, 4.0, 1.0, 2.0],
+            }
+        )
+        evaluator.set_data(data)
+        actual = evaluator.globals["corr"]("m", data["a"], data["b"], data["c"])
+        values = np.maximum(np.nan_to_num(data.values, posinf=0, neginf=0), 0)
+        expected = [np.sqrt(row @ np.array(matrix) @ row) for row in values]
+        np.testing.assert_allclose(actual, expected)
+        # the number of columns should match the matrix
+        with self.assertRaises(Exception):
+            evaluator.globals["corr"]("m", data["a"], data["b"])
+        # the matrices should be square
+        with self.assertRaises(Exception):
+            ruleminer.CodeEvaluator({"matrices": {"m": [[1.0, 0.5]]}})
+
+    def test_statistics_cache_1(self):
+        formulas = [
+            'if ({"B"} > 0) then ({"A"} <= quantile({"A"}, 0.5))',
+            'if ({"B"} > 0) then ({"A"} >= quantile({"A"}, 0.5) - mean({"A"}))',
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "intermediate_results": ["statistics"],
+            "output_confirmations": True,
+        }
+        r = ruleminer.RuleMiner(templates=[{"expression": form} for form in formulas])
+        r1 = ruleminer.RuleMiner(rules=r.rules, data=df, params=parameters)
+        info = r1.evaluator.statistics_cache_info()
+        # the quantile is calculated once for both rules
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 2)
+        # the statistics are also logged if they are found in the cache
+        self.assertListEqual(
+            list(r1.results["log"]),
+            3 * ['if () then (quantile["A",0.5]=1.0)']
+            + 3 * ['if () then (mean["A"]=1.0; quantile["A",0.5]=1.0)'],
+        )
+        r1.evaluator.set_data(df)
+        self.assertEqual(r1.evaluator.statistics_cache_info()["size"], 0)
+
+    def test_statistics_cache_2(self):
+        parameters = {"evaluate_statistics": True}
+        templates = [
+            {"expression": '({"A"} <= quantile({"A"}, 0.5) + 1)'},
+            {"expression": '({"A"} >= quantile({"A"}, 0.5) - 1)'},
+        ]
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        # the parser calculates the statistics with the evaluator of the miner
+        self.assertIs(r.parser.evaluator, r.evaluator)
+        self.assertListEqual(
+            list(r.rules["rule_definition"]),
+            [
+                'if () then (le({"A"}, 1.0+1))',
+                'if () then (ge({"A"}, 1.0-1))',
+            ],
+        )
+        # the quantile is calculated once for both templates
+        self.assertEqual(r.evaluator.statistics_cache_info()["misses"], 1)
+
+    def test_statistics_cache_3(self):
+        code = '_df["A"] >= quantile(_df["A"], 0.5) - mean(_df["A"] - mean(_df["B"]))'
+        statistics = ruleminer.lowering.dataset_statistics(code)
+        # the statistics of the values come first
+        self.assertListEqual(
+            statistics,
+            [
+                ("mean", "_df['B']", ()),
+                ("mean", "_df['A'] - mean(_df['B'])", ()),
+                ("quantile", "_df['A']", (0.5,)),
+            ],
+        )
+        with self.assertRaises(Exception):
+            ruleminer.lowering.dataset_statistics(
+                'sum([mean(K) for K in [_df["A"]]], axis=0)'
+            )
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(df)
+        evaluator.set_statistics(
+            {
+                ("mean", "_df['B']", ()): (0.0, "B"),
+                ("mean", "_df['A'] - mean(_df['B'])", ()): (0.0, None),
+            }
+        )
+        # the statistics that are set are not calculated on the data
+        actual, _ = evaluator.evaluate_str('_df["A"] - mean(_df["A"] - mean(_df["B"]))')
+        pd.testing.assert_series_equal(actual, df["A"])
+        # other statistics are not calculated at all
+        actual, _ = evaluator.evaluate_str('quantile(_df["A"], 0.5)')
+        self.assertTrue(np.isnan(actual))
+        self.assertEqual(evaluator.statistics_cache_info()["misses"], 0)
+        evaluator.set_data(df)
+        actual, _ = evaluator.evaluate_str('quantile(_df["A"], 0.5)')
+        self.assertEqual(actual, 1.0)
+
+    def test_string_accessors_1(self):
+        data = pd.DataFrame(
+            {"A": ["ab,c", "ab,c", None, "de,f", np.nan, "ab,c"], "B": 1.0}
+        )
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(data)
+        for code in [
+            '_df["A"].str.match(r"^a", na=False)',
+            '_df["A"].str.slice(0, 1)',
+            '_df["A"].str.split(",").str[0]',
+        ]:
+            # the string accessors are applied on the unique values
+            self.assertIn(
+                "_str_column('A'", ast.unparse(evaluator.code_lowering().lower(code))
+            )
+            actual, _ = evaluator.evaluate_str(code, {})
+            pd.testing.assert_series_equal(actual, eval(code, {"_df": data}))
+        self.assertEqual(len(evaluator.factorized("A")[1]), 2)
+
+    def test_dictionary_encoding_1(self):
+        data = pd.DataFrame(
+            {
+                "T": ["life", "non-life", None, "life", np.nan],
+                "M": ["life", 1, "life", 2.0, None],
+            }
+        )
+        evaluator = ruleminer.CodeEvaluator({"dictionary_encoding": True})
+        evaluator.set_data(data)
+        lowering = ruleminer.lowering.CodeLowering(
+            column_kinds=evaluator.column_kind, dictionary=True
+        )
+        tree = lowering.lower('(eq(_df["T"], "life")) & (_df["T"].isin(["x"]))')
+        self.assertEqual(
+            ast.unparse(tree), "_code_eq('T', 'life') & _code_isin('T', ['x'])"
+        )
+        # only columns with strings are encoded
+        self.assertEqual(len(evaluator.dictionary("T")[1]), 2)
+        self.assertIsNone(evaluator.dictionary("M"))
+        for column in ["T", "M"]:
+            values = data[column]
+            for code, expected in [
+                ('eq(_df["' + column + '"], "life")', values == "life"),
+                ('ne("life", _df["' + column + '"])', values != "life"),
+                ('eq(_df["' + column + '"], "unknown")', values == "unknown"),
+                (
+                    '_df["' + column + '"].isin(["non-life", "life"])',
+                    values.isin(["non-life", "life"]),
+                ),
+            ]:
+                actual, _ = evaluator.evaluate_str(code, {})
+                pd.testing.assert_series_equal(actual, expected)
+
+    def test_date_cache_1(self):
+        dates = pd.Series(pd.to_datetime(["2020-01-31", "2021-06-15", None]))
+        data = pd.DataFrame(
+            {
+                "C": dates,
+                "D": pd.to_datetime(["2020-01-01", "2021-06-16", "2021-01-01"]),
+                "O": dates.astype(object),
+            }
+        )
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(data)
+        for code in [
+            '_df["C"].dt.year',
+            '_df["C"].dt.is_month_end',
+            '((_df["C"] - _df["D"]) / np.timedelta64(1, "D"))',
+        ]:
+            actual, _ = evaluator.evaluate_str(code, {})
+            expected = eval(code, {"_df": data, "np": np})
+            pd.testing.assert_series_equal(actual, expected)
+            # date columns with datetime objects are converted
+            actual, _ = evaluator.evaluate_str(code.replace('"C"', '"O"'), {})
+            pd.testing.assert_series_equal(actual, expected, check_names=False)
+        # date parts are calculated once per dataset
+        self.assertIs(
+            evaluator.evaluate_str('_df["C"].dt.year', {})[0],
+            evaluator.evaluate_str('_df["C"].dt.year', {})[0],
+        )
+
+    def test_reductions_1(self):
+        data = pd.DataFrame(
+            {
+                "A": [1.0, 2.0, np.nan, 4.0, -1.0],
+                "B": [1, 3, 3, 4, 2],
+                "C": pd.array([1, None, 3, 4, 2], dtype="Int64"),
+                "T": ["x", "y", "x", "y", None],
+            }
+        )
+        evaluator = ruleminer.CodeEvaluator({})
+        evaluator.set_data(data)
+        for code in [
+            'sum([K for K in [_df["A"],_df["B"]]], axis=0, dtype=float)',
+            'sum([K for K in [_df["A"].where(_df["T"] == "x", other=0),'
+            '_df["B"].where(_df["T"] == "x", other=0)]], axis=0, dtype=float)',
+            'sum([v.where(c, other=0) for (v,c) in zip([K for K in [_df["A"],'
+            '_df["B"]]],[K > 1 for K in [_df["A"],_df["B"]]])], axis=0, dtype=float)',
+            'sum([K for K in [~_df["A"].where(_df["B"] > 1).isna(),'
+            '~_df["T"].where(_df["B"] > 1).isna()]], axis=0, dtype=float)',
+            'sum([~v.where(c).isna() for (v,c) in zip([K for K in [_df["A"],'
+            '_df["C"]]],[K > 1 for K in [_df["B"],_df["B"]]])], axis=0, dtype=float)',
+            'sum([K > 1 for K in [_df["A"],_df["B"]]], axis=0, dtype=float)',
+        ]:
+            self.assertIn("_rows(", ast.unparse(evaluator.code_lowering().lower(code)))
+            expected = eval(code, {"_df": data, "sum": np.sum})
+            # the values are reduced in blocks of rows
+            with mock.patch.object(ruleminer.reductions, "BLOCK_SIZE", 2):
+                actual, _ = evaluator.evaluate_str(code, {})
+            np.testing.assert_array_equal(actual, expected)
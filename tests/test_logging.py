@@ -430,3 +430,45 @@ class TestLogging(unittest.TestCase):
         self.assertListEqual(list(actual[0]), expected[0])
         self.assertListEqual(list(actual[1]), expected[1])
         self.assertListEqual(list(actual[2]), expected[2])
+
+    def test_10(self):
+        formulas = ['(1<{"A"})']
+        r = ruleminer.RuleMiner(
+            templates=[{"expression": form} for form in formulas],
+            params=parameters_no_tolerance,
+        )
+        r = ruleminer.RuleMiner(rules=r.rules, data=df, params=parameters_no_tolerance)
+        actual = (
+            r.results.sort_values(by=["indices"], ignore_index=True)
+            .merge(df, how="left", left_on=["indices"], right_index=True)[
+                ["Name", "result", "log"]
+            ]
+            .values
+        )
+        expected = [
+            ["Test_1", False, "if () then ({1.0} < {0.0})"],
+            ["Test_2", False, "if () then ({1.0} < {1.0})"],
+            ["Test_3", True, "if () then ({1.0} < {2.0})"],
+        ]
+        self.assertListEqual(list(actual[0]), expected[0])
+        self.assertListEqual(list(actual[1]), expected[1])
+        self.assertListEqual(list(actual[2]), expected[2])
+
+    def test_11(self):
+        formulas = ['({"A"}>=1)']
+        params = {**parameters_tolerance, "output_confirmations": False}
+        r = ruleminer.RuleMiner(
+            templates=[{"expression": form} for form in formulas],
+            params=params,
+        )
+        r = ruleminer.RuleMiner(rules=r.rules, data=df, params=params)
+        self.assertListEqual(
+            list(r.results["log"]),
+            ["if () then ({0.0 - 1.0 = -1.0} >= [-0.5])"],
+        )
+        self.assertEqual(
+            r.explain(r.rules.loc[0, "rule_id"], 2),
+            "if () then ({2.0 - 1.0 = 1.0} >= [-0.5])",
+        )
+        # the data is not changed
+        self.assertListEqual(list(r.data.columns), list(df.columns))
@@ -2,11 +2,25 @@
 
 """Tests for `ruleminer` package."""
 
+import ast
+import os
+import tempfile
 import unittest
+import warnings
 import pandas as pd
 import numpy as np
 import ruleminer
 
+try:
+    import polars
+except ImportError:
+    polars = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 # import logging
 # import sys
 # logging.basicConfig(
@@ -2606,6 +2620,457 @@ class TestRuleminer(unittest.TestCase):
             list(list(rules1.values)[1])[1:], list(list(rules2.values)[1])[1:]
         )
 
+    def test_66(self):
+        df = pd.DataFrame(
+            columns=["Entity", "Period", "A", "B"],
+            data=[
+                ["E1", "2020", 1, 2],
+                ["E1", "2021", 2, 1],
+                ["E2", "2020", 3, 4],
+                ["E2", "2021", 0, 4],
+                ["E3", "2020", np.nan, 1],
+            ],
+        ).set_index(["Entity", "Period"])
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > {"A"})'},
+            {"expression": '({"A"} < {"B"})'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r1 = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r2 = ruleminer.RuleMiner(
+            templates=templates,
+            data=df,
+            params={**parameters, "boolean_masks": True},
+        )
+        self.assertEqual(
+            r2.rule_code(r2.rules.loc[0, ruleminer.RULE_DEF]),
+            {
+                "N": "_mask()",
+                "X": '_mask(((gt(_df["A"], 0))))',
+                "Y": '_mask(((gt(_df["B"], _df["A"]))))',
+            },
+        )
+        pd.testing.assert_frame_equal(r1.rules, r2.rules)
+        pd.testing.assert_frame_equal(r1.evaluate(), r2.evaluate())
+        self.assertListEqual(
+            list(r2.results["result"]),
+            [True, True, False, True, True, True, False, False],
+        )
+        self.assertListEqual(
+            list(r2.results["indices"]),
+            [
+                ("E1", "2020"),
+                ("E2", "2020"),
+                ("E1", "2021"),
+                ("E1", "2020"),
+                ("E2", "2020"),
+                ("E2", "2021"),
+                ("E1", "2021"),
+                ("E3", "2020"),
+            ],
+        )
+
+    @unittest.skipIf(polars is None, "polars is not installed")
+    def test_67(self):
+        df = pd.DataFrame(
+            columns=["Entity", "Period", "A", "B", "C"],
+            data=[
+                ["E1", "2020", 1, 2, "x"],
+                ["E1", "2021", 2, 1, "y"],
+                ["E2", "2020", 3, 4, None],
+                ["E2", "2021", 0, 4, "x"],
+                ["E3", "2020", np.nan, 1, "y"],
+            ],
+        ).set_index(["Entity", "Period"])
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > {"A"})'},
+            {"expression": 'if ({"C"} == "x") then ({"A"} + {"B"} != 3)'},
+            {"expression": 'if ({"C"} in ["x", "y"]) then ~({"A"} / {"B"} >= 1)'},
+            {"expression": 'if ({"C"} match "x") then ({"B"} > 1)'},
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "output_not_applicable": True,
+        }
+        r1 = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r2 = ruleminer.RuleMiner(
+            templates=templates,
+            data=df,
+            params={**parameters, "backend": "polars"},
+        )
+        pd.testing.assert_frame_equal(r1.rules, r2.rules)
+        # the rule with match is evaluated with pandas
+        self.assertEqual(len(r2.polars_results()), 3)
+        pd.testing.assert_frame_equal(r1.evaluate(), r2.evaluate())
+
+    def test_68(self):
+        df = pd.DataFrame(
+            columns=["Name", "Country", "Currency"],
+            data=[
+                ["E1", "NL", "EUR"],
+                ["E2", "NL", "USD"],
+                ["E3", "US", "USD"],
+                ["E4", None, "EUR"],
+            ],
+        )
+        templates = [
+            {
+                "expression": '([{"Country"}, {"Currency"}] in [["NL", "EUR"], ["US", "USD"]])'
+            },
+            {
+                "expression": '([{"Country"}, {"Currency"}] not in [["NL", "EUR"], ["US", "USD"]])'
+            },
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "output_confirmations": False,
+        }
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        self.assertListEqual(
+            list(r.rules[ruleminer.RULE_DEF]),
+            [
+                'if () then (pd.concat([{"Country"},{"Currency"}], axis=1).apply(tuple, axis=1).isin([["NL","EUR"],["US","USD"]]))',
+                'if () then (pd.concat([{"Country"},{"Currency"}], axis=1).apply(tuple, axis=1).isin([["NL","EUR"],["US","USD"]]))',
+            ],
+        )
+        # the tuples of the rows are not equal to rows given as lists
+        self.assertListEqual(list(r.rules[ruleminer.ABSOLUTE_SUPPORT]), [0, 0])
+        self.assertListEqual(list(r.rules[ruleminer.ABSOLUTE_EXCEPTIONS]), [4, 4])
+        self.assertListEqual(list(r.evaluate()["indices"]), [0, 1, 2, 3, 0, 1, 2, 3])
+        # membership is checked with an index of the rows, as with pd.Series.isin
+        code = (
+            'pd.concat([_df["Country"], _df["Currency"]], axis=1)'
+            '.apply(tuple, axis=1).isin([("NL", "EUR"), ["US", "USD"], (None, "EUR")])'
+        )
+        self.assertIn("_in_rows(", ast.unparse(r.evaluator.code_lowering().lower(code)))
+        expected = eval(code, {"pd": pd, "_df": df})
+        actual, _ = r.evaluator.evaluate_str(code, {})
+        pd.testing.assert_series_equal(actual, expected)
+
+    def test_69(self):
+        df = pd.DataFrame({"A": [0.0, 1.0, 2.0, 3.0], "B": [1.0, 0.0, 1.0, 0.0]})
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > 0)'},
+            {"expression": '({"A"} > {"B"})'},
+        ]
+        records = []
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "profile_callback": records.append,
+        }
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r.evaluate()
+        # one record per variable and one per rule
+        self.assertListEqual(
+            list(r.profile["variable"]), ["N", "X", "Y", "rule", "N", "X", "Y", "rule"]
+        )
+        self.assertListEqual(list(r.profile["cardinality"]), [4, 3, 2, 3, 4, 4, 3, 4])
+        self.assertTrue((r.profile[["wall time", "cpu time"]] >= 0).all().all())
+        self.assertEqual(records, r.profile.to_dict(orient="records"))
+        # without profiling no profile is recorded
+        r = ruleminer.RuleMiner(templates=templates, data=df, params={})
+        r.evaluate()
+        self.assertIsNone(r.profile)
+
+    def test_70(self):
+        df = pd.DataFrame(
+            {"A": [0.0, 1.0, 2.0, 3.0], "B": [1.0, 0.0, 1.0, 0.0]},
+            index=["a", "b", "c", "d"],
+        )
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > 0)'},
+            {"expression": '({"A"} > {"B"})'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r.evaluate()
+        expected = pd.DataFrame(
+            {
+                ruleminer.RULE_ID: pd.Categorical.from_codes(
+                    [0, 0, 0, 1, 1, 1, 1], categories=list(r.rules[ruleminer.RULE_ID])
+                ),
+                ruleminer.ABSOLUTE_SUPPORT: pd.array(
+                    [1, 1, 1, 3, 3, 3, 3], dtype="Int64"
+                ),
+                "result": pd.array(
+                    [True, False, False, True, True, True, False], dtype=object
+                ),
+                "indices": ["c", "b", "d", "b", "c", "d", "a"],
+            }
+        )
+        pd.testing.assert_frame_equal(r.results[expected.columns], expected)
+        self.assertEqual(
+            list(r.results[ruleminer.RULE_DEF].cat.categories),
+            list(r.rules[ruleminer.RULE_DEF]),
+        )
+        # the same results as a dict of lists
+        parameters["results_datatype"] = {}
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r.evaluate()
+        self.assertEqual(r.results[ruleminer.RULE_ID], [0, 0, 0, 1, 1, 1, 1])
+        self.assertEqual(r.results["indices"], list(expected["indices"]))
+
+    def test_71(self):
+        df = pd.DataFrame({"A": [0.0, 1.0, 2.0, 3.0], "B": [1.0, 0.0, 1.0, 0.0]})
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > 0)'},
+            {"expression": '({"A"} > {"B"})'},
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "intermediate_results": ["comparisons"],
+        }
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        actual = r.evaluate(mode="metrics")
+        # one row per rule with the metrics of the rule
+        expected = r.rules[
+            [
+                ruleminer.RULE_ID,
+                ruleminer.RULE_GROUP,
+                ruleminer.RULE_DEF,
+                ruleminer.ABSOLUTE_SUPPORT,
+                ruleminer.ABSOLUTE_EXCEPTIONS,
+                ruleminer.CONFIDENCE,
+                ruleminer.NOT_APPLICABLE,
+            ]
+        ]
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        self.assertListEqual(list(actual[ruleminer.ABSOLUTE_SUPPORT]), [1, 3])
+        # the evaluator without logs is kept, with its compiled code
+        evaluator = r.metrics_evaluator()
+        misses = evaluator.code_cache_info()["misses"]
+        pd.testing.assert_frame_equal(r.evaluate(mode="metrics"), actual)
+        self.assertIs(r.metrics_evaluator(), evaluator)
+        self.assertEqual(evaluator.code_cache_info()["misses"], misses)
+        # other metrics
+        parameters["metrics"] = ["abs support", "lift"]
+        parameters["filter"] = {"abs support": 0.0}
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        actual = r.evaluate(mode="metrics")
+        self.assertListEqual(
+            list(actual.columns),
+            [
+                ruleminer.RULE_ID,
+                ruleminer.RULE_GROUP,
+                ruleminer.RULE_DEF,
+                "abs support",
+                "lift",
+            ],
+        )
+        with self.assertRaises(Exception):
+            r.evaluate(mode="rows")
+
+    def test_72(self):
+        df = pd.DataFrame(
+            {"A": [0.0, 1.0, 2.0, 3.0, 4.0], "B": [1.0, 0.0, 1.0, 0.0, 1.0]}
+        )
+        templates = [
+            {"expression": 'if ({"A"} > 0) then ({"B"} > 0)'},
+            {"expression": '({"A"} > {"B"})'},
+            {"expression": '({"A"} >= {"B"})'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        expected = r.evaluate()
+        # the batches of rules concatenated are the same as the results
+        for batch_size in [1, 2, 3]:
+            batches = list(r.iter_evaluate(batch_size=batch_size))
+            self.assertEqual(len(batches), -(-len(r.rules) // batch_size))
+            actual = pd.concat(batches, ignore_index=True)
+            pd.testing.assert_frame_equal(actual, expected)
+        # the temporary index columns are removed
+        self.assertListEqual(list(r.data.columns), ["A", "B"])
+        # metrics per batch of rules
+        actual = pd.concat(r.iter_evaluate(batch_size=2, mode="metrics"))
+        pd.testing.assert_frame_equal(
+            actual.reset_index(drop=True), r.evaluate(mode="metrics")
+        )
+        with self.assertRaises(Exception):
+            r.iter_evaluate(batch_size=0)
+        # the data is not changed between batches, also not by other evaluations
+        batches = r.iter_evaluate()
+        first = next(batches)
+        self.assertListEqual(list(r.data.columns), ["A", "B"])
+        r.evaluate()
+        actual = pd.concat([first] + list(batches), ignore_index=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_73(self):
+        df = pd.DataFrame(
+            {
+                "A": [0.0, 1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+                "B": [1.0, 0.0, 1.0, 0.0, 1.0, 2.0, -1.0],
+            }
+        )
+        templates = [
+            {"expression": 'if ({"B"} > 0) then ({"A"} <= quantile({"A"}, 0.5))'},
+            {"expression": '({"A"} - mean({"A"}) < std({"A"} - mean({"B"})))'},
+            {"expression": 'if ({"B"} > 0) then ({"A"} > {"B"})'},
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "output_not_applicable": True,
+        }
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        chunks = [df.iloc[0:3].copy(), df.iloc[3:6].copy(), df.iloc[6:].copy()]
+        # the results of the chunks are the same as of the whole dataset
+        for mode in ["results", "metrics"]:
+            expected = r.evaluate(mode=mode)
+            actual = r.evaluate_chunks(chunks=chunks, mode=mode)
+            pd.testing.assert_frame_equal(actual, expected)
+        self.assertIs(r.data, df)
+        # the chunks are not changed
+        for chunk in chunks:
+            self.assertListEqual(list(chunk.columns), ["A", "B"])
+        # chunks of a CSV file
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.csv")
+            df.to_csv(path)
+            actual = r.evaluate_chunks(
+                chunks=ruleminer.csv_chunks(path, chunksize=2, index_col=0)
+            )
+        pd.testing.assert_frame_equal(actual, r.evaluate())
+        # the statistics need a second pass over the chunks
+        with self.assertRaises(Exception):
+            r.evaluate_chunks(chunks=iter(chunks))
+
+    @unittest.skipIf(polars is None, "polars is not installed")
+    def test_74(self):
+        df = pd.DataFrame(
+            {"A": [1.0, 2.0, np.nan, 4.0], "C": ["x", "y", None, "z"]},
+        )
+        templates = [
+            {"expression": 'if ({"C"} in ["x", "y"]) then ({"A"} in [1, 2])'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r1 = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        r2 = ruleminer.RuleMiner(
+            templates=templates,
+            data=df,
+            params={**parameters, "backend": "polars"},
+        )
+        # membership is evaluated with Polars without deprecation warnings
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(len(r2.polars_results()), 1)
+            actual = r2.evaluate()
+        self.assertListEqual(
+            [w for w in caught if issubclass(w.category, DeprecationWarning)], []
+        )
+        pd.testing.assert_frame_equal(actual, r1.evaluate())
+
+    @unittest.skipIf(polars is None, "polars is not installed")
+    def test_75(self):
+        df = pd.DataFrame(
+            {
+                "A": [1.0, 2.0, np.nan, 4.0, 0.0],
+                "B": [2.0, 1.0, 1.0, 5.0, 1.0],
+                "C": [None, "x", "y", "x", "z"],
+            }
+        )
+        templates = [
+            {"expression": 'if ({"C"} in ["x", "y"]) then ({"A"} < {"B"})'},
+            {"expression": 'if ({"A"} > 0) then ({"A"} + {"B"} > 3)'},
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "backend": "polars",
+        }
+        r1 = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        expected = r1.evaluate()
+        # the columns are converted to Polars once per dataset
+        columns = r1.evaluator.polars_columns()
+        values = columns.values("C")
+        self.assertListEqual(values.to_list(), [None, "x", "y", "x", "z"])
+        r1.evaluate()
+        self.assertIs(r1.evaluator.polars_columns(), columns)
+        self.assertIs(columns.values("C"), values)
+        # data in Polars is used without conversion
+        data = polars.DataFrame(
+            {
+                "A": [1.0, 2.0, None, 4.0, 0.0],
+                "B": [2.0, 1.0, 1.0, 5.0, 1.0],
+                "C": [None, "x", "y", "x", "z"],
+            }
+        )
+        r2 = ruleminer.RuleMiner(templates=templates, data=data, params=parameters)
+        self.assertEqual(len(r2.polars_results()), 2)
+        self.assertIs(r2.evaluator.polars_columns().data, data)
+        pd.testing.assert_frame_equal(r2.evaluate(), expected)
+
+    def test_77(self):
+        values = np.arange(97, dtype=float) / 20
+        values[50] = np.nan
+        df = pd.DataFrame({"A": values, "B": np.arange(97, dtype=float)})
+        templates = [
+            {"expression": '({"A"} > sum({"A"}) / 100)'},
+            {"expression": '({"B"} > sum({"B"}) / 100)'},
+        ]
+        parameters = {
+            "filter": {"confidence": 0.0, "abs support": 0.0},
+            "intermediate_results": ["comparisons"],
+        }
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        chunks = [df.iloc[start : start + 20].copy() for start in range(0, 97, 20)]
+        # sums over the rows are calculated for the whole dataset
+        for mode in ["results", "metrics"]:
+            expected = r.evaluate(mode=mode)
+            actual = r.evaluate_chunks(chunks=chunks, mode=mode)
+            pd.testing.assert_frame_equal(actual, expected)
+        self.assertListEqual(list(r.rules[ruleminer.ABSOLUTE_SUPPORT]), [0, 50])
+
+    def test_78(self):
+        df = pd.DataFrame(
+            {
+                "A": [0.0, 1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+                "B": [1.0, 0.0, 1.0, 0.0, 1.0, 2.0, -1.0],
+            }
+        )
+        templates = [
+            {"expression": 'if ({"B"} > 0) then ({"A"} <= quantile({"A"}, 0.5))'},
+            {"expression": 'if ({"B"} > 0) then ({"A"} > {"B"})'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        rules = ruleminer.RuleMiner(
+            templates=templates, data=df, params=parameters
+        ).rules
+        # without data the rules are kept without evaluating them
+        r = ruleminer.RuleMiner(rules=rules, params=parameters)
+        self.assertIsNone(r.data)
+        chunks = [df.iloc[0:4].copy(), df.iloc[4:].copy()]
+        actual = r.evaluate_chunks(chunks=chunks)
+        self.assertIsNone(r.data)
+        expected = ruleminer.RuleMiner(rules=rules, data=df, params=parameters)
+        pd.testing.assert_frame_equal(actual, expected.results)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_79(self):
+        df = pd.DataFrame(
+            {
+                "A": [0.0, 1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+                "B": [1.0, 0.0, 1.0, 0.0, 1.0, 2.0, -1.0],
+            }
+        )
+        templates = [
+            {"expression": 'if ({"B"} > 0) then ({"A"} <= quantile({"A"}, 0.5))'},
+            {"expression": 'if ({"B"} > 0) then ({"A"} > {"B"})'},
+        ]
+        parameters = {"filter": {"confidence": 0.0, "abs support": 0.0}}
+        r = ruleminer.RuleMiner(templates=templates, data=df, params=parameters)
+        expected = r.evaluate()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.parquet")
+            df.to_parquet(path, row_group_size=3)
+            # the row groups are evaluated as chunks, with the positions of
+            # the rows in the file as index
+            actual = r.evaluate_chunks(chunks=ruleminer.parquet_chunks(path))
+            pd.testing.assert_frame_equal(actual, expected)
+            actual = r.evaluate_chunks(
+                chunks=ruleminer.parquet_chunks(path, columns=["A", "B"]),
+                mode="metrics",
+            )
+        pd.testing.assert_frame_equal(actual, r.evaluate(mode="metrics"))
+
     # def setUp_templates(self):
     #     """Set up test fixtures, if any."""
     #     templates = ["template"]
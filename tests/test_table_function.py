@@ -2,7 +2,10 @@
 
 """Tests for table function"""
 
+import ast
 import unittest
+from unittest import mock
+import numpy as np
 import pandas as pd
 import ruleminer
 
@@ -147,3 +150,36 @@ class TestRuleminer(unittest.TestCase):
         self.assertListEqual(list(actual[0]), expected[0])
         self.assertListEqual(list(actual[1]), expected[1])
         self.assertListEqual(list(actual[2]), expected[2])
+
+    def test_4(self):
+        external_data = pd.DataFrame(
+            {
+                "a": [1.0, np.nan, 3.0, 4.0],
+                "b": ["x", None, "z", "x"],
+                "c": [1, 2, 3, 4],
+            }
+        )
+        df = pd.DataFrame(
+            {
+                "A": [1, np.nan, np.nan, 3, 3, 4, 5],
+                "B": ["x", None, "y", "w", "z", "x", "x"],
+                "C": [1, 2, 2, 3, 2, 4, 4],
+            }
+        )
+        code = (
+            'pd.concat([_df["A"], _df["B"], _df["C"]], axis=1)'
+            '.apply(tuple, axis=1).isin(_table_t[["a","b","c"]].apply(tuple, axis=1))'
+        )
+        evaluator = ruleminer.CodeEvaluator({"tables": {"t": external_data}})
+        evaluator.set_data(df)
+        # membership is checked with the index of the table
+        self.assertIn("_in_table(", ast.unparse(evaluator.code_lowering().lower(code)))
+        expected = eval(code, {"pd": pd, "_df": df, "_table_t": external_data})
+        actual, _ = evaluator.evaluate_str(code, {})
+        pd.testing.assert_series_equal(actual, expected)
+        # keys of the table that do not fit in int64 are factorized again
+        with mock.patch.object(ruleminer.membership, "MAX_KEY", 4):
+            evaluator = ruleminer.CodeEvaluator({"tables": {"t": external_data}})
+            evaluator.set_data(df)
+            actual, _ = evaluator.evaluate_str(code, {})
+        pd.testing.assert_series_equal(actual, expected)